@@ -0,0 +1,405 @@
+import argparse
+import gc
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, time as hora
+
+from benchmarks.paginas import RAIZ, _errores, _memoria_mb, _ms, _widget
+
+# === CONFIGURACIÓN ===
+# Prueba de carga del cambio de turno: muchas sesiones abren 📋 Registro a la vez,
+# eligen un formulario por st.session_state["subpage"], lo llenan y registran.
+# Corre streamlit_app.py completo con AppTest (una sesión por hilo, todas en el
+# mismo proceso, como en el servidor) contra una API de Sheets falsa a nivel HTTP:
+# el cliente real, la cuota y los reintentos ante 429 también se ejercitan.
+# Cada nivel de concurrencia corre en un proceso nuevo.
+#
+#   python -m benchmarks.carga                                # 10, 50 y 200 sesiones
+#   python -m benchmarks.carga --sesiones 50 --latencia 0.3 --tasa-429 0.05
+#   python -m benchmarks.carga --por-minuto 60 --guardar turno.json
+FORMULARIOS = {
+    "recuperaciones": "pages.1_recuperaciones_cctv",
+    "recibo": "pages.2_auditoria_recibo",
+    "warehouse": "pages.3_auditoria_warehouse",
+}
+
+NIVELES = [10, 50, 200]
+ESPERA_COLA = 300     # segundos máximos para que la cola termine de enviar
+
+# Objetivos por defecto; un nivel que no los cumple hace fallar la ejecución
+SLO_RERUN_P95_MS = 1000
+SLO_REGISTRO_P95_MS = 3000
+SLO_ERRORES = 0.01
+
+METRICAS = [
+    "sesiones", "registros_s", "rerun_p95_ms", "rerun_p99_ms", "registro_p95_ms", "registro_p99_ms",
+    "errores", "reintentos_429", "mb_pico", "mb_sesion",
+]
+
+SECRETOS = (
+    '[connections.gsheets]\nspreadsheet = "libro-falso"\n'
+    '[connections.gsheets.credentials]\ntype = "service_account"\n'
+)
+
+
+# === UNA SESIÓN ===
+# Cada interacción es un rerun completo del script; las latencias se anotan en
+# `medicion`. El registro se mide aparte porque es lo que la persona espera con
+# el botón presionado.
+class Medicion:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reruns = []
+        self.registros = []
+        self.errores = []
+        self.registradas = {}
+
+    def anotar(self, lista, ms):
+        with self.lock:
+            lista.append(ms)
+
+
+def _paso(medicion, accion):
+    medicion.anotar(medicion.reruns, _ms(accion))
+
+
+def _llenar_recuperaciones(at, paso, sku):
+    paso(lambda: _widget(at.selectbox, "tiendas").set_value("IKEA NQS").run())
+    paso(lambda: _widget(at.date_input, "Fecha").set_value(date(2025, 10, 3)).run())
+    paso(lambda: _widget(at.time_input, "Hora").set_value(hora(14, 30)).run())
+    paso(lambda: _widget(at.text_input, "Buscar SKU").set_value(sku[:6]).run())
+    paso(lambda: _widget(at.selectbox, "SKU").set_value(sku).run())
+    paso(lambda: _widget(at.number_input, "Valor").set_value(1200).run())
+
+
+def _llenar_recibo(at, paso, sku):
+    paso(lambda: _widget(at.selectbox, "tiendas").set_value("IKEA NQS").run())
+    paso(lambda: _widget(at.date_input, "Fecha").set_value(date(2025, 10, 3)).run())
+    paso(lambda: _widget(at.time_input, "Hora").set_value(hora(14, 30)).run())
+    paso(lambda: _widget(at.text_area, "novedad").set_value("Caja abierta").run())
+
+
+def _llenar_warehouse(at, paso, sku):
+    paso(lambda: _widget(at.date_input, "Fecha").set_value(date(2025, 10, 3)).run())
+    paso(lambda: _widget(at.text_input, "Número de documento").set_value("OLPN-1").run())
+    paso(lambda: _widget(at.text_input, "Buscar SKU").set_value(sku[:6]).run())
+    paso(lambda: _widget(at.selectbox, "SKU").set_value(sku).run())
+    paso(lambda: _widget(at.number_input, "Valor unitario").set_value(500).run())
+
+
+LLENADO = {
+    "recuperaciones": _llenar_recuperaciones,
+    "recibo": _llenar_recibo,
+    "warehouse": _llenar_warehouse,
+}
+
+
+def _sesion(formulario, sku, medicion):
+    from streamlit.testing.v1 import AppTest
+
+    def paso(accion):
+        _paso(medicion, accion)
+        if _errores(at):
+            raise RuntimeError(_errores(at)[0])
+
+    at = AppTest.from_file(os.path.join(RAIZ, "streamlit_app.py"), default_timeout=600)
+    try:
+        paso(at.run)
+        paso(lambda: at.sidebar.radio[0].set_value("📋 Registro").run())
+        at.session_state["subpage"] = FORMULARIOS[formulario]
+        paso(at.run)
+        LLENADO[formulario](at, paso, sku)
+        medicion.anotar(medicion.registros, _ms(lambda: _widget(at.button, "Registrar").click().run()))
+        if not any("registrada" in e.value for e in at.success):
+            raise RuntimeError(_errores(at)[0] if _errores(at) else "sin confirmación de registro")
+    except KeyError as e:
+        # Un campo que no aparece: se anota en qué pantalla quedó la sesión
+        titulos = " / ".join(t.value for t in at.title)
+        medicion.anotar(medicion.errores, f"{formulario}: falta {e} en «{titulos}»")
+        return
+    except Exception as e:
+        medicion.anotar(medicion.errores, f"{formulario}: {str(e).splitlines()[0][:120] if str(e) else type(e).__name__}")
+        return
+    with medicion.lock:
+        medicion.registradas[formulario] = medicion.registradas.get(formulario, 0) + 1
+
+
+def _servidor_compartido():
+    # AppTest arma en cada ejecución lo que en el servidor existe una sola vez,
+    # y con sesiones en varios hilos se pisan entre sí:
+    # - un Runtime falso, que borra al terminar, quitándoselo a las que siguen;
+    # - cachés de bytecode nuevos, que recompilan el script con ast (no es
+    #   seguro entre hilos);
+    # - PagesManager.uses_pages_directory, que reinicia: una sesión que lo lee
+    #   en ese instante corre el script sin la carpeta pages/, sus widgets
+    #   cambian de id y vuelve a 🏠 Inicio.
+    # Aquí se conservan el último Runtime, un solo caché y el valor de la clase
+    # base (AppTest reinicia el de una subclase), como en el servidor.
+    from streamlit.runtime.pages_manager import PagesManager
+    from streamlit.runtime.runtime import Runtime
+    from streamlit.runtime.scriptrunner.script_cache import ScriptCache
+    from streamlit.testing.v1 import app_test, local_script_runner
+
+    ultimo = []
+
+    def instancia(cls):
+        if cls._instance is not None:
+            ultimo[:] = [cls._instance]
+        if not ultimo:
+            raise RuntimeError("Runtime hasn't been created!")
+        return ultimo[0]
+
+    Runtime.instance = classmethod(instancia)
+    Runtime.exists = classmethod(lambda cls: cls._instance is not None or bool(ultimo))
+    cache = ScriptCache()
+    app_test.ScriptCache = local_script_runner.ScriptCache = lambda: cache
+    app_test.PagesManager = type("PagesManager", (PagesManager,), {})
+
+
+# === MEMORIA DEL PROCESO ===
+class Muestreo:
+    def __init__(self, intervalo=0.2):
+        self.intervalo = intervalo
+        self.pico = _memoria_mb()
+        self._fin = threading.Event()
+        self._hilo = threading.Thread(target=self._muestrear, daemon=True)
+
+    def _muestrear(self):
+        while not self._fin.wait(self.intervalo):
+            self.pico = max(self.pico, _memoria_mb())
+
+    def __enter__(self):
+        self._hilo.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._fin.set()
+        self._hilo.join()
+        self.pico = max(self.pico, _memoria_mb())
+
+
+def _percentil(valores, p):
+    if not valores:
+        return None
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, round(p / 100 * (len(ordenados) - 1)))]
+
+
+def _esperar_cola(libro, inicial, esperadas):
+    # El registro solo encola; la fila llega a Sheets cuando el trabajador la envía
+    from utils import cola_escritura
+
+    limite = time.monotonic() + ESPERA_COLA
+    inicio = time.perf_counter()
+    while time.monotonic() < limite:
+        if not cola_escritura.pendientes():
+            break
+        time.sleep(0.2)
+    with libro.lock:
+        entregadas = sum(len(libro.hojas[h].filas) for h in inicial) - sum(inicial.values())
+    return entregadas, esperadas - entregadas, time.perf_counter() - inicio
+
+
+# === UN NIVEL DE CONCURRENCIA (proceso hijo) ===
+def medir_carga(sesiones, skus, personas, registros, latencia, tasa_429, por_minuto):
+    directorio = tempfile.mkdtemp(prefix="carga-reportes-")
+    os.makedirs(os.path.join(directorio, ".streamlit"))
+    with open(os.path.join(directorio, ".streamlit", "secrets.toml"), "w") as f:
+        f.write(SECRETOS)
+    os.environ["REPORTES_DATOS"] = os.path.join(directorio, "datos")
+    os.chdir(directorio)
+    sys.path.insert(0, RAIZ)
+
+    from streamlit import config
+
+    from benchmarks import sheets_falso
+    from utils import arranque, metricas
+    from utils.esquemas import TRANSACCIONES
+
+    # AppTest activa esta opción durante cada ejecución y la restaura al salir;
+    # con muchas sesiones a la vez no debe quedar desactivada por una que termina
+    config.set_option("global.appTest", True)
+    _servidor_compartido()
+
+    libro = sheets_falso.libro_sintetico(skus, personas, registros, latencia)
+    api = sheets_falso.instalar_http(libro, tasa_429, por_minuto)
+    sku = libro.hojas["HFB"].filas[1 + skus // 2][0]
+
+    # Servidor caliente: una sesión completa por formulario antes de la ola
+    calentamiento = Medicion()
+    for formulario in FORMULARIOS:
+        _sesion(formulario, sku, calentamiento)
+    while not arranque.estado()["terminado"]:
+        time.sleep(0.1)
+    if calentamiento.errores:
+        raise RuntimeError(f"calentamiento: {calentamiento.errores[0]}")
+    _esperar_cola(libro, {}, 0)
+
+    with libro.lock:
+        inicial = {h: len(libro.hojas[h].filas) for h in TRANSACCIONES}
+    llamadas_inicial, rechazadas_inicial = api.llamadas, api.rechazadas
+    metricas.reiniciar()
+    gc.collect()
+    memoria_inicial = _memoria_mb()
+
+    medicion = Medicion()
+    orden = [list(FORMULARIOS)[i % len(FORMULARIOS)] for i in range(sesiones)]
+    with Muestreo() as muestreo:
+        inicio = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=sesiones) as grupo:
+            for formulario in orden:
+                grupo.submit(_sesion, formulario, sku, medicion)
+        segundos = time.perf_counter() - inicio
+        registradas = sum(medicion.registradas.values())
+        entregadas, perdidas, cola_s = _esperar_cola(libro, inicial, registradas)
+
+    reintentos = sum(
+        t["total"] for t in metricas.totales() if t["contador"].startswith("api_reintento:429")
+    )
+    errores = {}
+    for error in medicion.errores:
+        errores[error] = errores.get(error, 0) + 1
+
+    return {
+        "sesiones": sesiones,
+        "segundos": segundos,
+        "registros_s": registradas / segundos,
+        "reruns_s": len(medicion.reruns) / segundos,
+        "reruns": len(medicion.reruns),
+        "rerun_p50_ms": _percentil(medicion.reruns, 50),
+        "rerun_p95_ms": _percentil(medicion.reruns, 95),
+        "rerun_p99_ms": _percentil(medicion.reruns, 99),
+        "registro_p50_ms": _percentil(medicion.registros, 50),
+        "registro_p95_ms": _percentil(medicion.registros, 95),
+        "registro_p99_ms": _percentil(medicion.registros, 99),
+        "errores": len(medicion.errores) / sesiones,
+        "detalle_errores": errores,
+        "api_llamadas": api.llamadas - llamadas_inicial,
+        "api_429": api.rechazadas - rechazadas_inicial,
+        "reintentos_429": reintentos,
+        "entregadas": entregadas,
+        "sin_entregar": perdidas,
+        "cola_s": cola_s,
+        "mb_inicial": memoria_inicial,
+        "mb_pico": muestreo.pico,
+        "mb_final": _memoria_mb(),
+        "mb_sesion": (muestreo.pico - memoria_inicial) / sesiones,
+    }
+
+
+# === ORQUESTACIÓN Y REPORTE ===
+def _ejecutar(sesiones, args):
+    comando = [
+        sys.executable, "-m", "benchmarks.carga", "--hijo",
+        "--sesiones", str(sesiones), "--skus", str(args.skus), "--personas", str(args.personas),
+        "--registros", str(args.registros), "--latencia", str(args.latencia),
+        "--tasa-429", str(args.tasa_429),
+    ]
+    if args.por_minuto is not None:
+        comando += ["--por-minuto", str(args.por_minuto)]
+    salida = subprocess.run(comando, cwd=RAIZ, capture_output=True, text=True)
+    if salida.returncode != 0:
+        print(salida.stderr[-2000:], file=sys.stderr)
+        return {"sesiones": sesiones, "error": salida.stderr.strip().splitlines()[-1:]}
+    return json.loads(salida.stdout.strip().splitlines()[-1])
+
+
+def _incumplidos(r, args):
+    fallas = []
+    if r["rerun_p95_ms"] is not None and r["rerun_p95_ms"] > args.slo_rerun:
+        fallas.append(f"rerun p95 {r['rerun_p95_ms']:,.0f} ms > {args.slo_rerun:,.0f}")
+    if r["registro_p95_ms"] is not None and r["registro_p95_ms"] > args.slo_registro:
+        fallas.append(f"registro p95 {r['registro_p95_ms']:,.0f} ms > {args.slo_registro:,.0f}")
+    if r["errores"] > args.slo_errores:
+        fallas.append(f"errores {r['errores']:.1%} > {args.slo_errores:.1%}")
+    if r["sin_entregar"]:
+        fallas.append(f"{r['sin_entregar']} registros sin llegar a Sheets")
+    return fallas
+
+
+def _formato(metrica, valor):
+    if valor is None:
+        return "-"
+    if metrica == "errores":
+        return f"{valor:.1%}"
+    if metrica in ("sesiones", "reintentos_429"):
+        return f"{valor:,}"
+    return f"{valor:,.1f}"
+
+
+def _imprimir(resultados, args):
+    print(" | ".join(f"{c:>15}" for c in METRICAS + ["slo"]))
+    fallo = False
+    for r in resultados:
+        if "error" in r:
+            print(f"{r['sesiones']:>15,} | error: {r['error']}")
+            fallo = True
+            continue
+        fallas = _incumplidos(r, args)
+        fallo |= bool(fallas)
+        celdas = [f"{_formato(m, r[m]):>15}" for m in METRICAS]
+        print(" | ".join(celdas + [f"{'✅' if not fallas else '❌':>15}"]))
+        print(
+            f"    API: {r['api_llamadas']:,} llamadas, {r['api_429']:,} respondidas con 429 · "
+            f"cola: {r['entregadas']:,} filas entregadas en {r['cola_s']:,.1f} s · "
+            f"memoria: {r['mb_inicial']:,.0f} → {r['mb_final']:,.0f} MB"
+        )
+        for falla in fallas:
+            print(f"    ❌ {r['sesiones']} sesiones: {falla}")
+        for error, veces in sorted(r["detalle_errores"].items(), key=lambda e: -e[1])[:5]:
+            print(f"    · {veces} × {error}")
+    return fallo
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Prueba de carga de 📋 Registro contra una API de Sheets falsa")
+    parser.add_argument("--sesiones", type=int, nargs="+", default=NIVELES, help="sesiones simultáneas")
+    parser.add_argument("--skus", type=int, default=10_000, help="tamaño de HFB")
+    parser.add_argument("--personas", type=int, default=200, help="filas de VIGILANTES y USUARIOS WH")
+    parser.add_argument("--registros", type=int, default=10_000, help="filas de cada hoja de transacciones")
+    parser.add_argument("--latencia", type=float, default=0.2, help="segundos por llamada a la API")
+    parser.add_argument("--tasa-429", type=float, default=0.0, help="probabilidad de responder 429")
+    parser.add_argument("--por-minuto", type=int, help="llamadas por minuto antes de responder 429")
+    parser.add_argument("--slo-rerun", type=float, default=SLO_RERUN_P95_MS, help="p95 máximo de un rerun (ms)")
+    parser.add_argument("--slo-registro", type=float, default=SLO_REGISTRO_P95_MS, help="p95 máximo al registrar (ms)")
+    parser.add_argument("--slo-errores", type=float, default=SLO_ERRORES, help="fracción máxima de sesiones fallidas")
+    parser.add_argument("--guardar", help="archivo JSON donde guardar los resultados")
+    parser.add_argument("--hijo", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.hijo:
+        resultado = medir_carga(
+            args.sesiones[0], args.skus, args.personas, args.registros,
+            args.latencia, args.tasa_429, args.por_minuto
+        )
+        print(json.dumps(resultado))
+        return
+
+    resultados = []
+    for sesiones in args.sesiones:
+        resultados.append(_ejecutar(sesiones, args))
+        print(f"· {sesiones} sesiones", file=sys.stderr)
+
+    fallo = _imprimir(resultados, args)
+
+    if args.guardar:
+        with open(args.guardar, "w") as f:
+            json.dump({
+                "fecha": time.strftime("%Y-%m-%d %H:%M:%S"),
+                "parametros": {
+                    "skus": args.skus, "personas": args.personas, "registros": args.registros,
+                    "latencia": args.latencia, "tasa_429": args.tasa_429, "por_minuto": args.por_minuto,
+                },
+                "resultados": resultados,
+            }, f, indent=2)
+    sys.exit(1 if fallo else 0)
+
+
+if __name__ == "__main__":
+    main()
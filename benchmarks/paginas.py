@@ -0,0 +1,288 @@
+import argparse
+import gc
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import date, time as hora
+
+# === CONFIGURACIÓN ===
+# Mide cada página con el arnés de pruebas de Streamlit (AppTest) contra un libro
+# falso en memoria. Cada combinación de tamaño y página corre en un proceso nuevo,
+# así el arranque en frío incluye autorización, espejo vacío y cachés vacías.
+#
+#   python -m benchmarks.paginas                         # 1k, 10k, 100k y 500k SKU
+#   python -m benchmarks.paginas --skus 1000 --latencia 0.2 --guardar base.json
+#   python -m benchmarks.paginas --comparar base.json    # diferencia contra una base
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PAGINAS = {
+    "recuperaciones": "pages.1_recuperaciones_cctv",
+    "recibo": "pages.2_auditoria_recibo",
+    "warehouse": "pages.3_auditoria_warehouse",
+    "consulta": "pages.consulta",
+    "reportes": "pages.reportes",
+}
+
+TAMANOS = [1_000, 10_000, 100_000, 500_000]
+RERUNS = 10          # ejecuciones en caliente por página
+SESIONES = 5         # sesiones extra para estimar la memoria por sesión
+
+METRICAS = ["frio_ms", "rerun_p50_ms", "rerun_p95_ms", "sku_ms", "registro_ms", "mb_sesion", "mb_proceso"]
+
+SECRETOS = {"connections": {"gsheets": {"spreadsheet": "libro-falso", "credentials": {"type": "service_account"}}}}
+
+
+# === GUION QUE EJECUTA APPTEST ===
+def _guion(modulo):
+    import importlib
+
+    from utils.cola_escritura import iniciar_trabajador
+    from utils.espejo import iniciar_refresco
+
+    iniciar_trabajador()
+    iniciar_refresco()
+    importlib.import_module(modulo).run()
+
+
+def _sesion(modulo):
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_function(_guion, args=(modulo,), default_timeout=600)
+    for clave, valor in SECRETOS.items():
+        at.secrets[clave] = valor
+    return at
+
+
+def _ms(accion):
+    inicio = time.perf_counter()
+    accion()
+    return (time.perf_counter() - inicio) * 1000
+
+
+def _widget(elementos, etiqueta):
+    for elemento in elementos:
+        if etiqueta in elemento.label:
+            return elemento
+    raise KeyError(etiqueta)
+
+
+def _errores(at):
+    return [e.value for e in at.error] + [e.value for e in at.exception]
+
+
+def _memoria_mb():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except OSError:
+        import resource
+
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+# === ESCENARIOS ===
+# El arranque en frío incluye la apertura del formulario. Cada escenario llena la
+# página y devuelve las latencias de elegir un SKU y de registrar (None si no aplica).
+def _elegir_sku(at, sku):
+    _widget(at.text_input, "Buscar SKU").set_value(sku[:6]).run()
+    return _ms(lambda: _widget(at.selectbox, "SKU").set_value(sku).run())
+
+
+def _abrir_formulario(at):
+    # Las páginas con tienda solo muestran el formulario (y cargan HFB) al elegirla
+    _widget(at.selectbox, "tiendas").set_value("IKEA NQS").run()
+
+
+def _preparar_tienda(at):
+    _widget(at.date_input, "Fecha").set_value(date(2025, 10, 3)).run()
+    _widget(at.time_input, "Hora").set_value(hora(14, 30)).run()
+
+
+def _recuperaciones(at, sku):
+    _preparar_tienda(at)
+    sku_ms = _elegir_sku(at, sku)
+    _widget(at.number_input, "Valor").set_value(1200).run()
+    return sku_ms, _ms(lambda: _widget(at.button, "Registrar").click().run())
+
+
+def _recibo(at, sku):
+    _preparar_tienda(at)
+    _widget(at.text_area, "novedad").set_value("Caja abierta").run()
+    return None, _ms(lambda: _widget(at.button, "Registrar").click().run())
+
+
+def _warehouse(at, sku):
+    _widget(at.date_input, "Fecha").set_value(date(2025, 10, 3)).run()
+    _widget(at.text_input, "Número de documento").set_value("OLPN-1").run()
+    sku_ms = _elegir_sku(at, sku)
+    _widget(at.number_input, "Valor unitario").set_value(500).run()
+    return sku_ms, _ms(lambda: _widget(at.button, "Registrar").click().run())
+
+
+def _consulta(at, sku):
+    return _ms(lambda: _widget(at.text_input, "SKU").set_value(sku).run()), None
+
+
+def _reportes(at, sku):
+    return None, None
+
+
+APERTURA = {
+    "recuperaciones": _abrir_formulario,
+    "recibo": _abrir_formulario,
+}
+
+ESCENARIOS = {
+    "recuperaciones": _recuperaciones,
+    "recibo": _recibo,
+    "warehouse": _warehouse,
+    "consulta": _consulta,
+    "reportes": _reportes,
+}
+
+
+# === MEDICIÓN DE UNA PÁGINA (proceso hijo) ===
+def medir_pagina(pagina, skus, personas, registros, latencia, por_fila):
+    # El espejo, la cola y los secretos viven en un directorio temporal propio
+    directorio = tempfile.mkdtemp(prefix="bench-reportes-")
+    os.makedirs(os.path.join(directorio, ".streamlit"))
+    with open(os.path.join(directorio, ".streamlit", "secrets.toml"), "w") as f:
+        f.write('[connections.gsheets]\nspreadsheet = "libro-falso"\n'
+                '[connections.gsheets.credentials]\ntype = "service_account"\n')
+    os.environ["REPORTES_DATOS"] = os.path.join(directorio, "datos")
+    os.chdir(directorio)
+    sys.path.insert(0, RAIZ)
+
+    from benchmarks import sheets_falso
+
+    libro = sheets_falso.libro_sintetico(skus, personas, registros, latencia, por_fila)
+    sheets_falso.instalar(libro)
+    sku = libro.hojas["HFB"].filas[1 + skus // 2][0]
+    modulo = PAGINAS[pagina]
+
+    gc.collect()
+    memoria_inicial = _memoria_mb()
+    at = _sesion(modulo)
+    frio = _ms(at.run)
+    if pagina in APERTURA:
+        frio += _ms(lambda: APERTURA[pagina](at))
+    if _errores(at):
+        raise RuntimeError(f"{pagina}: {_errores(at)}")
+
+    reruns = sorted(_ms(at.run) for _ in range(RERUNS))
+    sku_ms, registro_ms = ESCENARIOS[pagina](at, sku)
+    if _errores(at):
+        raise RuntimeError(f"{pagina}: {_errores(at)}")
+
+    # Memoria: lo que asigna cada sesión adicional viva sobre cachés ya calientes
+    gc.collect()
+    tracemalloc.start()
+    sesiones = []
+    for _ in range(SESIONES):
+        otra = _sesion(modulo)
+        otra.run()
+        if pagina in APERTURA:
+            APERTURA[pagina](otra)
+        sesiones.append(otra)
+    gc.collect()
+    mb_sesion = tracemalloc.get_traced_memory()[0] / 2**20 / SESIONES
+    tracemalloc.stop()
+
+    return {
+        "pagina": pagina,
+        "skus": skus,
+        "frio_ms": frio,
+        "rerun_p50_ms": statistics.median(reruns),
+        "rerun_p95_ms": reruns[min(len(reruns) - 1, round(0.95 * (len(reruns) - 1)))],
+        "sku_ms": sku_ms,
+        "registro_ms": registro_ms,
+        "mb_sesion": mb_sesion,
+        "mb_proceso": _memoria_mb() - memoria_inicial,
+    }
+
+
+# === ORQUESTACIÓN Y REPORTE ===
+def _ejecutar(pagina, skus, args):
+    comando = [
+        sys.executable, "-m", "benchmarks.paginas", "--hijo", pagina,
+        "--skus", str(skus), "--personas", str(args.personas), "--registros", str(args.registros),
+        "--latencia", str(args.latencia), "--por-fila", str(args.por_fila),
+    ]
+    salida = subprocess.run(comando, cwd=RAIZ, capture_output=True, text=True)
+    if salida.returncode != 0:
+        print(salida.stderr[-2000:], file=sys.stderr)
+        return {"pagina": pagina, "skus": skus, "error": salida.stderr.strip().splitlines()[-1:]}
+    return json.loads(salida.stdout.strip().splitlines()[-1])
+
+
+def _formato(valor):
+    return "-" if valor is None else f"{valor:,.1f}"
+
+
+def _imprimir(resultados, base=None):
+    referencia = {(r["pagina"], r["skus"]): r for r in base or []}
+    columnas = ["pagina", "skus"] + METRICAS
+    print(" | ".join(f"{c:>14}" for c in columnas))
+    for r in resultados:
+        if "error" in r:
+            print(f"{r['pagina']:>14} | {r['skus']:>14} | error: {r['error']}")
+            continue
+        celdas = [f"{r['pagina']:>14}", f"{r['skus']:>14,}"]
+        anterior = referencia.get((r["pagina"], r["skus"]), {})
+        for metrica in METRICAS:
+            texto = _formato(r[metrica])
+            if anterior.get(metrica) and r[metrica] is not None:
+                texto += f" ({(r[metrica] / anterior[metrica] - 1) * 100:+.0f}%)"
+            celdas.append(f"{texto:>14}")
+        print(" | ".join(celdas))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de las páginas contra un Google Sheets falso")
+    parser.add_argument("--skus", type=int, nargs="+", default=TAMANOS, help="tamaños de HFB")
+    parser.add_argument("--paginas", nargs="+", choices=list(PAGINAS), default=list(PAGINAS))
+    parser.add_argument("--personas", type=int, default=200, help="filas de VIGILANTES y USUARIOS WH")
+    parser.add_argument("--registros", type=int, default=10_000, help="filas de cada hoja de transacciones")
+    parser.add_argument("--latencia", type=float, default=0.0, help="segundos por llamada a la API")
+    parser.add_argument("--por-fila", type=float, default=0.0, help="segundos por fila descargada")
+    parser.add_argument("--guardar", help="archivo JSON donde guardar los resultados")
+    parser.add_argument("--comparar", help="archivo JSON de una ejecución anterior")
+    parser.add_argument("--hijo", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.hijo:
+        resultado = medir_pagina(args.hijo, args.skus[0], args.personas, args.registros, args.latencia, args.por_fila)
+        print(json.dumps(resultado))
+        return
+
+    resultados = []
+    for skus in args.skus:
+        for pagina in args.paginas:
+            resultados.append(_ejecutar(pagina, skus, args))
+            print(f"· {pagina} con {skus:,} SKU", file=sys.stderr)
+
+    base = None
+    if args.comparar:
+        with open(args.comparar) as f:
+            base = json.load(f)["resultados"]
+    _imprimir(resultados, base)
+
+    if args.guardar:
+        with open(args.guardar, "w") as f:
+            json.dump({
+                "fecha": time.strftime("%Y-%m-%d %H:%M:%S"),
+                "parametros": {
+                    "personas": args.personas, "registros": args.registros,
+                    "latencia": args.latencia, "por_fila": args.por_fila,
+                },
+                "resultados": resultados,
+            }, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,295 @@
+import json
+import random
+import re
+import threading
+import time
+from collections import deque
+from datetime import date, timedelta
+from urllib.parse import unquote, urlparse
+
+import gspread
+from google.oauth2 import credentials, service_account
+from gspread.utils import a1_range_to_grid_range
+
+from utils.esquemas import COLUMNAS
+from utils.fechas import MESES, DIAS, rango_horas
+from utils.metricas import contar, medir
+from utils.opciones import (
+    TIENDAS, PISOS, UBICACIONES, PROCESOS_AUDITORIA, NOVEDADES, TIPOS_DOCUMENTO,
+    AUDITORES, TIPOS_NOVEDAD, AREAS_WAREHOUSE
+)
+
+# === LIBRO FALSO EN MEMORIA ===
+# Reemplaza a gspread dentro del proceso: mismas llamadas que usa la app
+# (worksheets, get_values, values_batch_get, append_rows) con una latencia
+# configurable por llamada y por fila devuelta.
+class HojaFalsa:
+    def __init__(self, libro, titulo, filas, id):
+        self.libro = libro
+        self.title = titulo
+        self.id = id
+        self.filas = filas
+
+    def _rango(self, rango, formato):
+        grilla = a1_range_to_grid_range(rango) if rango else {}
+        fila_inicio = grilla.get("startRowIndex", 0)
+        fila_fin = grilla.get("endRowIndex", len(self.filas))
+        col_inicio = grilla.get("startColumnIndex", 0)
+        col_fin = grilla.get("endColumnIndex", None)
+        valores = [f[col_inicio:col_fin] for f in self.filas[fila_inicio:fila_fin]]
+        if formato:
+            # Sin valueRenderOption la API devuelve todo como texto
+            valores = [["" if v is None else str(v) for v in f] for f in valores]
+        return valores
+
+    def get_values(self, rango=None, value_render_option=None, **kwargs):
+        with self.libro.llamada("get"):
+            with self.libro.lock:
+                valores = self._rango(rango, value_render_option is None)
+            self.libro.transferir(len(valores))
+            return valores
+
+    def _agregar(self, filas):
+        with self.libro.lock:
+            inicio = len(self.filas) + 1
+            self.filas.extend([["" if v is None else v for v in f] for f in filas])
+            fin = len(self.filas)
+        return {"updates": {"updatedRange": f"'{self.title}'!A{inicio}:Z{fin}", "updatedRows": len(filas)}}
+
+    def append_rows(self, filas, **kwargs):
+        with self.libro.llamada("append"):
+            return self._agregar(filas)
+
+    def append_row(self, fila, **kwargs):
+        return self.append_rows([fila], **kwargs)
+
+
+class LibroFalso:
+    id = "libro-falso"
+
+    def __init__(self, hojas, latencia=0.0, por_fila=0.0):
+        self.latencia = latencia
+        self.por_fila = por_fila
+        self.lock = threading.Lock()
+        self.hojas = {titulo: HojaFalsa(self, titulo, filas, i) for i, (titulo, filas) in enumerate(hojas.items())}
+
+    def llamada(self, operacion):
+        # Misma contabilidad que el cliente HTTP medido de utils.conexion
+        contar("api")
+        if self.latencia:
+            time.sleep(self.latencia)
+        return medir(f"api:{operacion}")
+
+    def transferir(self, filas):
+        if self.por_fila:
+            time.sleep(filas * self.por_fila)
+
+    def worksheets(self):
+        with self.llamada("get"):
+            return list(self.hojas.values())
+
+    def worksheet(self, titulo):
+        with self.llamada("get"):
+            return self.hojas[titulo]
+
+    def _lotes(self, rangos, params):
+        formato = (params or {}).get("valueRenderOption") is None
+        respuesta = []
+        with self.lock:
+            for rango in rangos:
+                titulo, _, celdas = rango.rpartition("!") if "!" in rango else (rango, "", "")
+                valores = self.hojas[titulo.strip("'")]._rango(celdas or None, formato)
+                while valores and not any(valores[-1]):
+                    valores.pop()
+                respuesta.append({"range": rango, "values": valores})
+        self.transferir(sum(len(r["values"]) for r in respuesta))
+        return {"valueRanges": respuesta}
+
+    def values_batch_get(self, rangos, params=None):
+        with self.llamada("batchGet"):
+            return self._lotes(rangos, params)
+
+
+class ClienteFalso:
+    def __init__(self, libro):
+        self.libro = libro
+
+    def open_by_key(self, clave):
+        with self.libro.llamada("get"):
+            return self.libro
+
+
+def instalar(libro):
+    # Desde aquí utils.conexion autoriza y abre el libro falso
+    service_account.Credentials.from_service_account_info = staticmethod(lambda *a, **k: object())
+    gspread.authorize = lambda *a, **k: ClienteFalso(libro)
+
+
+# === API HTTP FALSA ===
+# Para pruebas de carga: en lugar de gspread se reemplaza la sesión HTTP, así que
+# corre el cliente real completo (ClienteMedido, cuota, reintentos ante 429) contra
+# el mismo libro en memoria. Cada llamada puede tardar `latencia` segundos,
+# responder 429 con probabilidad `tasa_429` y, con `por_minuto`, responder 429 a
+# todo lo que supere ese límite en los últimos 60 segundos, como la cuota real.
+_METADATOS = re.compile(r"/v4/spreadsheets/[^/]+$")
+_LOTE = re.compile(r"/v4/spreadsheets/[^/]+/values:batchGet$")
+_AGREGAR = re.compile(r"/v4/spreadsheets/[^/]+/values/(.+):append$")
+
+
+class RespuestaFalsa:
+    def __init__(self, codigo, cuerpo, encabezados=None):
+        self.status_code = codigo
+        self.ok = codigo < 400
+        self.headers = encabezados or {}
+        self.text = json.dumps(cuerpo)
+        self._cuerpo = cuerpo
+
+    def json(self):
+        return self._cuerpo
+
+
+def _error(codigo, mensaje, estado):
+    return RespuestaFalsa(codigo, {"error": {"code": codigo, "message": mensaje, "status": estado}})
+
+
+class SesionFalsa:
+    def __init__(self, libro, tasa_429=0.0, por_minuto=None, semilla=0):
+        self.libro = libro
+        self.tasa_429 = tasa_429
+        self.por_minuto = por_minuto
+        self.headers = {}
+        self.llamadas = 0
+        self.rechazadas = 0
+        self._azar = random.Random(semilla)
+        self._recientes = deque()
+        self._lock = threading.Lock()
+
+    def _rechazar(self):
+        with self._lock:
+            self.llamadas += 1
+            ahora = time.monotonic()
+            while self._recientes and self._recientes[0] < ahora - 60:
+                self._recientes.popleft()
+            rechazar = self._azar.random() < self.tasa_429 or (
+                self.por_minuto is not None and len(self._recientes) >= self.por_minuto
+            )
+            if rechazar:
+                self.rechazadas += 1
+            else:
+                self._recientes.append(ahora)
+            return rechazar
+
+    def _responder(self, metodo, ruta, params, cuerpo):
+        if metodo == "GET" and _METADATOS.search(ruta):
+            with self.libro.lock:
+                hojas = [
+                    {"properties": {
+                        "sheetId": hoja.id, "title": hoja.title, "index": hoja.id, "sheetType": "GRID",
+                        "gridProperties": {"rowCount": max(1000, len(hoja.filas)), "columnCount": 26},
+                    }}
+                    for hoja in self.libro.hojas.values()
+                ]
+            return {"spreadsheetId": self.libro.id, "properties": {"title": "Libro falso"}, "sheets": hojas}
+        if metodo == "GET" and _LOTE.search(ruta):
+            rangos = params.get("ranges", [])
+            return self.libro._lotes([rangos] if isinstance(rangos, str) else rangos, params)
+        agregar = _AGREGAR.search(ruta)
+        if metodo == "POST" and agregar:
+            titulo = unquote(agregar.group(1)).rpartition("!")[0] or unquote(agregar.group(1))
+            return self.libro.hojas[titulo.strip("'")]._agregar(cuerpo["values"])
+        return None
+
+    def request(self, method, url, params=None, json=None, **kwargs):
+        if self.libro.latencia:
+            time.sleep(self.libro.latencia)
+        if self._rechazar():
+            return _error(429, "Quota exceeded for quota metric 'Read requests'", "RESOURCE_EXHAUSTED")
+        try:
+            cuerpo = self._responder(method.upper(), urlparse(url).path, params or {}, json)
+        except KeyError as e:
+            return _error(400, f"Unable to parse range: {e}", "INVALID_ARGUMENT")
+        if cuerpo is None:
+            return _error(404, f"No existe {method} {url}", "NOT_FOUND")
+        return RespuestaFalsa(200, cuerpo)
+
+    def close(self):
+        pass
+
+
+def instalar_http(libro, tasa_429=0.0, por_minuto=None):
+    # utils.conexion autoriza con gspread real; solo cambian las credenciales y la
+    # sesión HTTP que gspread crea para ellas
+    sesion = SesionFalsa(libro, tasa_429, por_minuto)
+    service_account.Credentials.from_service_account_info = staticmethod(
+        lambda *a, **k: credentials.Credentials(token="falso")
+    )
+    gspread.http_client.AuthorizedSession = lambda *a, **k: sesion
+    return sesion
+
+
+# === DATOS SINTÉTICOS ===
+def _sku(i):
+    return f"{10000000 + i * 7919 % 89999999:08d}"
+
+
+def catalogo_hfb(skus):
+    filas = [["SKU", "ITEM", "FAMILIA", "PVP"]]
+    for i in range(skus):
+        filas.append([_sku(i), f"PRODUCTO {i} {['MESA', 'SILLA', 'LAMPARA', 'CAJA'][i % 4]}", f"FAMILIA {i % 40}", 1000 + i % 500 * 100])
+    return filas
+
+
+def vigilantes(cantidad):
+    filas = [["ID_TIENDA", "NOMBRE VIGILANTE"]]
+    ids = list(TIENDAS.values())
+    filas.extend([[ids[i % len(ids)], f"Vigilante {i}"] for i in range(cantidad)])
+    return filas
+
+
+def usuarios_wh(cantidad):
+    return [["NOMBRE", "USUARIO"]] + [[f"Picker {i}", f"{100000 + i}"] for i in range(cantidad)]
+
+
+def transacciones(nombre, cantidad, skus, semilla=0):
+    azar = random.Random(semilla)
+    tiendas = list(TIENDAS)
+    filas = [list(COLUMNAS[nombre])]
+    for i in range(cantidad):
+        dia = date(2025, 1, 1) + timedelta(days=azar.randrange(600))
+        hora = azar.randrange(24)
+        sku = _sku(azar.randrange(max(1, skus)))
+        registro = f"{dia} {hora:02d}:00:00"
+        if nombre == "RECUPERACIONES":
+            cantidad_uds, pvp = azar.randint(1, 5), azar.randrange(1000, 500000, 100)
+            filas.append([
+                registro, azar.choice(tiendas), str(dia), f"{hora:02d}:00:00", f"Vigilante {azar.randrange(200)}",
+                azar.choice(PISOS), azar.choice(UBICACIONES), "No aplica", "", azar.randrange(1, 60), sku,
+                f"FAMILIA {azar.randrange(40)}", "PRODUCTO", cantidad_uds, pvp, cantidad_uds * pvp, "",
+                MESES[dia.month - 1], DIAS[dia.weekday()], rango_horas(hora)
+            ])
+        elif nombre == "AUDITORIA BODEGA":
+            filas.append([
+                registro, azar.choice(tiendas), str(dia), f"{hora:02d}:00:00", f"Vigilante {azar.randrange(200)}",
+                "Caja abierta", "", MESES[dia.month - 1], DIAS[dia.weekday()], rango_horas(hora)
+            ])
+        else:
+            cantidad_uds, costo = azar.randint(1, 5), azar.randrange(1000, 200000, 100)
+            filas.append([
+                registro, str(dia), azar.choice(PROCESOS_AUDITORIA), azar.choice(NOVEDADES),
+                azar.choice(TIPOS_DOCUMENTO), f"D{i}", sku, azar.choice(AUDITORES),
+                f"Picker {azar.randrange(300)}", f"{100000 + azar.randrange(300)}", "",
+                azar.choice(TIPOS_NOVEDAD), azar.choice(AREAS_WAREHOUSE),
+                cantidad_uds, costo, cantidad_uds * costo, dia.isocalendar()[1]
+            ])
+    return filas
+
+
+def libro_sintetico(skus=1000, personas=200, registros=10000, latencia=0.0, por_fila=0.0):
+    return LibroFalso({
+        "VIGILANTES": vigilantes(personas),
+        "HFB": catalogo_hfb(skus),
+        "RECUPERACIONES": transacciones("RECUPERACIONES", registros, skus, 1),
+        "AUDITORIA BODEGA": transacciones("AUDITORIA BODEGA", registros, skus, 2),
+        "WAREHOUSE": transacciones("WAREHOUSE", registros, skus, 3),
+        "USUARIOS WH": usuarios_wh(personas),
+    }, latencia, por_fila)
@@ -1,240 +1,178 @@
 import streamlit as st
-import pandas as pd
-import gspread
-from google.oauth2 import service_account
-from datetime import datetime, timedelta
+from datetime import datetime
 from zoneinfo import ZoneInfo
-    
-def run():    
-    # === CONFIGURACIÓN ===
-    st.title("🧾 Formato para reporte de Auditorías en Warehouse")
-    
-    # === CREDENCIALES ===
-    credentials = service_account.Credentials.from_service_account_info(
-        st.secrets["connections"]["gsheets"]["credentials"],
-        scopes=["https://www.googleapis.com/auth/spreadsheets"]
-    )
-    
-    gc = gspread.authorize(credentials)
-    spreadsheet_id = st.secrets["connections"]["gsheets"]["spreadsheet"]
-    sh = gc.open_by_key(spreadsheet_id)
-    
-    # === CARGA DE DATOS CON CACHE (TTL = 7 días) ===
-    @st.cache_data(ttl=7*24*60*60)  # 7 días en segundos
-    def load_worksheet_data(sheet_name):
-        ws = sh.worksheet(sheet_name)
-        return pd.DataFrame(ws.get_all_records())
-    
-    # === CARGA DE HOJAS ===
-    df_sku = load_worksheet_data("HFB")
-    df_sku["SKU"] = df_sku["SKU"].astype(str).str.zfill(8)
-    df_usuarioswh = load_worksheet_data("USUARIOS WH")
-    recuperaciones_ws = sh.worksheet("WAREHOUSE")
-    
-    # === INTERFAZ ===
-    fecha = st.date_input("📅 Fecha de la recuperación", value=None)
-    
-    proceso_auditoria = st.selectbox(
+
+from utils.cola_escritura import encolar
+from utils.espejo import precargar
+from utils.catalogo_sku import obtener_catalogo_sku
+from utils.metricas import medido, medir
+from utils.opciones import (
+    PROCESOS_AUDITORIA, NOVEDADES, TIPOS_DOCUMENTO, AUDITORES, TIPOS_NOVEDAD, AREAS_WAREHOUSE
+)
+from utils.usuarios_wh import usuarios_wh
+from utils.widgets import selector_nombre, selector_sku
+
+# Catálogos de la página: si no están en el espejo se descargan en una sola llamada
+CATALOGOS = ["HFB", "USUARIOS WH"]
+
+# Cada sección es un fragmento: al interactuar con ella solo se vuelve a ejecutar
+# esa sección. Los valores se leen de st.session_state al registrar.
+
+# === AUDITORÍA ===
+@st.fragment
+@medido("auditoria")
+def _auditoria():
+    st.date_input("📅 Fecha de la recuperación", value=None, key="wh_fecha")
+
+    st.selectbox(
         "Indica el proceso de auditoria",
-        ["Auditoria DO ECOM",
-        "Auditoria DESTR",
-        "Auditoria Tienda",
-        "Auditoria INV",
-        "Auditoria AS-IS",
-        "Plan Enfermero"],
+        PROCESOS_AUDITORIA,
         placeholder="Auditoria",
-        index=None
+        index=None,
+        key="wh_proceso"
     )
-    
-    if fecha:
-        mes = fecha.month
-        dia = fecha.weekday()
-        
-        match mes:
-            case 1:
-                mes = "Enero"
-            case 2:
-                mes = "Febrero"
-            case 3:
-                mes = "Marzo"
-            case 4:
-                mes = "Abril"
-            case 5:
-                mes = "Mayo"
-            case 6:
-                mes = "Junio"
-            case 7:
-                mes = "Julio"
-            case 8:
-                mes = "Agosto"
-            case 9:
-                mes = "Septiembre"
-            case 10:
-                mes = "Octubre"
-            case 11:
-                mes = "Noviembre"
-            case 12:
-                mes = "Diciembre"
-                        
-        match dia:
-            case 0:
-                dia = "Lunes"
-            case 1:
-                dia = "Martes"
-            case 2:
-                dia = "Miercoles"
-            case 3:
-                dia = "Jueves"
-            case 4:
-                dia = "Viernes"
-            case 5:
-                dia = "Sabado"
-            case 6:
-                dia = "Domingo"
-    
-    novedad = st.selectbox(
+
+    st.selectbox(
         "¿Que novedad se presentó?",
-        [
-            "SOBRANTE",
-            "AVERIA",
-            "FALTANTE",
-            "IMPRESO",
-            "TROQUE",
-            "SIN SKU",
-            "OLPN EN  MAL ESTADO",
-            "RECUPERACION",
-            "OLPN SIN AUDITAR",
-            "OLPN  EN ESTADO ENVIADO",
-            "ETIQUETA",
-            "OLPN RE IMPRESO Y TROCADO"
-        ],
+        NOVEDADES,
         placeholder="Selecciona una de las opciones",
         accept_new_options=True,
-        index=None
+        index=None,
+        key="wh_novedad"
     )
-    
-    tipo_documento = st.radio(
+
+# === DOCUMENTO ===
+@st.fragment
+@medido("documento")
+def _documento():
+    st.radio(
         "Indica el tipo de documento",
-        ["OLPN", "ILPN"],
-        index=None
+        TIPOS_DOCUMENTO,
+        index=None,
+        key="wh_tipo_documento"
     )
-    
-    numero_documento = st.text_input("💻 Número de documento")  
-    
-    lista_sku = st.selectbox(
-        "📦 SKU", 
-        df_sku["SKU"].dropna().tolist(),
-        placeholder= "Ingresa el SKU del producto",
-        index=None
-        )
-    
+
+    st.text_input("💻 Número de documento", key="wh_numero_documento")
+
+# === PRODUCTO ===
+@st.fragment
+@medido("producto")
+def _producto():
+    catalogo_sku = obtener_catalogo_sku()
+    lista_sku = selector_sku(catalogo_sku, key="sku_warehouse", aceptar_nuevos=False)
+
     if lista_sku:
-        producto = df_sku.loc[df_sku["SKU"] == lista_sku, "ITEM"].iloc[0]
-        familia = df_sku.loc[df_sku["SKU"] == lista_sku, "FAMILIA"].iloc[0]
-        st.info(f"🛒 Producto: **{producto}**, Familia: **{familia}**")
+        info_sku = catalogo_sku.buscar(lista_sku) or {"ITEM": "", "FAMILIA": ""}
+        st.info(f"🛒 Producto: **{info_sku['ITEM']}**, Familia: **{info_sku['FAMILIA']}**")
     else:
         st.warning("⚠️ Debes seleccionar uno de los SKU de las opciones")
-    
-    auditor = st.selectbox(
+
+# === AUDITOR Y USUARIO WH ===
+@st.fragment
+@medido("personas")
+def _personas():
+    st.selectbox(
         "👮 Nombre de auditor",
-        [
-            "Felipe Gutierrez",
-            "Yulieth Parada",
-            "Jessica Camacho",
-            "Linda Sandoval",
-            "Jhon Ballesteros",
-            "Angel Mendez",
-            "Laura Alvarez"
-        ],
+        AUDITORES,
         placeholder="Auditor",
         accept_new_options=True,
-        index=None
+        index=None,
+        key="wh_auditor"
     )
-    
-    opciones_usuarios = [
-        f"{row['NOMBRE']} ({row['USUARIO']})"
-        for _, row in df_usuarioswh.iterrows()
-    ]
-    
-    lista_usuarioswh = st.selectbox(
-        "📦 Usuario WH", 
-        opciones_usuarios,
-        placeholder= "Ingresa el usuario que reporta",
-        index=None
-        )
-    
-    if lista_usuarioswh:
-        usuario = lista_usuarioswh.split("(")[-1].replace(")", "").strip()
-        worker = df_usuarioswh.loc[df_usuarioswh["USUARIO"] == usuario].iloc[0]
-        st.success(f"Seleccionaste a **{worker['NOMBRE']}** (picker: {worker['USUARIO']})")
-    
-        picker = worker['NOMBRE']
-        documento_usuario = worker['USUARIO']
-        st.write(picker, documento_usuario)
-    
-    observaciones = st.text_area("📝 Descripción de la novedad")
-    
-    tipo_novedad = st.selectbox(
-        "🏬 Tipo de Novedad", 
-        ["Print",
-        "Faltante",
-        "Sobrantes",
-        "Etiqueta Mal ubicada",
-        "Averia Productos",
-        "Reimpreso",
-        "Troque",
-        "Sin auditar",
-        "Recuperación",
-        "Producto de Asis"],
+
+    # El selectbox devuelve el código de usuario; el nombre sale del diccionario
+    indice, nombres = usuarios_wh()
+    usuario = selector_nombre(
+        indice,
+        "📦 Usuario WH",
+        key="wh_usuario",
+        placeholder="Ingresa el usuario que reporta",
+        formato=lambda u: f"{nombres.get(u, '')} ({u})"
+    )
+
+    st.session_state["wh_picker"] = ""
+    st.session_state["wh_documento_usuario"] = ""
+    if usuario:
+        nombre = nombres.get(usuario, "")
+        st.success(f"Seleccionaste a **{nombre}** (picker: {usuario})")
+
+        st.session_state["wh_picker"] = nombre
+        st.session_state["wh_documento_usuario"] = usuario
+        st.write(nombre, usuario)
+
+# === NOVEDAD ===
+@st.fragment
+@medido("novedad")
+def _novedad():
+    st.text_area("📝 Descripción de la novedad", key="wh_observaciones")
+
+    st.selectbox(
+        "🏬 Tipo de Novedad",
+        TIPOS_NOVEDAD,
         placeholder="Indica la novedad",
-        index=None
+        index=None,
+        key="wh_tipo_novedad"
     )
-    
-    area = st.radio(
+
+    st.radio(
         "📍 Área",
-        ["CP",
-        "INVENTARIOS",
-        "MEZANINE",
-        "NQS",
-        "CALI",
-        "MEDELLIN",
-        "RECOVERY"],
+        AREAS_WAREHOUSE,
         horizontal=False,
-        index=None
+        index=None,
+        key="wh_area"
     )
-    
-    cantidad = st.number_input("📊 Unidades", min_value=1, value=1)
-    costo = st.number_input("💰 Valor unitario", min_value=0, value=0)
+
+# === VALORES ===
+@st.fragment
+@medido("valores")
+def _valores():
+    cantidad = st.number_input("📊 Unidades", min_value=1, value=1, key="wh_cantidad")
+    costo = st.number_input("💰 Valor unitario", min_value=0, value=0, key="wh_costo")
     total = cantidad * costo
     st.write(f"**Total:** ${total:,.0f}")
-    
-    numero_semana = fecha.isocalendar()[1]
-    
-    
+
+# === REGISTRO ===
+@st.fragment
+@medido("registrar")
+def _registrar():
     if st.button("📤 Registrar"):
+        estado = st.session_state
+        fecha = estado.get("wh_fecha")
+        numero_documento = estado.get("wh_numero_documento")
+        cantidad = estado.get("wh_cantidad")
+        costo = estado.get("wh_costo")
+
         # Validar campos obligatorios
-        if not numero_documento or not cantidad or not costo:
+        if not fecha or not numero_documento or not cantidad or not costo:
             st.error("⚠️ Debes completar los campos obligatorios antes de registrar.")
-        else:
-            # Ajuste de hora a Colombia (UTC-5)
-            hora_local = datetime.now(ZoneInfo("America/Bogota"))
-            fecha_registro = (datetime.utcnow() - timedelta(hours=5)).strftime("%Y-%m-%d %H:%M:%S")
-    
-            nueva_fila = [
-                hora_local.strftime("%Y-%m-%d %H:%M:%S"),
-                str(fecha), proceso_auditoria, novedad,
-                tipo_documento,numero_documento, lista_sku,
-                auditor, picker, documento_usuario,
-                observaciones, tipo_novedad, area,
-                cantidad, costo, total, numero_semana
-            ]
-    
-            recuperaciones_ws.append_row(nueva_fila)
-            st.success("✅ Información registrada correctamente.")
-    
-
+            return
 
+        # Ajuste de hora a Colombia (UTC-5)
+        hora_local = datetime.now(ZoneInfo("America/Bogota"))
 
+        nueva_fila = [
+            hora_local.strftime("%Y-%m-%d %H:%M:%S"),
+            str(fecha), estado.get("wh_proceso"), estado.get("wh_novedad"),
+            estado.get("wh_tipo_documento"), numero_documento, estado.get("sku_warehouse"),
+            estado.get("wh_auditor"), estado.get("wh_picker", ""), estado.get("wh_documento_usuario", ""),
+            estado.get("wh_observaciones", ""), estado.get("wh_tipo_novedad"), estado.get("wh_area"),
+            cantidad, costo, cantidad * costo, fecha.isocalendar()[1]
+        ]
 
+        with medir("escritura"):
+            encolar("WAREHOUSE", nueva_fila)
+        st.success("✅ Información registrada correctamente.")
 
+def run():
+    # === CONFIGURACIÓN ===
+    st.title("🧾 Formato para reporte de Auditorías en Warehouse")
+    precargar(CATALOGOS)
 
+    # === INTERFAZ ===
+    _auditoria()
+    _documento()
+    _producto()
+    _personas()
+    _novedad()
+    _valores()
+    _registrar()
@@ -0,0 +1,73 @@
+import hashlib
+
+import streamlit as st
+
+from utils import carga_masiva
+from utils.cola_escritura import encolar_lote
+from utils.metricas import medir
+from utils.espejo import cargar_hoja, precargar
+
+FORMATOS = {
+    "🧾 Recuperaciones CCTV": ("RECUPERACIONES", "VIGILANTES"),
+    "🏭 Auditoría Warehouse": ("WAREHOUSE", "USUARIOS WH"),
+}
+
+def run():
+    # === CONFIGURACIÓN ===
+    st.title("📥 Carga masiva de registros")
+
+    formato = st.radio("Formato", list(FORMATOS), horizontal=True)
+    hoja, hoja_personas = FORMATOS[formato]
+
+    columnas = carga_masiva.REQUERIDAS[hoja] + carga_masiva.OPCIONALES[hoja]
+    st.caption(
+        "Columnas obligatorias: " + ", ".join(f"`{c}`" for c in carga_masiva.REQUERIDAS[hoja])
+        + " · opcionales: " + ", ".join(f"`{c}`" for c in carga_masiva.OPCIONALES[hoja])
+    )
+    st.download_button(
+        "⬇️ Descargar plantilla",
+        ",".join(columnas) + "\n",
+        file_name=f"plantilla_{hoja.lower()}.csv",
+        mime="text/csv"
+    )
+
+    archivo = st.file_uploader("Archivo CSV o Excel", type=["csv", "xlsx"])
+    if not archivo:
+        return
+
+    # === VALIDACIÓN ===
+    try:
+        df = carga_masiva.leer_archivo(archivo)
+        precargar(["HFB", hoja_personas])
+        aceptadas, reporte = carga_masiva.validar(hoja, df, cargar_hoja("HFB"), cargar_hoja(hoja_personas))
+    except Exception as e:
+        st.error(f"⚠️ No se pudo leer el archivo: {e}")
+        return
+
+    rechazadas = reporte[reporte["errores"] != ""]
+    col1, col2, col3 = st.columns(3)
+    col1.metric("Filas", len(reporte))
+    col2.metric("✅ Aceptadas", len(aceptadas))
+    col3.metric("❌ Con errores", len(rechazadas))
+
+    if len(rechazadas):
+        st.subheader("Errores por fila")
+        st.dataframe(rechazadas, hide_index=True)
+    advertencias = reporte[(reporte["errores"] == "") & (reporte["advertencias"] != "")]
+    if len(advertencias):
+        st.subheader("Advertencias")
+        st.dataframe(advertencias, hide_index=True)
+
+    st.subheader("Vista previa")
+    st.dataframe(aceptadas.head(100), hide_index=True)
+
+    # === REGISTRO ===
+    # Un mismo archivo se registra una sola vez por sesión aunque siga cargado
+    huella = f"{hoja}:{hashlib.sha256(archivo.getvalue()).hexdigest()}"
+    if st.session_state.get("carga_registrada") == huella:
+        st.info("Este archivo ya se registró. Cargue otro archivo para registrar más filas.")
+    elif len(aceptadas) and st.button(f"📤 Registrar {len(aceptadas)} filas"):
+        with medir("escritura"):
+            encolar_lote(hoja, carga_masiva.a_filas(aceptadas))
+        st.session_state["carga_registrada"] = huella
+        st.success(f"✅ {len(aceptadas)} filas en cola para {hoja.title()}.")
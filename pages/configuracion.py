@@ -0,0 +1,148 @@
+import os
+import time
+
+import pandas as pd
+import streamlit as st
+
+from utils import arranque, compartido, cuota, espejo, metricas
+from utils.cola_escritura import pendientes
+
+def _hace(segundos):
+    if segundos < 60:
+        return f"{segundos:.0f} s"
+    if segundos < 3600:
+        return f"{segundos / 60:.0f} min"
+    return f"{segundos / 3600:.1f} h"
+
+def run():
+    # === CONFIGURACIÓN ===
+    st.title("⚙️ Configuración")
+
+    # === CATÁLOGOS ===
+    st.header("📚 Catálogos")
+    st.caption("Se actualizan solos en segundo plano; las sesiones siempre usan la última copia descargada.")
+    if compartido.es_lider("refresco"):
+        st.caption(f"🟢 Este proceso ({os.getpid()}) es el que descarga los catálogos para todas las réplicas del servidor.")
+    else:
+        st.caption(f"⚪ Este proceso ({os.getpid()}) usa los catálogos que descarga otra réplica del servidor.")
+    col1, col2 = st.columns([2, 1], vertical_alignment="bottom")
+    with col1:
+        hoja = st.selectbox("Hoja a actualizar", list(espejo.REFRESCO))
+    with col2:
+        if st.button("🔄 Actualizar ahora"):
+            with st.spinner(f"Descargando {hoja}..."):
+                version = espejo.refrescar(hoja)
+            st.toast(f"✅ {hoja} actualizada (versión {version}).")
+
+    ahora = time.time()
+    catalogos = []
+    for nombre, intervalo in espejo.REFRESCO.items():
+        info = espejo.estado(nombre)
+        if info is None:
+            catalogos.append({"Hoja": nombre, "Versión": None, "Filas": None,
+                              "Revisada hace": "nunca", "Próxima revisión": "al primer uso"})
+            continue
+        catalogos.append({
+            "Hoja": nombre,
+            "Versión": info["version"],
+            "Filas": info["filas"],
+            "Revisada hace": _hace(ahora - info["sondeado"]),
+            "Próxima revisión": f"en {_hace(max(0, info['sondeado'] + intervalo - ahora))}",
+        })
+    st.dataframe(pd.DataFrame(catalogos), hide_index=True)
+
+    # === HOJAS DE TRANSACCIONES ===
+    st.subheader("🧾 Hojas de transacciones")
+    st.caption(
+        f"Cada consulta trae solo las filas nuevas y compara {espejo.BLOQUE_BARRIDO} filas ya guardadas; "
+        "si alguna fue editada en la hoja, se corrige en la copia local."
+    )
+    transacciones = []
+    for nombre in espejo.TRANSACCIONES:
+        info = espejo.estado(nombre)
+        if info is None:
+            continue
+        transacciones.append({
+            "Hoja": nombre,
+            "Versión": info["version"],
+            "Filas": info["filas"],
+            "Consultada hace": _hace(ahora - info["sondeado"]),
+            "Barrido en fila": info["barrido"],
+            "Última vuelta completa": f"hace {_hace(ahora - info['revisado'])}",
+        })
+    if transacciones:
+        st.dataframe(pd.DataFrame(transacciones), hide_index=True)
+    else:
+        st.info("Ninguna hoja de transacciones se ha descargado todavía.")
+
+    # === DIAGNÓSTICO DE RENDIMIENTO ===
+    st.header("⏱️ Diagnóstico de rendimiento")
+    st.caption(
+        f"Percentiles sobre las últimas {metricas.MUESTRAS} ejecuciones de cada fase en este servidor. "
+        f"'{metricas.FONDO}' agrupa la cola de escritura y otros hilos en segundo plano."
+    )
+
+    fases = pd.DataFrame(metricas.resumen())
+    if fases.empty:
+        st.info("Aún no hay mediciones. Abre alguno de los módulos para empezar a registrar tiempos.")
+    else:
+        paginas = sorted(fases["pagina"].unique())
+        pagina = st.selectbox("📄 Página", paginas, placeholder="Todas", index=None)
+        if pagina:
+            fases = fases[fases["pagina"] == pagina]
+        st.dataframe(
+            fases,
+            hide_index=True,
+            column_config={
+                columna: st.column_config.NumberColumn(format="%.1f")
+                for columna in ("p50 ms", "p95 ms", "p99 ms")
+            }
+        )
+
+    # === LLAMADAS A LA API ===
+    st.subheader("🌐 Llamadas a Google Sheets por ejecución")
+    llamadas = pd.DataFrame(metricas.llamadas_api())
+    if llamadas.empty:
+        st.info("Sin ejecuciones registradas.")
+    else:
+        st.dataframe(llamadas, hide_index=True)
+
+    totales = pd.DataFrame(metricas.totales())
+    if not totales.empty:
+        st.dataframe(
+            totales.pivot_table(index="pagina", columns="contador", values="total", fill_value=0),
+        )
+
+    # === ARRANQUE ===
+    inicio = arranque.estado()
+    with st.expander("🚀 Calentamiento al arrancar" + ("" if inicio["terminado"] else " (en curso)")):
+        if inicio["pasos"]:
+            st.dataframe(pd.DataFrame(inicio["pasos"]), hide_index=True)
+        else:
+            st.info("El calentamiento aún no ha empezado.")
+
+    # === CUOTA DE LA API ===
+    st.subheader("🚦 Cuota de Google Sheets")
+    st.caption("Fichas disponibles en este momento; se recargan de forma continua cada minuto.")
+    st.dataframe(pd.DataFrame(cuota.estado()), hide_index=True)
+
+    # === COLA DE ESCRITURA ===
+    st.subheader("📤 Registros pendientes de envío")
+    cola = pendientes()
+    if not cola:
+        st.success("✅ No hay registros pendientes.")
+    else:
+        st.dataframe(
+            pd.DataFrame(
+                [
+                    (hoja, cantidad, f"{(time.time() - creado) / 60:.0f} min", intentos, error or "")
+                    for hoja, cantidad, creado, intentos, error in cola
+                ],
+                columns=["Hoja", "Pendientes", "Más antiguo", "Intentos", "Último error"]
+            ),
+            hide_index=True
+        )
+
+    if st.button("🔄 Reiniciar mediciones"):
+        metricas.reiniciar()
+        st.rerun()
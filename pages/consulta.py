@@ -0,0 +1,82 @@
+import time
+
+import streamlit as st
+
+from utils.consulta import DIMENSIONES, obtener_indice
+from utils.exportar import FORMATOS
+
+ETIQUETAS = {
+    "sku": "📦 SKU",
+    "tienda": "🏬 Tienda",
+    "persona": "👮 Vigilante / Auditor",
+    "documento": "💻 Número de documento (OLPN/ILPN)",
+    "area": "📍 Área",
+}
+
+TAMANO_PAGINA = 50
+
+def run():
+    # === CONFIGURACIÓN ===
+    st.title("🔍 Consulta de registros")
+
+    hoja = st.selectbox(
+        "Selecciona el formato",
+        list(DIMENSIONES),
+        format_func=lambda h: h.title()
+    )
+
+    # === CARGA DEL ÍNDICE ===
+    indice = obtener_indice(hoja)
+
+    # === FILTROS ===
+    filtros = {}
+    col1, col2 = st.columns(2)
+    for i, dimension in enumerate(DIMENSIONES[hoja]):
+        with (col1 if i % 2 == 0 else col2):
+            if dimension in ("sku", "documento"):
+                valor = st.text_input(ETIQUETAS[dimension]).strip()
+                if dimension == "sku" and valor:
+                    valor = valor.replace(".", "").zfill(8)
+            else:
+                valor = st.selectbox(
+                    ETIQUETAS[dimension],
+                    indice.valores(dimension),
+                    placeholder="Todos",
+                    index=None
+                )
+            filtros[dimension] = valor
+
+    rango = st.date_input("📅 Rango de fechas", value=(), format="YYYY-MM-DD")
+    desde = rango[0] if len(rango) > 0 else None
+    hasta = rango[1] if len(rango) > 1 else desde
+
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        orden = st.selectbox("Ordenar por", list(indice.df.columns), index=list(indice.df.columns).index("fecha"))
+    with col2:
+        descendente = st.toggle("Descendente", value=True)
+    with col3:
+        pagina = st.number_input("Página", min_value=1, value=1)
+
+    # === RESULTADOS ===
+    inicio = time.perf_counter()
+    resultados, total = indice.consultar(filtros, desde, hasta, orden, descendente, pagina, TAMANO_PAGINA)
+    duracion = (time.perf_counter() - inicio) * 1000
+
+    paginas = max(1, -(-total // TAMANO_PAGINA))
+    st.caption(f"{total:,} registros · página {min(pagina, paginas)} de {paginas} · {duracion:.1f} ms")
+    st.dataframe(resultados, hide_index=True)
+
+    # === EXPORTACIÓN ===
+    with st.expander("⬇️ Exportar"):
+        st.caption("Descarga todos los registros que cumplen los filtros, no solo esta página.")
+        formato = st.radio("Formato", list(FORMATOS), horizontal=True)
+        exportar, mime, extension = FORMATOS[formato]
+        st.download_button(
+            f"⬇️ Descargar {formato}",
+            # El archivo se arma al hacer clic, en otro hilo, sin bloquear la página
+            data=lambda: exportar(hoja, filtros, desde, hasta),
+            file_name=f"{hoja.lower().replace(' ', '_')}.{extension}",
+            mime=mime,
+            on_click="ignore",
+        )
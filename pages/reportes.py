@@ -0,0 +1,157 @@
+import streamlit as st
+from datetime import datetime
+
+from utils import anomalias, reportes, tablero
+from utils.fechas import MESES, DIAS, ORDEN_RANGOS
+from utils.metricas import medido
+
+def _por(df, dimension, orden=None):
+    tabla = df.groupby(dimension, observed=True)[["valor", "unidades", "casos"]].sum()
+    if orden:
+        tabla = tabla.reindex([o for o in orden if o in tabla.index])
+    return tabla
+
+# === TABLERO DEL DÍA ===
+# Se vuelve a ejecutar solo cada REFRESCO segundos y lee los contadores en memoria
+# del servidor: ninguna lectura a Google Sheets ni al espejo.
+@st.fragment(run_every=tablero.REFRESCO)
+@medido("tablero")
+def _hoy():
+    datos = tablero.tablero()
+    totales, por = datos["totales"], datos["por"]
+    hora = datetime.fromtimestamp(datos["actualizado"], tablero.ZONA).strftime("%H:%M:%S")
+    st.caption(f"Casos con fecha {datos['dia']} · actualizado a las {hora} · se refresca cada {tablero.REFRESCO} s")
+
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("🧾 Recuperaciones", f"{totales['RECUPERACIONES']['casos']:,}")
+    col2.metric("💰 Valor recuperado", f"${totales['RECUPERACIONES']['valor']:,.0f}")
+    col3.metric("📦 Auditorías recibo", f"{totales['AUDITORIA BODEGA']['casos']:,}")
+    col4.metric("🏭 Novedades warehouse", f"{totales['WAREHOUSE']['casos']:,}")
+
+    recuperaciones = por["RECUPERACIONES"]
+    if not totales["RECUPERACIONES"]["casos"] and not totales["AUDITORIA BODEGA"]["casos"]:
+        st.info("Aún no hay registros de tiendas hoy.")
+    else:
+        st.subheader("Por tienda")
+        tiendas = recuperaciones["tienda"].join(
+            por["AUDITORIA BODEGA"]["tienda"]["casos"].rename("auditorias_recibo"), how="outer"
+        ).fillna(0)
+        st.dataframe(tiendas.sort_values("valor", ascending=False))
+        if totales["RECUPERACIONES"]["casos"]:
+            st.subheader("Por ubicación")
+            st.dataframe(recuperaciones["ubicacion"].sort_values("valor", ascending=False))
+            st.subheader("Por rango de horas")
+            rangos = recuperaciones["rango_horas"]
+            st.bar_chart(rangos.reindex([r for r in ORDEN_RANGOS if r in rangos.index])["casos"])
+
+    st.subheader("Novedades de warehouse por área")
+    if not totales["WAREHOUSE"]["casos"]:
+        st.info("Aún no hay novedades de warehouse hoy.")
+    else:
+        st.dataframe(por["WAREHOUSE"]["area"].sort_values("valor", ascending=False))
+
+# === ALERTAS ===
+# Las series por picker, SKU y POS se actualizan con las filas nuevas como los
+# resúmenes; las alertas se recalculan solo cuando alguna serie cambió.
+def _alertas():
+    st.caption(
+        f"Semanas con al menos {anomalias.MIN_CASOS} casos y {anomalias.Z_ALERTA:g} desviaciones sobre el promedio "
+        f"de las {anomalias.VENTANA} semanas anteriores (con {anomalias.MIN_SEMANAS} semanas de historia o más). "
+        f"Se muestran las últimas {anomalias.SEMANAS_VISIBLES} semanas."
+    )
+    columnas = {"fecha": "semana", "casos": "casos", "media": "promedio", "z": "z", "valor": "valor"}
+
+    st.subheader("Pickers")
+    df = anomalias.alertas("pickers")
+    if df.empty:
+        st.info("Ningún picker con novedades fuera de lo normal.")
+    else:
+        st.dataframe(df[["picker", "tipo_novedad", *columnas]].rename(columns=columnas), hide_index=True)
+
+    st.subheader("SKU en warehouse")
+    df = anomalias.alertas("skus")
+    if df.empty:
+        st.info("Ningún SKU con novedades fuera de lo normal.")
+    else:
+        st.dataframe(df[["sku", *columnas]].rename(columns=columnas), hide_index=True)
+
+    st.subheader("POS con recuperaciones")
+    df = anomalias.alertas("pos")
+    if df.empty:
+        st.info("Ninguna POS con recuperaciones fuera de lo normal.")
+    else:
+        st.dataframe(df[["tienda", "pos", *columnas]].rename(columns=columnas), hide_index=True)
+
+    st.subheader("SKU repetido en la misma POS")
+    st.caption(f"{anomalias.UMBRAL_REPETICIONES} o más recuperaciones del mismo SKU en la misma POS dentro de {anomalias.VENTANA_DIAS} días (la peor ventana de cada uno).")
+    df = anomalias.alertas("pos_sku")
+    if df.empty:
+        st.info("Ningún SKU repetido en una misma POS.")
+    else:
+        st.dataframe(
+            df[["tienda", "pos", "sku", "veces", "fecha", "valor"]].rename(columns={"fecha": "hasta"}),
+            hide_index=True
+        )
+
+def run():
+    # === CONFIGURACIÓN ===
+    st.title("📊 Reportes")
+
+    # === ACTUALIZACIÓN DE RESÚMENES (solo filas nuevas) ===
+    reportes.actualizar_todo()
+    anomalias.actualizar_todo()
+
+    hoy, recuperaciones, warehouse, alertas = st.tabs(["📡 Hoy", "🧾 Recuperaciones", "🏭 Warehouse", "🚨 Alertas"])
+
+    # === HOY (EN VIVO) ===
+    with hoy:
+        _hoy()
+
+    # === RECUPERACIONES ===
+    with recuperaciones:
+        anios = sorted(reportes.valores("RECUPERACIONES", "anio"), reverse=True)
+        if not anios:
+            st.info("Aún no hay recuperaciones registradas.")
+        else:
+            col1, col2 = st.columns(2)
+            with col1:
+                tienda = st.selectbox("🏬 Tienda", reportes.valores("RECUPERACIONES", "tienda"), placeholder="Todas", index=None)
+            with col2:
+                anio = st.selectbox("📅 Año", anios, index=0)
+
+            # Solo se leen las filas de la tienda y el año elegidos
+            df = reportes.resumen("RECUPERACIONES", tienda=tienda, anio=anio)
+
+            col1, col2, col3 = st.columns(3)
+            col1.metric("💰 Valor recuperado", f"${df['valor'].sum():,.0f}")
+            col2.metric("📦 Unidades", f"{df['unidades'].sum():,.0f}")
+            col3.metric("🧾 Casos", f"{df['casos'].sum():,}")
+
+            st.subheader("Por mes")
+            st.bar_chart(_por(df, "mes", MESES)["valor"])
+            st.subheader("Por día de la semana")
+            st.bar_chart(_por(df, "dia", DIAS)["valor"])
+            st.subheader("Por rango de horas")
+            st.bar_chart(_por(df, "rango_horas", ORDEN_RANGOS)["casos"])
+            st.subheader("Por ubicación")
+            st.dataframe(_por(df, "ubicacion").sort_values("valor", ascending=False))
+            st.subheader("Por familia")
+            st.dataframe(_por(df, "familia").sort_values("valor", ascending=False))
+
+    # === WAREHOUSE ===
+    with warehouse:
+        anios = sorted(reportes.valores("WAREHOUSE", "anio"), reverse=True)
+        if not anios:
+            st.info("Aún no hay auditorías de warehouse registradas.")
+        else:
+            anio = st.selectbox("📅 Año", anios, index=0, key="anio_warehouse")
+            df = reportes.resumen("WAREHOUSE", anio=anio)
+
+            st.subheader("Pérdidas por área y tipo de novedad")
+            st.dataframe(df.pivot_table(index="area", columns="tipo_novedad", values="valor", aggfunc="sum", fill_value=0))
+            st.subheader("Por semana")
+            st.bar_chart(df.groupby("numero_semana")["valor"].sum())
+
+    # === ALERTAS ===
+    with alertas:
+        _alertas()
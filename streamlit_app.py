@@ -1,12 +1,19 @@
 import streamlit as st
 import importlib
 
+from utils import arranque, metricas
+
 st.set_page_config(
     page_title="Sistema CCTV",
     page_icon="🎥",
     layout="centered"
 )
 
+# Una sola vez por proceso: en segundo plano arranca la cola de escritura y el
+# refresco de catálogos, importa las páginas, autoriza y carga los catálogos.
+# Aquí solo se importa lo liviano para que la página de inicio cargue al instante.
+arranque.iniciar()
+
 # === SIDEBAR ===
 st.sidebar.title("📂 Navegación")
 main_page = st.sidebar.radio(
@@ -16,12 +23,17 @@ main_page = st.sidebar.radio(
 
 # === FUNCIÓN PARA CARGAR SUBPÁGINAS ===
 def cargar_pagina(nombre_modulo):
+    # Los fragmentos que se vuelven a ejecutar solos se miden con esta misma página
+    st.session_state["pagina_medida"] = nombre_modulo
     try:
-        modulo = importlib.import_module(nombre_modulo)
-        if hasattr(modulo, "run"):
-            modulo.run()  # ejecuta función run() del módulo
-        else:
-            st.warning(f"⚠️ El módulo `{nombre_modulo}` no tiene una función run().")
+        with metricas.ejecucion(nombre_modulo):
+            with metricas.medir("importar"):
+                modulo = importlib.import_module(nombre_modulo)
+            if hasattr(modulo, "run"):
+                with metricas.medir("run"):
+                    modulo.run()  # ejecuta función run() del módulo
+            else:
+                st.warning(f"⚠️ El módulo `{nombre_modulo}` no tiene una función run().")
     except ModuleNotFoundError:
         st.error(f"❌ No se encontró el módulo `{nombre_modulo}`.")
     except Exception as e:
@@ -45,7 +57,7 @@ elif main_page == "📋 Registro":
     st.title("📋 Registro de actividades")
     st.write("Selecciona el formulario que deseas abrir:")
 
-    col1, col2, col3 = st.columns(3)
+    col1, col2, col3, col4 = st.columns(4)
 
     if "subpage" not in st.session_state:
         st.session_state["subpage"] = None
@@ -62,6 +74,10 @@ elif main_page == "📋 Registro":
         if st.button("🏭 Auditoría Warehouse"):
             st.session_state["subpage"] = "pages.3_auditoria_warehouse"
 
+    with col4:
+        if st.button("📥 Carga masiva"):
+            st.session_state["subpage"] = "pages.4_carga_masiva"
+
     # Cargar la subpágina seleccionada
     if st.session_state["subpage"]:
         st.markdown("---")
@@ -69,13 +85,13 @@ elif main_page == "📋 Registro":
 
 # === CONSULTA ===
 elif main_page == "🔍 Consulta":
-    st.info("🔍 Módulo de consulta aún en desarrollo.")
+    cargar_pagina("pages.consulta")
 
 # === REPORTES ===
 elif main_page == "📊 Reportes":
-    st.info("📊 Módulo de reportes aún en desarrollo.")
+    cargar_pagina("pages.reportes")
 
 # === CONFIGURACIÓN ===
 elif main_page == "⚙️ Configuración":
-    st.info("⚙️ Módulo de configuración aún en desarrollo.")
+    cargar_pagina("pages.configuracion")
 
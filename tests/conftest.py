@@ -0,0 +1,7 @@
+import os
+import sys
+import tempfile
+
+# El directorio de datos (espejo, cola, evidencias) se fija antes de importar utils
+os.environ.setdefault("REPORTES_DATOS", tempfile.mkdtemp(prefix="reportes-pruebas-"))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,42 @@
+import pandas as pd
+from streamlit.testing.v1 import AppTest
+
+from utils.catalogo_sku import CatalogoSKU
+
+
+def _catalogo():
+    return CatalogoSKU(pd.DataFrame({
+        "SKU": ["00123456", "00123457", "20304050"],
+        "ITEM": ["LAMPARA", "LAMPARA 2", "SILLA"],
+        "FAMILIA": ["F", "F", "F"],
+    }))
+
+
+def test_sugerencias_sin_ceros_a_la_izquierda():
+    catalogo = _catalogo()
+    assert catalogo.sugerencias("123456")[0] == "00123456"
+    assert catalogo.sugerencias("12345") == ["00123456", "00123457"]
+    assert catalogo.sugerencias("2030") == ["20304050"]
+
+
+def _pagina():
+    import pandas as pd
+    import streamlit as st
+
+    from utils.catalogo_sku import CatalogoSKU
+    from utils.widgets import selector_sku
+
+    catalogo = CatalogoSKU(pd.DataFrame({
+        "SKU": ["00123456", "00123457", "20304050"],
+        "ITEM": ["LAMPARA", "LAMPARA 2", "SILLA"],
+        "FAMILIA": ["F", "F", "F"],
+    }))
+    selector_sku(catalogo, key="sku", aceptar_nuevos=False)
+
+
+def test_selector_sku_elige_codigo_corto():
+    at = AppTest.from_function(_pagina)
+    at.run()
+    at.text_input[0].input("123456").run()
+    assert at.selectbox[0].value == "00123456"
+    assert at.session_state["sku"] == "00123456"
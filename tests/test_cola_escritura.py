@@ -0,0 +1,36 @@
+import json
+import time
+
+from utils import cola_escritura
+
+
+def test_completar_no_toca_una_fila_ya_reservada(monkeypatch):
+    # Sin trabajador: el lote se reserva a mano, como lo haría enviar_pendientes
+    monkeypatch.setattr(cola_escritura, "iniciar_trabajador", lambda: None)
+    id_ = cola_escritura.encolar("RECUPERACIONES", ["a", "sha256:abc;pendiente"], retener=0.05)
+    assert [i for i, _, _ in cola_escritura.retenidas()] == [id_]
+
+    # La retención vence y el trabajador reserva la fila para enviarla tal cual
+    time.sleep(0.1)
+    hoja, lote = cola_escritura._reservar_lote()
+    assert hoja == "RECUPERACIONES"
+    assert [i for i, _, _ in lote] == [id_]
+
+    # La foto termina de procesarse tarde: la fila reservada ya no se toca
+    assert cola_escritura.retenidas() == []
+    assert cola_escritura.completar(id_, ["a", "ref"]) is False
+    valores = cola_escritura._db().execute("SELECT valores FROM pendientes WHERE id = ?", (id_,)).fetchone()[0]
+    assert json.loads(valores) == ["a", "sha256:abc;pendiente"]
+    cola_escritura._confirmar([id_])
+
+
+def test_completar_libera_una_fila_retenida(monkeypatch):
+    monkeypatch.setattr(cola_escritura, "iniciar_trabajador", lambda: None)
+    id_ = cola_escritura.encolar("RECUPERACIONES", ["b", "sha256:def;pendiente"], retener=60)
+    assert cola_escritura._reservar_lote() == (None, [])
+
+    assert cola_escritura.completar(id_, ["b", "ref"]) is True
+    assert cola_escritura.retenidas() == []
+    hoja, lote = cola_escritura._reservar_lote()
+    assert [(i, json.loads(v)) for i, v, _ in lote] == [(id_, ["b", "ref"])]
+    cola_escritura._confirmar([id_])
@@ -0,0 +1,319 @@
+import logging
+import os
+import sqlite3
+import threading
+
+import numpy as np
+import pandas as pd
+
+from utils import espejo
+from utils.esquemas import COLUMNAS
+from utils.metricas import medir
+
+# === CONFIGURACIÓN ===
+# Series por entidad (picker, SKU, POS) con los casos y el valor de cada periodo,
+# guardadas como los resúmenes de utils.reportes: cada hoja recuerda hasta qué
+# fila del espejo se ha sumado y solo se agregan las filas nuevas. Las alertas se
+# calculan sobre esas series, no sobre las filas, con operaciones vectorizadas.
+RUTA_ANOMALIAS = os.path.join(espejo.DIR_DATOS, "anomalias.sqlite")
+
+# Todas las dimensiones de una serie son obligatorias: una recuperación sin POS
+# (Antenas, Autopago...) no cuenta en las series de POS
+SERIES = {
+    # Novedades semanales de cada picker por tipo (un pico de faltantes, etc.)
+    "pickers": {"hoja": "WAREHOUSE", "dimensiones": ["picker", "tipo_novedad"], "dias": 7},
+    # Novedades semanales de cada SKU en warehouse
+    "skus": {"hoja": "WAREHOUSE", "dimensiones": ["sku"], "dias": 7},
+    # Recuperaciones semanales de cada POS (el número de POS se repite entre tiendas)
+    "pos": {"hoja": "RECUPERACIONES", "dimensiones": ["tienda", "pos"], "dias": 7},
+    # Recuperaciones diarias de cada SKU en cada POS
+    "pos_sku": {"hoja": "RECUPERACIONES", "dimensiones": ["tienda", "pos", "sku"], "dias": 1},
+}
+
+BLOQUE = 200_000            # filas del espejo que se agregan a la vez
+
+VENTANA = 8                 # semanas anteriores con las que se compara cada semana
+MIN_SEMANAS = 4             # historia mínima de la entidad para calcular su puntaje z
+Z_ALERTA = 3.0
+MIN_CASOS = 3               # una semana con menos casos nunca es alerta
+DESVIACION_MINIMA = 1.0     # evita puntajes enormes en series casi constantes
+
+VENTANA_DIAS = 30           # el mismo SKU recuperado en la misma POS...
+UMBRAL_REPETICIONES = 3     # ...al menos estas veces dentro de la ventana
+
+SEMANAS_VISIBLES = 12       # alertas que se muestran, contadas desde la última semana con datos
+
+_LUNES = np.datetime64("1970-01-05")
+
+log = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_conexion = None
+_calculadas = {}
+_por_actualizar = set()
+_hay_trabajo = threading.Event()
+_hilo = None
+
+
+def _tabla(nombre):
+    return f"serie_{nombre}"
+
+
+# === BASE DE DATOS DE SERIES ===
+def _db():
+    global _conexion
+    if _conexion is None:
+        os.makedirs(espejo.DIR_DATOS, exist_ok=True)
+        conexion = sqlite3.connect(RUTA_ANOMALIAS, check_same_thread=False, isolation_level=None, timeout=30)
+        conexion.execute("PRAGMA journal_mode=WAL")
+        for nombre, config in SERIES.items():
+            dimensiones = config["dimensiones"]
+            conexion.execute(f"""
+                CREATE TABLE IF NOT EXISTS {_tabla(nombre)} (
+                    {", ".join(f"{d} NOT NULL" for d in dimensiones)},
+                    periodo INTEGER NOT NULL,
+                    casos INTEGER NOT NULL,
+                    valor REAL NOT NULL,
+                    PRIMARY KEY ({", ".join(dimensiones)}, periodo)
+                )
+            """)
+        conexion.execute("""
+            CREATE TABLE IF NOT EXISTS avance (
+                hoja TEXT PRIMARY KEY,
+                base INTEGER NOT NULL,
+                filas INTEGER NOT NULL,
+                correccion INTEGER NOT NULL
+            )
+        """)
+        _conexion = conexion
+    return _conexion
+
+
+def _columnas(hoja, filas):
+    # Solo las columnas que usan las series, sin armar el DataFrame de la hoja completa
+    necesarias = {"fecha", "total"}
+    for config in SERIES.values():
+        if config["hoja"] == hoja:
+            necesarias.update(config["dimensiones"])
+    posiciones = {c: COLUMNAS[hoja].index(c) for c in necesarias}
+    df = pd.DataFrame({
+        c: [f[i] if i < len(f) else "" for f in filas] for c, i in posiciones.items()
+    }, dtype=object)
+
+    dias = pd.to_datetime(df["fecha"], errors="coerce", format="%Y-%m-%d").to_numpy().astype("datetime64[D]")
+    df["dia"] = (dias - _LUNES).astype(np.int64)
+    df["total"] = pd.to_numeric(df["total"], errors="coerce").fillna(0.0)
+    for c in necesarias - {"fecha", "total"}:
+        # 12 y 12.0 son la misma POS; None y "" son vacío
+        df[c] = df[c].fillna("").astype(str).str.strip().str.replace(r"\.0$", "", regex=True)
+    if "sku" in df:
+        df["sku"] = df["sku"].str.zfill(8).where(df["sku"] != "", "")
+    return df[~np.isnat(dias)]
+
+
+def _agrupar(nombre, df):
+    config = SERIES[nombre]
+    dimensiones = config["dimensiones"]
+    df = df[(df[dimensiones] != "").all(axis=1)]
+    return (
+        df.assign(periodo=df["dia"] // config["dias"])
+        .groupby(dimensiones + ["periodo"], sort=False)
+        .agg(casos=("total", "size"), valor=("total", "sum"))
+        .reset_index()
+    )
+
+
+# === ACTUALIZACIÓN INCREMENTAL ===
+def actualizar(hoja):
+    series = [nombre for nombre, config in SERIES.items() if config["hoja"] == hoja]
+    if not series or espejo.estado(hoja) is None:
+        return
+
+    with _lock:
+        db = _db()
+        # Igual que en utils.reportes: otra réplica que actualice a la vez espera aquí
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            avance = db.execute("SELECT base, filas, correccion FROM avance WHERE hoja = ?", (hoja,)).fetchone()
+            with espejo.vista() as vista:
+                info, reiniciar, desde, corregidas = espejo.cambios(vista, hoja, avance)
+                if not reiniciar and desde > info["filas"] and avance[2] == info["correccion"]:
+                    db.execute("COMMIT")
+                    return
+                grupos = {nombre: [] for nombre in series}
+                with medir(f"anomalias:{hoja}"):
+                    for inicio in range(desde, info["filas"] + 1, BLOQUE):
+                        df = _columnas(hoja, vista.leer_filas(hoja, desde=inicio, hasta=min(inicio + BLOQUE - 1, info["filas"])))
+                        for nombre in series:
+                            grupos[nombre].append(_agrupar(nombre, df))
+
+            with medir(f"anomalias:{hoja}"):
+                # Filas ya sumadas que se corrigieron en la hoja: se resta lo de antes
+                if corregidas:
+                    antes = _columnas(hoja, [antes for _, antes, _ in corregidas])
+                    despues = _columnas(hoja, [despues for _, _, despues in corregidas])
+                    for nombre in series:
+                        quitar = _agrupar(nombre, antes)
+                        quitar[["casos", "valor"]] = -quitar[["casos", "valor"]]
+                        grupos[nombre] += [quitar, _agrupar(nombre, despues)]
+
+                for nombre in series:
+                    if not grupos[nombre] and not reiniciar:
+                        continue
+                    dimensiones = SERIES[nombre]["dimensiones"] + ["periodo"]
+                    tabla = _tabla(nombre)
+                    if grupos[nombre]:
+                        nuevos = pd.concat(grupos[nombre]).groupby(dimensiones).sum().reset_index()
+                    else:
+                        nuevos = pd.DataFrame(columns=dimensiones + ["casos", "valor"])
+                    columnas = dimensiones + ["casos", "valor"]
+                    insertar = f"INSERT INTO {tabla} ({', '.join(columnas)}) VALUES ({', '.join('?' for _ in columnas)})"
+                    if reiniciar:
+                        # Tabla vacía y filas en el orden de la llave: inserción directa
+                        db.execute(f"DELETE FROM {tabla}")
+                    else:
+                        insertar += f"""
+                            ON CONFLICT ({", ".join(dimensiones)}) DO UPDATE SET
+                                casos = casos + excluded.casos,
+                                valor = valor + excluded.valor
+                        """
+                    db.executemany(insertar, nuevos[columnas].astype(object).itertuples(index=False, name=None))
+                    if corregidas:
+                        db.execute(f"DELETE FROM {tabla} WHERE casos = 0")
+            db.execute(
+                "INSERT OR REPLACE INTO avance (hoja, base, filas, correccion) VALUES (?, ?, ?, ?)",
+                (hoja, info["base"], info["filas"], info["correccion"])
+            )
+            db.execute("COMMIT")
+        except Exception:
+            db.execute("ROLLBACK")
+            raise
+
+
+def actualizar_todo():
+    for hoja in sorted({config["hoja"] for config in SERIES.values()}):
+        espejo.version_vigente(hoja)
+        actualizar(hoja)
+
+
+# === ACTUALIZACIÓN EN SEGUNDO PLANO ===
+# La cola de escritura solo avisa: si la hoja cambió de base la actualización
+# recalcula las series completas y no debe demorar el envío de los registros
+def _trabajar():
+    while True:
+        _hay_trabajo.wait()
+        _hay_trabajo.clear()
+        with _lock:
+            hojas = sorted(_por_actualizar)
+            _por_actualizar.clear()
+        for hoja in hojas:
+            try:
+                actualizar(hoja)
+            except Exception:
+                log.exception("No se pudieron actualizar las series de %s", hoja)
+
+
+def pedir_actualizacion(hoja):
+    global _hilo
+    if not any(config["hoja"] == hoja for config in SERIES.values()):
+        return
+    with _lock:
+        _por_actualizar.add(hoja)
+        if _hilo is None or not _hilo.is_alive():
+            _hilo = threading.Thread(target=_trabajar, name="anomalias", daemon=True)
+            _hilo.start()
+    _hay_trabajo.set()
+
+
+# === VENTANAS MÓVILES ===
+def _ordenar(df, dimensiones):
+    # Código entero por entidad y posición única (entidad, periodo) ordenada
+    df = df.assign(entidad=df.groupby(dimensiones, sort=False).ngroup())
+    df = df.sort_values(["entidad", "periodo"], kind="stable").reset_index(drop=True)
+    periodo = df["periodo"].to_numpy()
+    periodo = periodo - periodo.min() if len(periodo) else periodo
+    posicion = df["entidad"].to_numpy() * (int(periodo.max(initial=0)) + VENTANA + VENTANA_DIAS + 1) + periodo
+    return df, posicion
+
+
+def _suma_previa(posicion, valores, ancho, incluir_actual):
+    # Suma de `valores` de la misma entidad en los `ancho` periodos anteriores
+    # (y el actual si incluir_actual); los periodos sin fila valen cero
+    acumulado = np.concatenate([[0.0], np.cumsum(valores, dtype=np.float64)])
+    inicio = np.searchsorted(posicion, posicion - ancho + (1 if incluir_actual else 0), side="left")
+    fin = np.arange(len(posicion)) + (1 if incluir_actual else 0)
+    return acumulado[fin] - acumulado[inicio]
+
+
+def _puntajes(df, dimensiones):
+    # Puntaje z de cada semana frente a las VENTANA anteriores de la misma entidad
+    df, posicion = _ordenar(df, dimensiones)
+    casos = df["casos"].to_numpy(dtype=np.float64)
+    primero = df.groupby("entidad", sort=False)["periodo"].transform("min").to_numpy()
+    previas = np.minimum(VENTANA, df["periodo"].to_numpy() - primero)
+    con_historia = previas > 0
+    divisor = np.where(con_historia, previas, 1)
+
+    suma = _suma_previa(posicion, casos, VENTANA, incluir_actual=False)
+    cuadrados = _suma_previa(posicion, casos ** 2, VENTANA, incluir_actual=False)
+    media = suma / divisor
+    desviacion = np.sqrt(np.maximum(cuadrados / divisor - media ** 2, 0.0))
+    z = (casos - media) / np.maximum(desviacion, DESVIACION_MINIMA)
+
+    alerta = (previas >= MIN_SEMANAS) & (z >= Z_ALERTA) & (casos >= MIN_CASOS)
+    return df.assign(media=media, desviacion=desviacion, z=z)[alerta]
+
+
+def _repeticiones(df, dimensiones):
+    # Veces y valor en VENTANA_DIAS días (incluido el día) para cada día con recuperaciones
+    df, posicion = _ordenar(df, dimensiones)
+    veces = _suma_previa(posicion, df["casos"].to_numpy(dtype=np.float64), VENTANA_DIAS, incluir_actual=True)
+    valor = _suma_previa(posicion, df["valor"].to_numpy(dtype=np.float64), VENTANA_DIAS, incluir_actual=True)
+    df = df.assign(veces=veces.astype(np.int64), valor=valor)
+    # Una fila por SKU y POS: su peor ventana (la más reciente si hay empate)
+    return (
+        df[df["veces"] >= UMBRAL_REPETICIONES]
+        .sort_values(["veces", "periodo"], kind="stable")
+        .drop_duplicates(dimensiones, keep="last")
+        .drop(columns=["casos"])
+    )
+
+
+# === ALERTAS ===
+def _semana(periodo, dias):
+    return pd.to_datetime(_LUNES + (np.asarray(periodo, dtype=np.int64) * dias).astype("timedelta64[D]")).date
+
+
+def _calcular(nombre):
+    config = SERIES[nombre]
+    dimensiones = config["dimensiones"]
+    with _lock:
+        df = pd.read_sql_query(f"SELECT * FROM {_tabla(nombre)}", _db())
+    if df.empty:
+        return df
+    with medir(f"alertas:{nombre}"):
+        ultimo = df["periodo"].max()
+        if config["dias"] == 1:
+            alertas = _repeticiones(df, dimensiones)
+            desde = ultimo - SEMANAS_VISIBLES * 7
+            orden = ["veces", "periodo"]
+        else:
+            alertas = _puntajes(df, dimensiones)
+            desde = ultimo - SEMANAS_VISIBLES
+            orden = ["periodo", "z"]
+        alertas = alertas[alertas["periodo"] > desde].sort_values(orden, ascending=False)
+        alertas = alertas.assign(fecha=_semana(alertas["periodo"], config["dias"]))
+        return alertas.drop(columns=["entidad", "periodo"], errors="ignore").reset_index(drop=True)
+
+
+def alertas(nombre):
+    # Se recalculan solo cuando la hoja tiene filas nuevas o corregidas sumadas a las series
+    hoja = SERIES[nombre]["hoja"]
+    with _lock:
+        clave = _db().execute("SELECT base, filas, correccion FROM avance WHERE hoja = ?", (hoja,)).fetchone()
+    if clave is None:
+        return pd.DataFrame()
+    anterior = _calculadas.get(nombre)
+    if anterior is None or anterior[0] != clave:
+        _calculadas[nombre] = (clave, _calcular(nombre))
+    return _calculadas[nombre][1]
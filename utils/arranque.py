@@ -0,0 +1,102 @@
+import importlib
+import logging
+import threading
+import time
+
+from utils.metricas import medir
+
+# === CALENTAMIENTO AL ARRANCAR ===
+# La primera ejecución del script (la página de inicio) lanza un hilo que deja
+# listo lo que la primera persona en abrir un formulario tendría que esperar:
+# importar las páginas (pandas, gspread, google-auth), autorizar, abrir el libro
+# y cargar los catálogos. La página de inicio no importa nada de eso.
+PAGINAS = [
+    "pages.1_recuperaciones_cctv",
+    "pages.2_auditoria_recibo",
+    "pages.3_auditoria_warehouse",
+    "pages.4_carga_masiva",
+    "pages.consulta",
+    "pages.reportes",
+    "pages.configuracion",
+]
+
+log = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_hilo = None
+_pasos = {}
+
+
+def _paso(nombre, funcion):
+    inicio = time.perf_counter()
+    error = ""
+    try:
+        with medir(f"arranque:{nombre}"):
+            funcion()
+    except Exception as e:
+        log.warning("Falló el paso de arranque %s: %s", nombre, e)
+        error = str(e)
+    _pasos[nombre] = {"paso": nombre, "segundos": time.perf_counter() - inicio, "error": error}
+
+
+def _servicios():
+    # Primero los hilos de fondo: los registros pendientes salen cuanto antes
+    from utils.cola_escritura import iniciar_trabajador
+    from utils.espejo import iniciar_refresco
+    from utils.evidencias import reanudar
+
+    iniciar_trabajador()
+    iniciar_refresco()
+    # Fotos que un proceso anterior no alcanzó a procesar
+    reanudar()
+
+
+def _autorizar():
+    from utils.conexion import _cache_hojas
+
+    # Cliente autorizado, libro abierto y metadatos de todas las hojas
+    _cache_hojas()
+
+
+def _catalogos():
+    from utils import espejo, tiendas
+    from utils.catalogo_sku import obtener_catalogo_sku
+    from utils.usuarios_wh import usuarios_wh
+
+    espejo.precargar(espejo.CATALOGOS)
+    for nombre in espejo.CATALOGOS:
+        espejo.cargar_hoja(nombre)
+    obtener_catalogo_sku()
+    tiendas.vigilantes_de(None)
+    usuarios_wh()
+
+
+def _tablero():
+    from utils import tablero
+
+    # Desde aquí cada registro suma en el tablero; antes se rearma con lo del día
+    tablero.tablero()
+
+
+def _calentar():
+    _paso("servicios", _servicios)
+    _paso("tablero", _tablero)
+    for modulo in PAGINAS:
+        _paso(modulo, lambda: importlib.import_module(modulo))
+    _paso("autorizacion", _autorizar)
+    _paso("catalogos", _catalogos)
+
+
+def iniciar():
+    global _hilo
+    with _lock:
+        if _hilo is None:
+            _hilo = threading.Thread(target=_calentar, name="arranque", daemon=True)
+            _hilo.start()
+
+
+def estado():
+    return {
+        "terminado": _hilo is not None and not _hilo.is_alive(),
+        "pasos": list(_pasos.values()),
+    }
@@ -0,0 +1,87 @@
+import numpy as np
+import pandas as pd
+
+# === CONFIGURACIÓN ===
+ANCHO = 64                  # caracteres de cada nombre que entran al índice
+COINCIDENCIA_MINIMA = 0.4   # fracción de los trigramas de la búsqueda que debe tener un nombre
+BLOQUE = 100_000            # nombres que se procesan a la vez al construir
+
+# Letras y dígitos quedan; todo lo demás (puntuación, el relleno) es un espacio
+_TABLA = np.full(256, ord(" "), dtype=np.int32)
+for _c in b"ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789":
+    _TABLA[_c] = _c
+
+
+def _matriz(textos):
+    # Mayúsculas, sin tildes (Ñ -> N) y en ASCII: una fila de bytes por nombre,
+    # con un espacio antes y después para marcar el inicio y el fin de cada palabra
+    normalizados = (
+        pd.Series(textos, dtype=object).fillna("").astype(str)
+        .str.upper().str.normalize("NFKD").str.encode("ascii", "ignore")
+    )
+    fijo = normalizados.to_numpy(dtype=f"S{ANCHO}")
+    bytes_ = _TABLA[fijo.view(np.uint8).reshape(len(fijo), ANCHO)]
+    espacio = np.full((len(fijo), 1), ord(" "), dtype=np.int32)
+    return np.hstack([espacio, bytes_, espacio])
+
+
+def _trigramas(matriz):
+    # Código entero de cada trigrama; se descartan los que tienen un espacio en
+    # medio (cruzan de una palabra a otra o son relleno)
+    codigos = (matriz[:, :-2] << 16) | (matriz[:, 1:-1] << 8) | matriz[:, 2:]
+    return codigos, matriz[:, 1:-1] != ord(" ")
+
+
+# === ÍNDICE DE TRIGRAMAS ===
+# Índice invertido trigrama -> filas, construido una vez por versión del catálogo.
+# La búsqueda ignora tildes, mayúsculas y puntuación y tolera errores de tipeo:
+# gana el nombre que comparte más trigramas con lo escrito. Devuelve los `ids`
+# (SKU, usuario, nombre del vigilante), nunca el texto que se muestra.
+class IndiceNombres:
+    def __init__(self, nombres, ids):
+        self.ids = np.asarray(ids)
+        n = len(self.ids)
+        claves = []
+        for inicio in range(0, n, BLOQUE):
+            codigos, validos = _trigramas(_matriz(list(nombres[inicio:inicio + BLOQUE])))
+            filas, columnas = np.nonzero(validos)
+            claves.append(codigos[filas, columnas].astype(np.int64) * n + filas + inicio)
+        # Cada par (trigrama, fila) una sola vez, ordenado por trigrama. Sobre un
+        # arreglo ya ordenado, comparar con el vecino es más rápido que np.unique.
+        claves = np.sort(np.concatenate(claves)) if claves else np.empty(0, dtype=np.int64)
+        claves = claves[np.r_[True, claves[1:] != claves[:-1]]] if len(claves) else claves
+        codigos = claves // max(n, 1)
+        inicios = np.flatnonzero(np.r_[True, codigos[1:] != codigos[:-1]]) if len(codigos) else codigos
+
+        self._filas = (claves % max(n, 1)).astype(np.int32)
+        self._codigos = codigos[inicios]
+        self._inicio = np.append(inicios, len(self._filas))
+        self._tamanos = np.bincount(self._filas, minlength=n)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def buscar(self, texto, limite=20):
+        codigos, validos = _trigramas(_matriz([texto]))
+        consulta = np.unique(codigos[validos])
+        posiciones = np.searchsorted(self._codigos, consulta)
+        posiciones = posiciones[posiciones < len(self._codigos)]
+        posiciones = posiciones[np.isin(self._codigos[posiciones], consulta)]
+        if not len(consulta) or not len(posiciones):
+            return []
+
+        cuenta = np.bincount(
+            np.concatenate([self._filas[self._inicio[p]:self._inicio[p + 1]] for p in posiciones]),
+            minlength=len(self.ids)
+        )
+        candidatos = np.flatnonzero(cuenta >= max(1, int(np.ceil(len(consulta) * COINCIDENCIA_MINIMA))))
+        if not len(candidatos):
+            return []
+        # Primero los que tienen más trigramas de la búsqueda; a igualdad, el nombre
+        # más parecido en largo (coeficiente de Dice)
+        comunes = cuenta[candidatos]
+        puntaje = comunes + comunes / (len(consulta) + self._tamanos[candidatos])
+        if len(candidatos) > limite:
+            mejores = np.argpartition(-puntaje, limite - 1)[:limite]
+            candidatos, puntaje = candidatos[mejores], puntaje[mejores]
+        return self.ids[candidatos[np.argsort(-puntaje, kind="stable")]].tolist()
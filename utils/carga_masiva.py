@@ -0,0 +1,242 @@
+import unicodedata
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
+import numpy as np
+import pandas as pd
+
+from utils import opciones
+from utils.esquemas import COLUMNAS, codigos
+from utils.fechas import MESES, DIAS, ORDEN_RANGOS
+
+# === CONFIGURACIÓN ===
+# Columnas que debe traer el archivo; las demás (producto, familia, total, mes,
+# dia, rango_horas, numero_semana, picker) se calculan igual que en los formularios.
+REQUERIDAS = {
+    "RECUPERACIONES": ["tienda", "fecha", "hora", "vigilante", "sku", "cantidad", "pvp"],
+    "WAREHOUSE": ["fecha", "numero_documento", "sku", "usuario", "cantidad", "costo"],
+}
+OPCIONALES = {
+    "RECUPERACIONES": ["piso", "ubicacion", "area", "nombre_cw", "pos", "descripcion"],
+    "WAREHOUSE": ["proceso_auditoria", "novedad", "tipo_documento", "auditor",
+                  "observaciones", "tipo_novedad", "area"],
+}
+
+
+def _normalizar_columna(nombre):
+    texto = unicodedata.normalize("NFKD", str(nombre)).encode("ascii", "ignore").decode()
+    return texto.strip().lower().replace(" ", "_")
+
+
+def leer_archivo(archivo):
+    if archivo.name.lower().endswith(".xlsx"):
+        df = pd.read_excel(archivo, dtype=str)
+    else:
+        # sep=None detecta ',' o ';' (Excel en español exporta con ';')
+        df = pd.read_csv(archivo, dtype=str, sep=None, engine="python", encoding="utf-8-sig")
+    df.columns = [_normalizar_columna(c) for c in df.columns]
+    return df.fillna("").apply(lambda s: s.str.strip())
+
+
+# === VALIDACIÓN VECTORIZADA ===
+class _Errores:
+    def __init__(self, indice):
+        self.errores = pd.Series("", index=indice, dtype=object)
+        self.advertencias = pd.Series("", index=indice, dtype=object)
+
+    def error(self, mascara, mensaje):
+        self.errores[mascara] += mensaje + "; "
+
+    def advertencia(self, mascara, mensaje):
+        self.advertencias[mascara] += mensaje + "; "
+
+
+def _fechas(df, e):
+    # Primero ISO (2025-10-03, o fecha de Excel); lo demás se lee como día/mes/año
+    fecha = pd.to_datetime(df["fecha"], errors="coerce", format="ISO8601")
+    otras = fecha.isna() & (df["fecha"] != "")
+    fecha[otras] = pd.to_datetime(df.loc[otras, "fecha"], errors="coerce", format="%d/%m/%Y")
+    e.error(fecha.isna(), "fecha inválida")
+    return fecha
+
+
+def _sku(df, catalogo, e):
+    sku = df["sku"].str.replace(".", "", regex=False).str.replace(" ", "", regex=False)
+    e.error(~sku.str.fullmatch(r"\d{1,8}"), "SKU inválido")
+    sku = sku.str.zfill(8)
+    productos = catalogo.reindex(sku)
+    # Las columnas del catálogo compartido pueden ser categóricas
+    return sku, productos["ITEM"].astype(object).fillna("").to_numpy(), productos["FAMILIA"].astype(object).fillna("").to_numpy()
+
+
+def _numero(df, columna, minimo, e, mensaje):
+    valores = pd.to_numeric(df[columna].str.replace(",", ".", regex=False), errors="coerce")
+    e.error(valores.isna() | (valores < minimo), mensaje)
+    return valores
+
+
+def _valida_opcion(df, columna, permitidas, e, obligatoria=False):
+    valores = df[columna]
+    invalidas = ~valores.isin(permitidas)
+    if not obligatoria:
+        invalidas &= valores != ""
+    e.error(invalidas, f"{columna} no válido")
+
+
+def _catalogo_hfb(df_sku):
+    sku = codigos(df_sku["SKU"])
+    catalogo = df_sku[sku != ""].assign(SKU=sku[sku != ""].str.zfill(8))
+    return catalogo.drop_duplicates("SKU").set_index("SKU")[["ITEM", "FAMILIA"]]
+
+
+def validar_recuperaciones(df, df_sku, df_vigilantes):
+    e = _Errores(df.index)
+    catalogo = _catalogo_hfb(df_sku)
+
+    _valida_opcion(df, "tienda", list(opciones.TIENDAS), e, obligatoria=True)
+    id_tienda = df["tienda"].map(opciones.TIENDAS)
+
+    fecha = _fechas(df, e)
+    hora = pd.to_datetime(df["hora"], errors="coerce", format="mixed")
+    e.error(hora.isna(), "hora inválida")
+
+    # El vigilante debe pertenecer a la tienda, igual que en el formulario
+    vigilantes = pd.MultiIndex.from_arrays([
+        pd.to_numeric(df_vigilantes["ID_TIENDA"], errors="coerce"),
+        df_vigilantes["NOMBRE VIGILANTE"].astype(str).str.strip(),
+    ])
+    e.error(~pd.MultiIndex.from_arrays([id_tienda, df["vigilante"]]).isin(vigilantes), "vigilante no pertenece a la tienda")
+
+    _valida_opcion(df, "piso", opciones.PISOS, e)
+    _valida_opcion(df, "ubicacion", opciones.UBICACIONES, e)
+    solicitud = df["ubicacion"] == "Solicitud"
+    e.error(solicitud & ~df["area"].isin(opciones.AREAS_SOLICITUD), "area no válida para Solicitud")
+    area = df["area"].where(solicitud, "No aplica")
+
+    pos = pd.to_numeric(df["pos"], errors="coerce")
+    e.error((df["pos"] != "") & pos.isna(), "POS debe ser numérico")
+    decimales = pos.notna() & (pos % 1 != 0)
+    e.error(decimales, "POS debe ser un número entero")
+    pos = pos.where(~decimales)
+
+    sku, producto, familia = _sku(df, catalogo, e)
+    e.advertencia(producto == "", "SKU no está en HFB")
+
+    cantidad = _numero(df, "cantidad", 1, e, "cantidad debe ser 1 o más")
+    pvp = _numero(df, "pvp", 1, e, "valor unitario obligatorio")
+
+    salida = pd.DataFrame({
+        "fecha_registro": datetime.now(ZoneInfo("America/Bogota")).strftime("%Y-%m-%d %H:%M:%S"),
+        "tienda": df["tienda"],
+        "fecha": fecha.dt.strftime("%Y-%m-%d"),
+        "hora": hora.dt.strftime("%H:%M:%S"),
+        "vigilante": df["vigilante"],
+        "piso": df["piso"],
+        "ubicacion": df["ubicacion"],
+        "area": area,
+        "nombre_cw": df["nombre_cw"],
+        "pos": pos.astype("Int64"),
+        "sku": sku,
+        "familia": familia,
+        "producto": producto,
+        "cantidad": cantidad,
+        "pvp": pvp,
+        "total": cantidad * pvp,
+        "descripcion": df["descripcion"],
+        "mes": _nombres(MESES, fecha.dt.month - 1),
+        "dia": _nombres(DIAS, fecha.dt.weekday),
+        "rango_horas": _nombres(ORDEN_RANGOS, hora.dt.hour),
+    }, index=df.index)
+    return salida[COLUMNAS["RECUPERACIONES"]], e
+
+
+def validar_warehouse(df, df_sku, df_usuarioswh):
+    e = _Errores(df.index)
+    catalogo = _catalogo_hfb(df_sku)
+
+    fecha = _fechas(df, e)
+    _valida_opcion(df, "proceso_auditoria", opciones.PROCESOS_AUDITORIA, e)
+    _valida_opcion(df, "tipo_documento", opciones.TIPOS_DOCUMENTO, e)
+    _valida_opcion(df, "tipo_novedad", opciones.TIPOS_NOVEDAD, e)
+    _valida_opcion(df, "area", opciones.AREAS_WAREHOUSE, e)
+    e.error(df["numero_documento"] == "", "número de documento obligatorio")
+
+    sku, producto, familia = _sku(df, catalogo, e)
+    e.error(producto == "", "SKU no está en HFB")
+
+    # El usuario WH se resuelve por código, como en el formulario
+    usuarios = df_usuarioswh.assign(USUARIO=codigos(df_usuarioswh["USUARIO"]))
+    usuarios = usuarios[usuarios["USUARIO"] != ""].drop_duplicates("USUARIO").set_index("USUARIO")["NOMBRE"]
+    picker = df["usuario"].map(usuarios)
+    e.error(picker.isna(), "usuario WH no existe")
+
+    cantidad = _numero(df, "cantidad", 1, e, "unidades debe ser 1 o más")
+    costo = _numero(df, "costo", 1, e, "valor unitario obligatorio")
+
+    salida = pd.DataFrame({
+        "fecha_registro": datetime.now(ZoneInfo("America/Bogota")).strftime("%Y-%m-%d %H:%M:%S"),
+        "fecha": fecha.dt.strftime("%Y-%m-%d"),
+        "proceso_auditoria": df["proceso_auditoria"],
+        "novedad": df["novedad"],
+        "tipo_documento": df["tipo_documento"],
+        "numero_documento": df["numero_documento"],
+        "sku": sku,
+        "auditor": df["auditor"],
+        "picker": picker.fillna(""),
+        "documento_usuario": df["usuario"],
+        "observaciones": df["observaciones"],
+        "tipo_novedad": df["tipo_novedad"],
+        "area": df["area"],
+        "cantidad": cantidad,
+        "costo": costo,
+        "total": cantidad * costo,
+        "numero_semana": fecha.dt.isocalendar().week.astype("Int64"),
+    }, index=df.index)
+    return salida[COLUMNAS["WAREHOUSE"]], e
+
+
+def _nombres(lista, posiciones):
+    nombres = np.array(lista, dtype=object)
+    validas = posiciones.notna()
+    resultado = pd.Series("", index=posiciones.index, dtype=object)
+    resultado[validas] = nombres[posiciones[validas].astype(int).to_numpy()]
+    return resultado
+
+
+VALIDADORES = {
+    "RECUPERACIONES": validar_recuperaciones,
+    "WAREHOUSE": validar_warehouse,
+}
+
+
+def validar(nombre, df, df_sku, df_personas):
+    faltantes = [c for c in REQUERIDAS[nombre] if c not in df.columns]
+    if faltantes:
+        raise ValueError(f"Faltan columnas obligatorias: {', '.join(faltantes)}")
+    for columna in OPCIONALES[nombre]:
+        if columna not in df.columns:
+            df[columna] = ""
+
+    salida, e = VALIDADORES[nombre](df, df_sku, df_personas)
+    reporte = pd.DataFrame({
+        "fila": df.index + 2,  # +1 por el encabezado y +1 porque Excel cuenta desde 1
+        "errores": e.errores.str.rstrip("; "),
+        "advertencias": e.advertencias.str.rstrip("; "),
+    })
+    aceptadas = salida[e.errores == ""]
+    return aceptadas, reporte
+
+
+def _nativo(valor):
+    if pd.isna(valor):
+        return ""
+    if hasattr(valor, "item"):
+        valor = valor.item()
+    if isinstance(valor, float) and valor.is_integer():
+        return int(valor)
+    return valor
+
+
+def a_filas(df):
+    # Valores nativos de Python, listos para append_rows
+    return [[_nativo(v) for v in fila] for fila in df.itertuples(index=False, name=None)]
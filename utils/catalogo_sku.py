@@ -0,0 +1,116 @@
+import numpy as np
+import streamlit as st
+
+from utils import espejo
+from utils.busqueda import IndiceNombres
+from utils.esquemas import codigos
+from utils.metricas import medir
+
+# === CONFIGURACIÓN ===
+# Columnas de HFB que se devuelven en cada búsqueda además de ITEM y FAMILIA
+PALABRAS_PRECIO = ("PVP", "PRECIO", "COSTO", "VALOR")
+
+
+def normalizar_sku(sku):
+    # Vacío, None o NaN no son un SKU; 123456.0 es 00123456
+    if isinstance(sku, float):
+        if sku != sku:
+            return ""
+        if sku.is_integer():
+            sku = int(sku)
+    sku = "" if sku is None else str(sku).strip()
+    return sku.zfill(8) if sku else ""
+
+
+# === CATÁLOGO INDEXADO ===
+# Se construye una vez por versión de HFB y lo comparten todas las sesiones.
+# Los SKU quedan en un arreglo ordenado de numpy (búsqueda exacta y por prefijo
+# con searchsorted) junto a la fila de cada uno en el DataFrame de HFB, que no se
+# copia (es la instantánea compartida por las réplicas, ver utils.compartido), y
+# los nombres en un índice de trigramas (utils.busqueda).
+class CatalogoSKU:
+    def __init__(self, df):
+        columnas = ["ITEM", "FAMILIA"] + [
+            c for c in df.columns
+            if c not in ("SKU", "ITEM", "FAMILIA") and any(p in str(c).upper() for p in PALABRAS_PRECIO)
+        ]
+        claves = codigos(df["SKU"])
+        validos = (claves != "").to_numpy()
+        claves = claves[validos].str.zfill(8).to_numpy(dtype=object).astype(str)
+
+        # Si un SKU aparece repetido se conserva la primera fila, como hacía .iloc[0]
+        orden = np.argsort(claves, kind="stable")
+        ordenados = claves[orden]
+        primeros = np.ones(len(ordenados), dtype=bool)
+        primeros[1:] = ordenados[1:] != ordenados[:-1]
+        orden = orden[primeros]
+
+        self.columnas = columnas
+        self._skus = ordenados[primeros]
+        self._filas = np.flatnonzero(validos)[orden]
+        self._df = df
+        self._nombres = IndiceNombres(df["ITEM"].iloc[self._filas] if "ITEM" in df else [""] * len(orden), self._skus)
+
+    def __len__(self):
+        return len(self._skus)
+
+    def _posicion(self, sku):
+        sku = normalizar_sku(sku)
+        i = int(np.searchsorted(self._skus, sku))
+        if i < len(self._skus) and self._skus[i] == sku:
+            return i
+        return None
+
+    def __contains__(self, sku):
+        return self._posicion(sku) is not None
+
+    def buscar(self, sku):
+        i = self._posicion(sku)
+        if i is None:
+            return None
+        fila = self._df.iloc[self._filas[i]].reindex(self.columnas)
+        # Valores nativos de Python, como los devolvía to_dict("records")
+        return {c: v.item() if isinstance(v, np.generic) else v for c, v in fila.items()}
+
+    def por_prefijo(self, prefijo, limite=20):
+        prefijo = str(prefijo).strip()
+        inicio = int(np.searchsorted(self._skus, prefijo, "left"))
+        fin = int(np.searchsorted(self._skus, prefijo + "\uffff", "left"))
+        return self._skus[inicio:min(fin, inicio + limite)].tolist()
+
+    def por_nombre(self, texto, limite=20):
+        # Sin tildes y tolerante a errores de tipeo: "lampra" encuentra LÁMPARA
+        return self._nombres.buscar(texto, limite)
+
+    def sugerencias(self, consulta, limite=20):
+        # Los SKU se escriben con o sin puntos (703.456.78); el resto se busca en ITEM
+        consulta = str(consulta).strip()
+        codigo = consulta.replace(".", "").replace(" ", "")
+        if not codigo.isdigit():
+            return self.por_nombre(consulta, limite)
+        # También sin los ceros a la izquierda: "123456" encuentra 00123456 y
+        # "1234" los que empiezan por 001234, 0001234...
+        encontrados = []
+        for ceros in range(max(0, 8 - len(codigo)) + 1):
+            for sku in self.por_prefijo("0" * ceros + codigo, limite):
+                if sku not in encontrados:
+                    encontrados.append(sku)
+        exacto = codigo.zfill(8)
+        if exacto in encontrados:
+            encontrados.remove(exacto)
+            encontrados.insert(0, exacto)
+        return encontrados[:limite]
+
+
+@st.cache_resource(show_spinner=False, max_entries=2)
+def _construir_catalogo(version):
+    with medir("construir_catalogo"):
+        return CatalogoSKU(espejo.cargar_hoja("HFB"))
+
+
+def obtener_catalogo_sku():
+    return _construir_catalogo(espejo.version_vigente("HFB"))
+
+
+# El hilo de fondo arma el catálogo nuevo apenas cambia HFB
+espejo.al_actualizar("HFB", _construir_catalogo)
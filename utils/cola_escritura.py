@@ -0,0 +1,273 @@
+import json
+import logging
+import os
+import random
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+from utils import anomalias, reportes
+from utils.conexion import obtener_hoja
+from utils.espejo import DIR_DATOS, registrar_escritura
+
+# === CONFIGURACIÓN ===
+# Cada registro se guarda primero en un diario local (SQLite en modo WAL) y el
+# usuario recibe la confirmación de inmediato. Un hilo de fondo envía los
+# pendientes a Google Sheets con append_rows, agrupados por hoja.
+RUTA_COLA = os.path.join(DIR_DATOS, "cola.sqlite")
+
+LOTE_MAXIMO = 500          # filas por llamada a append_rows
+ESPERA_AGRUPAR = 1.0       # segundos que se espera para juntar registros en ráfaga
+RESERVA = 120              # segundos que un lote queda reservado mientras se envía
+ESPERA_BASE = 2            # primer reintento tras un error
+ESPERA_MAXIMA = 5*60
+
+log = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_lock_entrega = threading.Lock()     # escritura en el espejo y borrado del diario de un lote
+_hay_trabajo = threading.Event()
+_conexion = None
+_hilo = None
+_al_encolar = []
+
+
+# === DIARIO LOCAL ===
+def _db():
+    global _conexion
+    if _conexion is None:
+        os.makedirs(DIR_DATOS, exist_ok=True)
+        conexion = sqlite3.connect(RUTA_COLA, check_same_thread=False, isolation_level=None, timeout=30)
+        conexion.execute("PRAGMA journal_mode=WAL")
+        conexion.execute("PRAGMA synchronous=FULL")
+        conexion.execute("""
+            CREATE TABLE IF NOT EXISTS pendientes (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                hoja TEXT NOT NULL,
+                valores TEXT NOT NULL,
+                creado REAL NOT NULL,
+                intentos INTEGER NOT NULL DEFAULT 0,
+                siguiente REAL NOT NULL DEFAULT 0,
+                error TEXT,
+                retenida INTEGER NOT NULL DEFAULT 0
+            )
+        """)
+        _conexion = conexion
+    return _conexion
+
+
+def _a_json(valor):
+    # Tipos de numpy/pandas se convierten a nativos; el resto se guarda como texto
+    if hasattr(valor, "item"):
+        return valor.item()
+    return str(valor)
+
+
+def encolar(hoja, fila, retener=0):
+    return encolar_lote(hoja, [fila], retener)
+
+
+def encolar_lote(hoja, filas, retener=0):
+    # Todas las filas entran en una sola transacción; el trabajador las envía de a
+    # LOTE_MAXIMO. Con `retener` no se envían antes de esos segundos salvo que
+    # completar() las libere (ver utils.evidencias). Devuelve el id de la última.
+    ahora = time.time()
+    with _lock:
+        db = _db()
+        db.execute("BEGIN")
+        try:
+            db.executemany(
+                "INSERT INTO pendientes (hoja, valores, creado, siguiente, retenida) VALUES (?, ?, ?, ?, ?)",
+                (
+                    (hoja, json.dumps(list(fila), ensure_ascii=False, default=_a_json), ahora,
+                     ahora + retener if retener else 0, 1 if retener else 0)
+                    for fila in filas
+                )
+            )
+            # Los ids de una transacción son consecutivos: basta el último
+            ultimo = db.execute("SELECT last_insert_rowid()").fetchone()[0]
+            db.execute("COMMIT")
+        except Exception:
+            db.execute("ROLLBACK")
+            raise
+    iniciar_trabajador()
+    _hay_trabajo.set()
+    for funcion in _al_encolar:
+        try:
+            funcion(hoja, filas, ultimo)
+        except Exception:
+            log.exception("Falló un aviso de registro nuevo en %s", hoja)
+    return ultimo
+
+
+def completar(id_, fila):
+    # Reemplaza los valores de una fila retenida y la deja lista para enviar. Si la
+    # retención venció y el trabajador ya la reservó (se está enviando o se envió
+    # tal cual) no la toca y devuelve False.
+    with _lock:
+        cursor = _db().execute(
+            "UPDATE pendientes SET valores = ?, siguiente = 0, retenida = 0 WHERE id = ? AND retenida = 1",
+            (json.dumps(list(fila), ensure_ascii=False, default=_a_json), id_)
+        )
+    _hay_trabajo.set()
+    return cursor.rowcount == 1
+
+
+def retenidas():
+    # [(id, hoja, fila)] de las filas que aún esperan a completar(); las que el
+    # trabajador ya reservó no están
+    with _lock:
+        filas = _db().execute(
+            "SELECT id, hoja, valores FROM pendientes WHERE retenida = 1 ORDER BY id"
+        ).fetchall()
+    return [(id_, hoja, json.loads(valores)) for id_, hoja, valores in filas]
+
+
+def al_encolar(funcion):
+    # funcion(hoja, filas, ultimo_id) se llama con cada registro ya guardado en el
+    # diario, en el hilo de la sesión que registró (p. ej. el tablero del día)
+    _al_encolar.append(funcion)
+
+
+def pendientes():
+    with _lock:
+        return _db().execute(
+            "SELECT hoja, COUNT(*), MIN(creado), MAX(intentos), MAX(error) FROM pendientes GROUP BY hoja"
+        ).fetchall()
+
+
+@contextmanager
+def sin_entregas():
+    # Mientras dura, ningún lote enviado pasa del diario al espejo
+    with _lock_entrega:
+        yield
+
+
+def filas_pendientes(hojas):
+    # Filas aún sin enviar y el último id asignado hasta ahora, en una misma lectura:
+    # un aviso de al_encolar con id mayor es de una fila que no está aquí
+    marcas = ", ".join("?" for _ in hojas)
+    with _lock:
+        db = _db()
+        db.execute("BEGIN")
+        try:
+            secuencia = db.execute("SELECT seq FROM sqlite_sequence WHERE name = 'pendientes'").fetchone()
+            filas = db.execute(
+                f"SELECT hoja, valores FROM pendientes WHERE hoja IN ({marcas}) ORDER BY id", list(hojas)
+            ).fetchall()
+            db.execute("COMMIT")
+        except Exception:
+            db.execute("ROLLBACK")
+            raise
+    por_hoja = {hoja: [] for hoja in hojas}
+    for hoja, valores in filas:
+        por_hoja[hoja].append(json.loads(valores))
+    return (secuencia[0] if secuencia else 0), por_hoja
+
+
+# === ENVÍO A GOOGLE SHEETS ===
+def _reservar_lote():
+    # Se reserva el lote dentro de una transacción para que otro proceso que
+    # comparta el diario no envíe las mismas filas
+    ahora = time.time()
+    with _lock:
+        db = _db()
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            fila = db.execute(
+                "SELECT hoja FROM pendientes WHERE siguiente <= ? ORDER BY id LIMIT 1", (ahora,)
+            ).fetchone()
+            if fila is None:
+                db.execute("COMMIT")
+                return None, []
+            hoja = fila[0]
+            lote = db.execute(
+                "SELECT id, valores, intentos FROM pendientes WHERE hoja = ? AND siguiente <= ? ORDER BY id LIMIT ?",
+                (hoja, ahora, LOTE_MAXIMO)
+            ).fetchall()
+            # Reservar una fila retenida vencida termina su retención: completar()
+            # ya no puede cambiarla mientras se envía
+            db.executemany(
+                "UPDATE pendientes SET siguiente = ?, retenida = 0 WHERE id = ?",
+                ((ahora + RESERVA, id_) for id_, _, _ in lote)
+            )
+            db.execute("COMMIT")
+        except Exception:
+            db.execute("ROLLBACK")
+            raise
+    return hoja, lote
+
+
+def _confirmar(ids):
+    with _lock:
+        _db().executemany("DELETE FROM pendientes WHERE id = ?", ((i,) for i in ids))
+
+
+def _reprogramar(lote, error):
+    ahora = time.time()
+    with _lock:
+        _db().executemany(
+            "UPDATE pendientes SET intentos = ?, siguiente = ?, error = ? WHERE id = ?",
+            (
+                (intentos + 1, ahora + min(ESPERA_BASE * 2**intentos, ESPERA_MAXIMA) * random.uniform(0.5, 1.5),
+                 str(error)[:500], id_)
+                for id_, _, intentos in lote
+            )
+        )
+
+
+def enviar_pendientes():
+    enviados = 0
+    while True:
+        hoja, lote = _reservar_lote()
+        if not lote:
+            return enviados
+        filas = [json.loads(valores) for _, valores, _ in lote]
+        try:
+            respuesta = obtener_hoja(hoja).append_rows(filas)
+        except Exception as e:
+            log.warning("No se pudieron enviar %s filas a %s: %s", len(filas), hoja, e)
+            _reprogramar(lote, e)
+            continue
+        # Al espejo y fuera del diario como un solo paso: quien lea los dos dentro
+        # de sin_entregas() (el tablero del día) encuentra cada fila en uno solo
+        with _lock_entrega:
+            try:
+                registrar_escritura(hoja, filas, respuesta)
+            except Exception:
+                log.exception("No se pudo actualizar el espejo de %s", hoja)
+            _confirmar([id_ for id_, _, _ in lote])
+        enviados += len(filas)
+        # Los resúmenes y las series se actualizan en sus propios hilos
+        reportes.pedir_actualizacion(hoja)
+        anomalias.pedir_actualizacion(hoja)
+
+
+def _proxima_espera():
+    with _lock:
+        fila = _db().execute("SELECT MIN(siguiente) FROM pendientes").fetchone()
+    if fila[0] is None:
+        return None
+    return max(0.0, fila[0] - time.time())
+
+
+def _trabajar():
+    while True:
+        espera = _proxima_espera()
+        _hay_trabajo.wait(timeout=espera if espera is not None else 60)
+        _hay_trabajo.clear()
+        # Se espera un momento para que los registros en ráfaga viajen en la misma llamada
+        time.sleep(ESPERA_AGRUPAR)
+        try:
+            enviar_pendientes()
+        except Exception:
+            log.exception("Error en el envío de registros pendientes")
+
+
+def iniciar_trabajador():
+    global _hilo
+    with _lock:
+        if _hilo is None or not _hilo.is_alive():
+            _hilo = threading.Thread(target=_trabajar, name="cola-escritura", daemon=True)
+            _hilo.start()
@@ -0,0 +1,145 @@
+import logging
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+# === CONFIGURACIÓN ===
+# Coordinación entre los procesos de Streamlit de un mismo servidor (varias réplicas
+# detrás del balanceador). Todos comparten el directorio de datos: el espejo SQLite,
+# los bloqueos de archivo y las instantáneas de los catálogos.
+DIR_DATOS = os.environ.get(
+    "REPORTES_DATOS",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "datos")
+)
+DIR_BLOQUEOS = os.path.join(DIR_DATOS, "bloqueos")
+DIR_INSTANTANEAS = os.path.join(DIR_DATOS, "catalogos")
+
+log = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_liderazgos = {}
+
+
+def _archivo(nombre):
+    return re.sub(r"[^A-Za-z0-9_-]+", "_", nombre)
+
+
+# === BLOQUEOS DE ARCHIVO ===
+def _abrir_bloqueo(nombre):
+    os.makedirs(DIR_BLOQUEOS, exist_ok=True)
+    return open(os.path.join(DIR_BLOQUEOS, f"{_archivo(nombre)}.lock"), "a+b")
+
+
+def _tomar(archivo, esperar):
+    if fcntl is not None:
+        try:
+            fcntl.flock(archivo.fileno(), fcntl.LOCK_EX | (0 if esperar else fcntl.LOCK_NB))
+            return True
+        except BlockingIOError:
+            return False
+    while True:
+        try:
+            archivo.seek(0)
+            msvcrt.locking(archivo.fileno(), msvcrt.LK_NBLCK, 1)
+            return True
+        except OSError:
+            if not esperar:
+                return False
+            time.sleep(0.05)
+
+
+def _soltar(archivo):
+    if fcntl is not None:
+        fcntl.flock(archivo.fileno(), fcntl.LOCK_UN)
+    else:
+        archivo.seek(0)
+        msvcrt.locking(archivo.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+@contextmanager
+def exclusivo(nombre):
+    # Un solo proceso del servidor a la vez (dentro del proceso se combina con un lock)
+    archivo = _abrir_bloqueo(nombre)
+    try:
+        _tomar(archivo, esperar=True)
+        try:
+            yield
+        finally:
+            _soltar(archivo)
+    finally:
+        archivo.close()
+
+
+def lider(nombre):
+    # El primer proceso que toma el bloqueo lo conserva mientras viva; si muere el
+    # sistema operativo lo libera y otro proceso lo toma en su próxima consulta
+    with _lock:
+        if nombre not in _liderazgos:
+            archivo = _abrir_bloqueo(nombre)
+            if not _tomar(archivo, esperar=False):
+                archivo.close()
+                return False
+            log.info("Este proceso (%d) queda a cargo de %s", os.getpid(), nombre)
+            _liderazgos[nombre] = archivo
+        return True
+
+
+def es_lider(nombre):
+    return nombre in _liderazgos
+
+
+# === INSTANTÁNEAS DE CATÁLOGOS ===
+# Cada versión de un catálogo se guarda una vez como archivo Arrow y cada proceso
+# lo abre con memory-map: el texto (ITEM, nombres) y los números quedan en el
+# caché de páginas del sistema, una sola copia para todas las réplicas. Son de
+# solo lectura, como los DataFrame de utils.espejo.
+def _ruta(nombre, version):
+    return os.path.join(DIR_INSTANTANEAS, f"{_archivo(nombre)}.{version}.arrow")
+
+
+def abrir_instantanea(nombre, version):
+    import pyarrow as pa
+
+    try:
+        mapa = pa.memory_map(_ruta(nombre, version))
+    except FileNotFoundError:
+        return None
+    return pa.ipc.open_file(mapa).read_all().to_pandas(split_blocks=True)
+
+
+def guardar_instantanea(nombre, version, df):
+    import pyarrow as pa
+
+    os.makedirs(DIR_INSTANTANEAS, exist_ok=True)
+    ruta = _ruta(nombre, version)
+    temporal = f"{ruta}.{os.getpid()}.tmp"
+    tabla = pa.Table.from_pandas(df, preserve_index=False)
+    with pa.OSFile(temporal, "wb") as salida, pa.ipc.new_file(salida, tabla.schema) as escritor:
+        escritor.write_table(tabla)
+    # Cambio atómico: nadie ve nunca un archivo a medio escribir
+    os.replace(temporal, ruta)
+    _limpiar(nombre, version)
+    return abrir_instantanea(nombre, version)
+
+
+def _limpiar(nombre, vigente):
+    # Las versiones anteriores se borran; quien aún las tenga abiertas sigue
+    # leyéndolas hasta soltarlas (en Windows el borrado espera a la próxima vez)
+    prefijo = f"{_archivo(nombre)}."
+    for archivo in os.listdir(DIR_INSTANTANEAS):
+        if not archivo.startswith(prefijo) or archivo.endswith(".tmp"):
+            continue
+        version = archivo[len(prefijo):].split(".")[0]
+        if version.isdigit() and int(version) < vigente:
+            try:
+                os.remove(os.path.join(DIR_INSTANTANEAS, archivo))
+            except OSError:
+                pass
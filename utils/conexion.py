@@ -0,0 +1,87 @@
+import re
+import threading
+
+import streamlit as st
+import gspread
+from google.oauth2 import service_account
+
+from utils import cuota
+from utils.metricas import contar, medir
+
+# === CONFIGURACIÓN ===
+SCOPES = ["https://www.googleapis.com/auth/spreadsheets"]
+
+HOJAS = [
+    "VIGILANTES",
+    "HFB",
+    "RECUPERACIONES",
+    "AUDITORIA BODEGA",
+    "WAREHOUSE",
+    "USUARIOS WH",
+]
+
+_lock_hojas = threading.Lock()
+
+# Operación de la API al final de la URL (values:append, values:batchGet...)
+_OPERACION = re.compile(r":(append|batchGet|batchUpdate|batchClear|clear)$")
+
+
+# === CLIENTE HTTP MEDIDO ===
+# Cuenta y cronometra cada llamada a la API de Sheets para el panel de diagnóstico.
+# Todas pasan por el planificador de cuota: límite por minuto, prioridades,
+# lecturas idénticas compartidas y reintentos ante 429.
+class ClienteMedido(gspread.HTTPClient):
+    def request(self, method, endpoint, params=None, *args, **kwargs):
+        operacion = _OPERACION.search(endpoint)
+        fase = f"api:{operacion.group(1) if operacion else method.lower()}"
+
+        def llamar():
+            contar("api")
+            with medir(fase):
+                return super(ClienteMedido, self).request(method, endpoint, params, *args, **kwargs)
+
+        clave = (method.upper(), endpoint, repr(sorted((params or {}).items())))
+        return cuota.ejecutar(method, llamar, clave)
+
+
+# === CLIENTE AUTORIZADO (uno por proceso) ===
+# Las credenciales de google-auth se renuevan solas: AuthorizedSession pide un
+# token nuevo cuando el actual vence, así que el cliente vive lo mismo que el servidor.
+@st.cache_resource(show_spinner=False)
+def obtener_cliente():
+    with medir("auth"):
+        credentials = service_account.Credentials.from_service_account_info(
+            st.secrets["connections"]["gsheets"]["credentials"],
+            scopes=SCOPES
+        )
+        return gspread.authorize(credentials, http_client=ClienteMedido)
+
+
+# === SPREADSHEET Y HOJAS (abiertos una sola vez) ===
+@st.cache_resource(show_spinner=False)
+def obtener_spreadsheet():
+    gc = obtener_cliente()
+    spreadsheet_id = st.secrets["connections"]["gsheets"]["spreadsheet"]
+    with medir("abrir_spreadsheet"):
+        return gc.open_by_key(spreadsheet_id)
+
+
+@st.cache_resource(show_spinner=False)
+def _cache_hojas():
+    # Una sola llamada de metadatos trae todas las hojas del libro
+    sh = obtener_spreadsheet()
+    return {ws.title: ws for ws in sh.worksheets()}
+
+
+def obtener_hoja(nombre):
+    hojas = _cache_hojas()
+    ws = hojas.get(nombre)
+    if ws is None:
+        # Hoja creada después de arrancar el servidor
+        with _lock_hojas:
+            ws = hojas.get(nombre)
+            if ws is None:
+                ws = obtener_spreadsheet().worksheet(nombre)
+                hojas[nombre] = ws
+    return ws
+
@@ -0,0 +1,225 @@
+import threading
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+from utils import espejo
+from utils.esquemas import a_dataframe
+
+# === CONFIGURACIÓN ===
+# Campos de búsqueda de cada hoja y las columnas que los alimentan.
+# "persona" en WAREHOUSE encuentra tanto al auditor como al picker.
+DIMENSIONES = {
+    "RECUPERACIONES": {
+        "sku": ["sku"],
+        "tienda": ["tienda"],
+        "persona": ["vigilante"],
+    },
+    "AUDITORIA BODEGA": {
+        "tienda": ["tienda"],
+        "persona": ["vigilante"],
+    },
+    "WAREHOUSE": {
+        "sku": ["sku"],
+        "persona": ["auditor", "picker"],
+        "documento": ["numero_documento"],
+        "area": ["area"],
+    },
+}
+
+
+def _agrupar(nombre, df, desplazamiento=0):
+    grupos = {}
+    for dimension, columnas in DIMENSIONES[nombre].items():
+        indice = {}
+        for columna in columnas:
+            for valor, posiciones in df.groupby(columna, observed=True, sort=False).indices.items():
+                if valor == "":
+                    continue
+                posiciones = posiciones + desplazamiento
+                if valor in indice:
+                    posiciones = np.union1d(indice[valor], posiciones)
+                indice[valor] = posiciones
+        grupos[dimension] = indice
+    return grupos
+
+
+def _concatenar(df, nuevas):
+    # Las columnas categóricas se unen sin perder el tipo
+    columnas = {}
+    for columna in df.columns:
+        if isinstance(df[columna].dtype, pd.CategoricalDtype):
+            columnas[columna] = union_categoricals([df[columna], nuevas[columna]], ignore_order=True)
+        else:
+            columnas[columna] = pd.concat([df[columna], nuevas[columna]], ignore_index=True)
+    return pd.DataFrame(columnas)
+
+
+# === ÍNDICE DE UNA HOJA DE TRANSACCIONES ===
+# Copia tipada de la hoja con índices secundarios: valor -> posiciones (ordenadas)
+# para cada dimensión y un orden por fecha para los rangos con searchsorted.
+# Las hojas con tienda tienen además un orden por fecha por tienda: una consulta
+# de una tienda y un rango de fechas solo recorre la partición de esa tienda.
+# Cada versión es inmutable; las filas nuevas producen un índice extendido.
+class IndiceTransacciones:
+    def __init__(self, nombre, df, version=None, base=None, indices=None, correccion=0):
+        self.nombre = nombre
+        self.df = df
+        self.version = version
+        self.base = base
+        self.correccion = correccion
+        self.indices = indices if indices is not None else _agrupar(nombre, df)
+
+        fechas = df["fecha"].to_numpy(dtype="datetime64[ns]")
+        validas = np.flatnonzero(~np.isnat(fechas))
+        orden = validas[np.argsort(fechas[validas], kind="stable")]
+        self._orden_fecha = orden
+        self._fechas_ordenadas = fechas[orden]
+
+        self._particiones = {}
+        if "tienda" in df:
+            codigos = df["tienda"].cat.codes.to_numpy()[orden]
+            for codigo, tienda in enumerate(df["tienda"].cat.categories):
+                if tienda == "":
+                    continue
+                en_tienda = codigos == codigo
+                self._particiones[tienda] = (orden[en_tienda], self._fechas_ordenadas[en_tienda])
+
+    def extender(self, filas, version, correccion):
+        n = len(self.df)
+        nuevas = a_dataframe(self.nombre, filas)
+        indices = {}
+        for dimension, grupos in _agrupar(self.nombre, nuevas, desplazamiento=n).items():
+            indice = dict(self.indices[dimension])
+            for valor, posiciones in grupos.items():
+                anteriores = indice.get(valor)
+                indice[valor] = posiciones if anteriores is None else np.concatenate([anteriores, posiciones])
+            indices[dimension] = indice
+        return IndiceTransacciones(self.nombre, _concatenar(self.df, nuevas), version, self.base, indices, correccion)
+
+    def corregir(self, filas, version, correccion):
+        # filas: {número de fila: valores} de filas ya indexadas que cambiaron en la hoja
+        posiciones = np.array(sorted(filas), dtype=np.intp) - 1
+        nuevas = a_dataframe(self.nombre, [filas[p + 1] for p in posiciones])
+        # Se añaden al final con los tipos unidos y cada corregida toma su fila nueva
+        tomar = np.arange(len(self.df))
+        tomar[posiciones] = len(self.df) + np.arange(len(posiciones))
+        df = _concatenar(self.df, nuevas).take(tomar).reset_index(drop=True)
+
+        indices = {}
+        for dimension, columnas in DIMENSIONES[self.nombre].items():
+            indice = dict(self.indices[dimension])
+            # Las filas corregidas salen de los valores que tenían y entran en los nuevos
+            for valor in {v for c in columnas for v in self.df[c].iloc[posiciones]}:
+                if valor in indice:
+                    restantes = np.setdiff1d(indice[valor], posiciones, assume_unique=True)
+                    if len(restantes):
+                        indice[valor] = restantes
+                    else:
+                        del indice[valor]
+            for valor, locales in _agrupar(self.nombre, nuevas)[dimension].items():
+                anteriores = indice.get(valor)
+                indice[valor] = posiciones[locales] if anteriores is None else np.union1d(anteriores, posiciones[locales])
+            indices[dimension] = indice
+        return IndiceTransacciones(self.nombre, df, version, self.base, indices, correccion)
+
+    def __len__(self):
+        return len(self.df)
+
+    def valores(self, dimension):
+        return sorted(self.indices.get(dimension, {}), key=str)
+
+    def _por_fecha(self, desde, hasta, particion=None):
+        orden, fechas = particion or (self._orden_fecha, self._fechas_ordenadas)
+        inicio = 0
+        fin = len(fechas)
+        if desde is not None:
+            inicio = np.searchsorted(fechas, np.datetime64(pd.Timestamp(desde), "ns"), "left")
+        if hasta is not None:
+            limite = np.datetime64(pd.Timestamp(hasta) + pd.Timedelta(days=1), "ns")
+            fin = np.searchsorted(fechas, limite, "left")
+        return np.sort(orden[inicio:fin])
+
+    def buscar(self, filtros=None, desde=None, hasta=None):
+        filtros = {d: v for d, v in (filtros or {}).items() if v not in (None, "")}
+        por_fechas = desde is not None or hasta is not None
+        particion = self._particiones.get(filtros.get("tienda")) if por_fechas else None
+        if particion is not None:
+            # El rango de fechas se busca dentro de la partición de la tienda
+            del filtros["tienda"]
+
+        # Se intersectan primero los conjuntos más pequeños
+        candidatos = []
+        for dimension, valor in filtros.items():
+            candidatos.append(self.indices.get(dimension, {}).get(valor, np.empty(0, dtype=np.intp)))
+        if por_fechas:
+            candidatos.append(self._por_fecha(desde, hasta, particion))
+        if not candidatos:
+            return np.arange(len(self.df))
+
+        candidatos.sort(key=len)
+        posiciones = candidatos[0]
+        for otras in candidatos[1:]:
+            if len(posiciones) == 0:
+                break
+            posiciones = np.intersect1d(posiciones, otras, assume_unique=True)
+        return posiciones
+
+    def consultar(self, filtros=None, desde=None, hasta=None, orden="fecha", descendente=True,
+                  pagina=1, tamano=50):
+        posiciones = self.buscar(filtros, desde, hasta)
+        total = len(posiciones)
+        if total and orden == "fecha":
+            # El orden por fecha ya está calculado: se filtra y se corta la página sin
+            # ordenar (en descendente, los del mismo día del último registrado al
+            # primero). Las filas sin fecha no están en él y van al final.
+            marca = np.zeros(len(self.df), dtype=bool)
+            marca[posiciones] = True
+            por_fecha = self._orden_fecha[marca[self._orden_fecha]]
+            marca[por_fecha] = False
+            posiciones = np.concatenate([por_fecha[::-1] if descendente else por_fecha, np.flatnonzero(marca)])
+        elif total and orden in self.df:
+            valores = self.df[orden].iloc[posiciones]
+            if isinstance(valores.dtype, pd.CategoricalDtype):
+                valores = valores.astype(str)
+            valores = valores.reset_index(drop=True).sort_values(
+                ascending=not descendente, na_position="last", kind="stable"
+            )
+            posiciones = posiciones[valores.index.to_numpy()]
+        inicio = max(0, (pagina - 1) * tamano)
+        return self.df.iloc[posiciones[inicio:inicio + tamano]], total
+
+
+_lock = threading.Lock()
+_indices = {}
+
+
+def obtener_indice(nombre):
+    version = espejo.version_vigente(nombre)
+    actual = _indices.get(nombre)
+    if actual is not None and actual.version == version:
+        return actual
+
+    with _lock, espejo.vista() as vista:
+        actual = _indices.get(nombre)
+        avance = None if actual is None else (actual.base, len(actual), actual.correccion)
+        info, reiniciar, desde, corregidas = espejo.cambios(vista, nombre, avance)
+        if actual is not None and actual.version == info["version"]:
+            return actual
+        if reiniciar:
+            df = a_dataframe(nombre, vista.leer_filas(nombre, hasta=info["filas"]))
+            nuevo = IndiceTransacciones(nombre, df, info["version"], info["base"], correccion=info["correccion"])
+        else:
+            # Desde la última descarga completa solo se añadieron o corrigieron filas:
+            # se cambian las corregidas y se indexa la cola
+            nuevo = actual
+            if corregidas:
+                nuevo = nuevo.corregir(
+                    {fila: despues for fila, _, despues in corregidas}, info["version"], info["correccion"]
+                )
+            nuevo = nuevo.extender(
+                vista.leer_filas(nombre, desde=desde, hasta=info["filas"]), info["version"], info["correccion"]
+            )
+        _indices[nombre] = nuevo
+        return nuevo
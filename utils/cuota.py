@@ -0,0 +1,178 @@
+import heapq
+import itertools
+import random
+import threading
+import time
+from contextlib import contextmanager
+
+from gspread.exceptions import APIError
+
+from utils.metricas import contar, medir
+
+# === CONFIGURACIÓN ===
+# Todas las llamadas a la API de Sheets del proceso pasan por aquí (ver
+# utils.conexion.ClienteMedido). La cuota de Google es por minuto y por usuario;
+# la cuenta de servicio es un solo usuario para todas las sesiones y tiendas.
+LECTURAS_POR_MINUTO = 60
+ESCRITURAS_POR_MINUTO = 60
+RESERVA = 0.25             # fracción de cada balde que la prioridad baja no puede usar
+
+REINTENTOS = 6             # reintentos ante 429 y errores 5xx
+REINTENTOS_LECTURA = 2     # una sesión esperando prefiere la copia local a esperar minutos
+ESPERA_BASE = 1.0          # segundos; se duplica en cada intento, con jitter
+ESPERA_MAXIMA = 64.0
+REINTENTABLES = {429, 500, 502, 503, 504}
+
+# Prioridades: menor número se atiende primero
+ALTA = 0      # escrituras de los registros de los usuarios
+NORMAL = 1    # lecturas que una sesión está esperando
+BAJA = 2      # actualizaciones en segundo plano
+
+_prioridad = threading.local()
+
+
+# === BALDE DE FICHAS CON PRIORIDADES ===
+# Se recarga de forma continua hasta `por_minuto` fichas. Quien espera pasa en
+# orden de prioridad y de llegada; la prioridad baja deja libre la reserva.
+class Balde:
+    def __init__(self, por_minuto, reserva=RESERVA):
+        self.capacidad = float(por_minuto)
+        self.tasa = por_minuto / 60
+        self.reserva = self.capacidad * reserva
+        self.fichas = self.capacidad
+        self._actualizado = time.monotonic()
+        self._cond = threading.Condition()
+        self._espera = []
+        self._turnos = itertools.count()
+
+    def _recargar(self):
+        ahora = time.monotonic()
+        self.fichas = min(self.capacidad, self.fichas + (ahora - self._actualizado) * self.tasa)
+        self._actualizado = ahora
+
+    def tomar(self, prioridad=NORMAL):
+        with self._cond:
+            turno = (prioridad, next(self._turnos))
+            heapq.heappush(self._espera, turno)
+            try:
+                while True:
+                    self._recargar()
+                    minimo = 1 + (self.reserva if prioridad >= BAJA else 0)
+                    if self._espera[0] == turno and self.fichas >= minimo:
+                        self.fichas -= 1
+                        return
+                    self._cond.wait(min(1.0, max(0.01, (minimo - self.fichas) / self.tasa)))
+            finally:
+                self._espera.remove(turno)
+                heapq.heapify(self._espera)
+                self._cond.notify_all()
+
+    def agotar(self):
+        # Google respondió 429: nadie vuelve a llamar hasta que el balde se recargue
+        with self._cond:
+            self._recargar()
+            self.fichas = min(self.fichas, 0.0)
+
+
+_lecturas = Balde(LECTURAS_POR_MINUTO)
+_escrituras = Balde(ESCRITURAS_POR_MINUTO)
+
+
+@contextmanager
+def prioridad(nivel):
+    anterior = getattr(_prioridad, "nivel", None)
+    _prioridad.nivel = nivel
+    try:
+        yield
+    finally:
+        _prioridad.nivel = anterior
+
+
+# === LECTURAS COMPARTIDAS (single-flight) ===
+# Lecturas idénticas simultáneas esperan la respuesta de la primera en vez de
+# gastar otra ficha de la cuota.
+class _Vuelo:
+    def __init__(self):
+        self.listo = threading.Event()
+        self.resultado = None
+        self.error = None
+
+
+_lock_vuelos = threading.Lock()
+_vuelos = {}
+
+
+def _compartida(clave, funcion):
+    with _lock_vuelos:
+        vuelo = _vuelos.get(clave)
+        lider = vuelo is None
+        if lider:
+            vuelo = _vuelos[clave] = _Vuelo()
+    if not lider:
+        contar("api_compartida")
+        vuelo.listo.wait()
+        if vuelo.error is not None:
+            raise vuelo.error
+        return vuelo.resultado
+
+    try:
+        vuelo.resultado = funcion()
+        return vuelo.resultado
+    except BaseException as e:
+        vuelo.error = e
+        raise
+    finally:
+        with _lock_vuelos:
+            del _vuelos[clave]
+        vuelo.listo.set()
+
+
+# === EJECUCIÓN CON CUOTA Y REINTENTOS ===
+def _espera(intento, error):
+    sugerida = error.response.headers.get("Retry-After") if error.response is not None else None
+    if sugerida and sugerida.isdigit():
+        return float(sugerida) + random.uniform(0, ESPERA_BASE)
+    return random.uniform(0, min(ESPERA_MAXIMA, ESPERA_BASE * 2 ** intento))
+
+
+def ejecutar(metodo, funcion, clave=None):
+    lectura = metodo.upper() == "GET"
+    balde = _lecturas if lectura else _escrituras
+    nivel = getattr(_prioridad, "nivel", None)
+    if nivel is None:
+        nivel = NORMAL if lectura else ALTA
+
+    reintentos = REINTENTOS_LECTURA if lectura and nivel <= NORMAL else REINTENTOS
+
+    def llamar():
+        for intento in range(reintentos + 1):
+            with medir("cuota:espera"):
+                balde.tomar(nivel)
+            try:
+                return funcion()
+            except APIError as e:
+                codigo = e.response.status_code if e.response is not None else e.code
+                if codigo not in REINTENTABLES or intento == reintentos:
+                    raise
+                if codigo == 429:
+                    balde.agotar()
+                contar(f"api_reintento:{codigo}")
+                time.sleep(_espera(intento, e))
+
+    if lectura and clave is not None:
+        return _compartida(clave, llamar)
+    return llamar()
+
+
+def estado():
+    filas = []
+    for nombre, balde in (("lecturas", _lecturas), ("escrituras", _escrituras)):
+        with balde._cond:
+            balde._recargar()
+            filas.append({
+                "cuota": nombre,
+                "fichas": balde.fichas,
+                "por_minuto": balde.capacidad,
+                "en_espera": len(balde._espera),
+            })
+    return filas
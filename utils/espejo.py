@@ -0,0 +1,700 @@
+import hashlib
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from contextlib import ExitStack, contextmanager
+
+import pandas as pd
+from google.auth.exceptions import TransportError
+from gspread.exceptions import APIError
+from requests.exceptions import RequestException
+
+from utils import compartido, cuota
+from utils.compartido import DIR_DATOS
+from utils.conexion import obtener_spreadsheet
+from utils.esquemas import TRANSACCIONES
+from utils.metricas import contar, medir
+
+# === CONFIGURACIÓN ===
+# Copia local en disco de las hojas de Google Sheets. Sobrevive reinicios, así que
+# el arranque en frío lee SQLite en vez de descargar los catálogos completos. Las
+# réplicas de un mismo servidor comparten el archivo (ver utils.compartido): solo
+# una de ellas actualiza los catálogos y cada hoja se sincroniza de a un proceso.
+RUTA_ESPEJO = os.path.join(DIR_DATOS, "espejo.sqlite")
+
+CATALOGOS = ["HFB", "VIGILANTES", "USUARIOS WH"]
+
+# Columnas de los catálogos que son códigos: siempre texto, con sus ceros a la
+# izquierda, aunque parezcan números (y aunque tengan celdas vacías)
+COLUMNAS_CODIGO = {"SKU", "USUARIO", "ID_TIENDA"}
+
+# Los catálogos los actualiza un hilo de fondo cada tanto (segundos); las sesiones
+# siempre leen la última copia buena sin esperar la descarga
+REFRESCO = {
+    "HFB": int(os.environ.get("REPORTES_REFRESCO_HFB", 15*60)),
+    "VIGILANTES": int(os.environ.get("REPORTES_REFRESCO_VIGILANTES", 5*60)),
+    "USUARIOS WH": int(os.environ.get("REPORTES_REFRESCO_USUARIOS_WH", 5*60)),
+}
+
+INTERVALO_SEGUIDOR = 15           # cada cuánto una réplica sin el refresco busca versiones nuevas
+INTERVALO_SONDEO = 5*60            # cada 5 minutos se busca si hay filas nuevas
+INTERVALO_REVISION = 6*60*60       # cada 6 horas se compara el catálogo completo
+BLOQUE_COLA = 500                  # filas nuevas que se piden por llamada
+BLOQUE_BARRIDO = 1000              # filas ya conocidas que se comparan en cada sondeo
+BLOQUE_HUELLA = 1000               # filas por huella de bloque (ver _huellas_bloques)
+MAX_CORRECCIONES = 2000            # correcciones que se guardan por hoja para los índices derivados
+
+# Las hojas de transacciones se leen sin formato: números como números y fechas
+# como texto, igual que las escriben las páginas de registro
+SIN_FORMATO = {"valueRenderOption": "UNFORMATTED_VALUE", "dateTimeRenderOption": "FORMATTED_STRING"}
+
+log = logging.getLogger(__name__)
+
+_lock = threading.RLock()
+_locks_hoja = {}
+_conexion = None
+_hilo = None
+_al_actualizar = {}
+_preparadas = {}
+
+
+# === BASE DE DATOS LOCAL ===
+def _db():
+    global _conexion
+    if _conexion is None:
+        os.makedirs(DIR_DATOS, exist_ok=True)
+        conexion = sqlite3.connect(RUTA_ESPEJO, check_same_thread=False, isolation_level=None, timeout=30)
+        conexion.execute("PRAGMA journal_mode=WAL")
+        conexion.execute("PRAGMA synchronous=NORMAL")
+        conexion.executescript("""
+            CREATE TABLE IF NOT EXISTS hojas (
+                nombre TEXT PRIMARY KEY,
+                encabezado TEXT NOT NULL,
+                filas INTEGER NOT NULL,
+                huella TEXT NOT NULL,
+                version INTEGER NOT NULL,
+                sondeado REAL NOT NULL,
+                revisado REAL NOT NULL,
+                base INTEGER NOT NULL,
+                barrido INTEGER NOT NULL,
+                correccion INTEGER NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS filas (
+                hoja TEXT NOT NULL,
+                fila INTEGER NOT NULL,
+                valores TEXT NOT NULL,
+                PRIMARY KEY (hoja, fila)
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS bloques (
+                hoja TEXT NOT NULL,
+                bloque INTEGER NOT NULL,
+                huella TEXT NOT NULL,
+                PRIMARY KEY (hoja, bloque)
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS correcciones (
+                hoja TEXT NOT NULL,
+                numero INTEGER NOT NULL,
+                fila INTEGER NOT NULL,
+                antes TEXT NOT NULL,
+                despues TEXT NOT NULL,
+                PRIMARY KEY (hoja, numero, fila)
+            ) WITHOUT ROWID;
+        """)
+        _conexion = conexion
+    return _conexion
+
+
+def _lock_hoja(nombre):
+    with _lock:
+        return _locks_hoja.setdefault(nombre, threading.Lock())
+
+
+@contextmanager
+def _exclusiva(nombre):
+    # Una sola sincronización por hoja: entre hilos de este proceso y entre réplicas
+    with _lock_hoja(nombre), compartido.exclusivo(f"hoja-{nombre}"):
+        yield
+
+
+def _limpiar(fila):
+    # La API recorta las celdas vacías al final de cada fila
+    fila = list(fila)
+    while fila and fila[-1] == "":
+        fila.pop()
+    return fila
+
+
+def _huella(filas, previa=""):
+    # Huella encadenada fila a fila de un grupo de filas
+    h = previa
+    for fila in filas:
+        h = hashlib.sha1((h + json.dumps(fila, ensure_ascii=False)).encode("utf-8")).hexdigest()
+    return h
+
+
+def _huellas_bloques(filas):
+    # Una huella por cada BLOQUE_HUELLA filas (alineadas desde la fila 1). La huella
+    # de la hoja combina las de sus bloques: corregir o añadir filas solo vuelve a
+    # calcular los bloques tocados, no toda la historia.
+    return [_huella(filas[i:i + BLOQUE_HUELLA]) for i in range(0, len(filas), BLOQUE_HUELLA)]
+
+
+def _huella_hoja(huellas):
+    return hashlib.sha1("".join(huellas).encode("ascii")).hexdigest()
+
+
+def _parametros(nombre):
+    return SIN_FORMATO if nombre in TRANSACCIONES else None
+
+
+def _rango(nombre, desde, hasta=None):
+    hoja = nombre.replace("'", "''")
+    return f"'{hoja}'!{desde}:{hasta or desde}"
+
+
+def _estado(db, nombre):
+    fila = db.execute(
+        "SELECT encabezado, filas, huella, version, sondeado, revisado, base, barrido, correccion FROM hojas WHERE nombre = ?",
+        (nombre,)
+    ).fetchone()
+    if fila is None:
+        return None
+    return {
+        "encabezado": json.loads(fila[0]),
+        "filas": fila[1],
+        "huella": fila[2],
+        "version": fila[3],
+        "sondeado": fila[4],
+        "revisado": fila[5],
+        # Versión de la última descarga completa; desde entonces solo se añadieron
+        # filas o se corrigieron en el lugar (ver correcciones())
+        "base": fila[6],
+        # Primera fila del próximo bloque que compara el barrido de verificación
+        "barrido": fila[7],
+        # Número de la última corrección de filas ya conocidas
+        "correccion": fila[8],
+    }
+
+
+def _leer(db, nombre, desde, hasta):
+    cursor = db.execute(
+        "SELECT valores FROM filas WHERE hoja = ? AND fila BETWEEN ? AND ? ORDER BY fila",
+        (nombre, desde, hasta if hasta is not None else 2**62)
+    )
+    # Un solo json.loads para todo el bloque es varias veces más rápido que uno por fila
+    return json.loads("[" + ",".join(v for (v,) in cursor) + "]")
+
+
+def estado(nombre):
+    with _lock:
+        return _estado(_db(), nombre)
+
+
+def leer_filas(nombre, desde=1, hasta=None):
+    with _lock:
+        return _leer(_db(), nombre, desde, hasta)
+
+
+# === LECTURA CONSISTENTE ===
+# Los índices derivados (utils.reportes, utils.anomalias, utils.consulta) leen el
+# estado, las filas nuevas y las correcciones de una misma foto del espejo: con su
+# propia conexión y una transacción de lectura (WAL) no ven escrituras a medias ni
+# toman el lock del módulo mientras leen.
+class Vista:
+    def __init__(self, db):
+        self._db = db
+
+    def estado(self, nombre):
+        return _estado(self._db, nombre)
+
+    def leer_filas(self, nombre, desde=1, hasta=None):
+        return _leer(self._db, nombre, desde, hasta)
+
+    def correcciones(self, nombre, desde):
+        # [(fila, antes, despues)] de las correcciones posteriores a la número `desde`,
+        # en orden; None si algunas ya se descartaron (hay que recalcular todo)
+        info = _estado(self._db, nombre)
+        if info is None or info["correccion"] <= desde:
+            return []
+        primera = self._db.execute("SELECT MIN(numero) FROM correcciones WHERE hoja = ?", (nombre,)).fetchone()[0]
+        if primera is None or primera > desde + 1:
+            return None
+        cursor = self._db.execute(
+            "SELECT fila, antes, despues FROM correcciones WHERE hoja = ? AND numero > ? ORDER BY numero, fila",
+            (nombre, desde)
+        )
+        return [(fila, json.loads(antes), json.loads(despues)) for fila, antes, despues in cursor]
+
+
+def cambios(vista, nombre, avance):
+    # Lo que un índice derivado con avance (base, filas, correccion) debe aplicar:
+    # (info, reiniciar, desde, corregidas). Si reiniciar, todo desde la fila 1; si no,
+    # las filas desde `desde` y las ya incluidas que se corrigieron, como
+    # (fila, antes, despues) en orden (una fila corregida dos veces aparece dos veces)
+    info = vista.estado(nombre)
+    if avance is None or avance[0] != info["base"] or avance[1] > info["filas"]:
+        return info, True, 1, []
+    correcciones = vista.correcciones(nombre, avance[2])
+    if correcciones is None:
+        return info, True, 1, []
+    return info, False, avance[1] + 1, [c for c in correcciones if c[0] <= avance[1]]
+
+
+@contextmanager
+def vista():
+    _db()
+    conexion = sqlite3.connect(RUTA_ESPEJO, isolation_level=None, timeout=30)
+    try:
+        conexion.execute("BEGIN")
+        conexion.execute("SELECT 1 FROM hojas LIMIT 1").fetchall()
+        yield Vista(conexion)
+        conexion.execute("COMMIT")
+    finally:
+        conexion.close()
+
+
+# === ESCRITURA EN EL ESPEJO ===
+def _guardar_bloques(db, nombre, primero, huellas):
+    db.executemany(
+        "INSERT OR REPLACE INTO bloques (hoja, bloque, huella) VALUES (?, ?, ?)",
+        ((nombre, i, h) for i, h in enumerate(huellas, start=primero))
+    )
+    todas = [h for (h,) in db.execute("SELECT huella FROM bloques WHERE hoja = ? ORDER BY bloque", (nombre,))]
+    return _huella_hoja(todas)
+
+
+def _reemplazar(nombre, encabezado, filas, version):
+    ahora = time.time()
+    huellas = _huellas_bloques(filas)
+    with _lock:
+        db = _db()
+        db.execute("BEGIN")
+        try:
+            db.execute("DELETE FROM filas WHERE hoja = ?", (nombre,))
+            db.execute("DELETE FROM bloques WHERE hoja = ?", (nombre,))
+            db.execute("DELETE FROM correcciones WHERE hoja = ?", (nombre,))
+            db.executemany(
+                "INSERT INTO filas (hoja, fila, valores) VALUES (?, ?, ?)",
+                ((nombre, i, json.dumps(f, ensure_ascii=False)) for i, f in enumerate(filas, start=1))
+            )
+            huella = _guardar_bloques(db, nombre, 0, huellas)
+            db.execute(
+                "INSERT OR REPLACE INTO hojas VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (nombre, json.dumps(encabezado, ensure_ascii=False), len(filas),
+                 huella, version, ahora, ahora, version, 1, 0)
+            )
+            db.execute("COMMIT")
+        except Exception:
+            db.execute("ROLLBACK")
+            raise
+
+
+def _agregar(nombre, nuevas, info):
+    # Solo se vuelven a calcular el último bloque (incompleto) y los nuevos; quien
+    # llama tiene la hoja en exclusiva, así que se calculan fuera del lock
+    primero = info["filas"] // BLOQUE_HUELLA
+    previas = leer_filas(nombre, desde=primero * BLOQUE_HUELLA + 1, hasta=info["filas"])
+    huellas = _huellas_bloques(previas + nuevas)
+    with _lock:
+        db = _db()
+        db.execute("BEGIN")
+        try:
+            db.executemany(
+                "INSERT OR REPLACE INTO filas (hoja, fila, valores) VALUES (?, ?, ?)",
+                ((nombre, info["filas"] + i, json.dumps(f, ensure_ascii=False))
+                 for i, f in enumerate(nuevas, start=1))
+            )
+            db.execute(
+                "UPDATE hojas SET filas = ?, huella = ?, version = ?, sondeado = ? WHERE nombre = ?",
+                (info["filas"] + len(nuevas), _guardar_bloques(db, nombre, primero, huellas),
+                 info["version"] + 1, time.time(), nombre)
+            )
+            db.execute("COMMIT")
+        except Exception:
+            db.execute("ROLLBACK")
+            raise
+
+
+def _corregir(nombre, desde, filas, info):
+    # Filas editadas en la hoja: se reemplazan en el lugar y quedan en el registro
+    # de correcciones (antes y después) para que los índices derivados corrijan solo
+    # esas filas. La base no cambia. Solo se vuelven a calcular los bloques tocados,
+    # fuera del lock: quien llama tiene la hoja en exclusiva.
+    hasta = desde + len(filas) - 1
+    primero = (desde - 1) // BLOQUE_HUELLA
+    inicio = primero * BLOQUE_HUELLA + 1
+    bloque = leer_filas(nombre, desde=inicio, hasta=min(((hasta - 1) // BLOQUE_HUELLA + 1) * BLOQUE_HUELLA, info["filas"]))
+    antes = bloque[desde - inicio:hasta - inicio + 1]
+    bloque[desde - inicio:hasta - inicio + 1] = filas
+    huellas = _huellas_bloques(bloque)
+    cambios = [(i, a, f) for i, (a, f) in enumerate(zip(antes, filas), start=desde) if a != f]
+
+    version = info["version"] + 1
+    numero = info["correccion"] + 1
+    with _lock:
+        db = _db()
+        db.execute("BEGIN")
+        try:
+            db.executemany(
+                "UPDATE filas SET valores = ? WHERE hoja = ? AND fila = ?",
+                ((json.dumps(f, ensure_ascii=False), nombre, i) for i, _, f in cambios)
+            )
+            db.executemany(
+                "INSERT INTO correcciones (hoja, numero, fila, antes, despues) VALUES (?, ?, ?, ?, ?)",
+                ((nombre, numero, i, json.dumps(a, ensure_ascii=False), json.dumps(f, ensure_ascii=False))
+                 for i, a, f in cambios)
+            )
+            db.execute("DELETE FROM correcciones WHERE hoja = ? AND numero <= ?", (nombre, numero - MAX_CORRECCIONES))
+            db.execute(
+                "UPDATE hojas SET huella = ?, version = ?, correccion = ? WHERE nombre = ?",
+                (_guardar_bloques(db, nombre, primero, huellas), version, numero, nombre)
+            )
+            db.execute("COMMIT")
+        except Exception:
+            db.execute("ROLLBACK")
+            raise
+    return version
+
+
+def _avanzar_barrido(nombre, siguiente, filas):
+    # Al pasar la última fila el barrido vuelve a empezar y la hoja queda revisada
+    with _lock:
+        if siguiente > filas:
+            _db().execute("UPDATE hojas SET barrido = 1, revisado = ? WHERE nombre = ?", (time.time(), nombre))
+        else:
+            _db().execute("UPDATE hojas SET barrido = ? WHERE nombre = ?", (siguiente, nombre))
+
+
+def _marcar_sondeo(nombre):
+    with _lock:
+        _db().execute("UPDATE hojas SET sondeado = ? WHERE nombre = ?", (time.time(), nombre))
+
+
+# === SINCRONIZACIÓN CON GOOGLE SHEETS ===
+def _leer_completas(nombres):
+    # Varias hojas completas en un solo batchGet (un rango con solo el nombre de la
+    # hoja trae todas sus celdas). Las de transacciones se piden sin formato, en otro.
+    grupos = {}
+    for nombre in nombres:
+        grupos.setdefault(nombre in TRANSACCIONES, []).append(nombre)
+    sh = obtener_spreadsheet()
+    valores = {}
+    for grupo in grupos.values():
+        rangos = ["'" + nombre.replace("'", "''") + "'" for nombre in grupo]
+        respuesta = sh.values_batch_get(rangos, params=_parametros(grupo[0]))["valueRanges"]
+        for nombre, rango in zip(grupo, respuesta):
+            valores[nombre] = rango.get("values", [])
+    return valores
+
+
+def _guardar_completa(nombre, info, valores):
+    encabezado = _limpiar(valores[0]) if valores else []
+    filas = [_limpiar(f) for f in valores[1:]]
+    if info and info["encabezado"] == encabezado and info["huella"] == _huella_hoja(_huellas_bloques(filas)):
+        # Sin cambios: solo se actualizan las marcas de tiempo
+        with _lock:
+            _db().execute(
+                "UPDATE hojas SET sondeado = ?, revisado = ? WHERE nombre = ?",
+                (time.time(), time.time(), nombre)
+            )
+        return info["version"]
+    version = info["version"] + 1 if info else 1
+    _reemplazar(nombre, encabezado, filas, version)
+    return version
+
+
+def _descarga_completa(nombre, info):
+    return _guardar_completa(nombre, info, _leer_completas([nombre])[nombre])
+
+
+def precargar(nombres):
+    # Las hojas que una página necesita y aún no están en el espejo se descargan
+    # juntas: una sola ida y vuelta en vez de una por hoja
+    faltan = [nombre for nombre in nombres if estado(nombre) is None]
+    if not faltan:
+        return
+    with ExitStack() as pila:
+        # Siempre en el mismo orden, para no bloquearse con otra precarga
+        for nombre in sorted(faltan):
+            pila.enter_context(_exclusiva(nombre))
+        faltan = [nombre for nombre in faltan if estado(nombre) is None]
+        if not faltan:
+            return
+        with medir("precargar"):
+            for nombre, valores in _leer_completas(faltan).items():
+                _guardar_completa(nombre, None, valores)
+
+
+def _sondeo_cola(nombre, info):
+    # Una sola llamada trae el encabezado, la última fila conocida y el siguiente bloque.
+    # Si el encabezado o la última fila cambiaron, hubo filas insertadas o borradas:
+    # se descarga completa. En las hojas de transacciones la misma llamada trae
+    # además un bloque de filas ya conocidas para el barrido de verificación.
+    sh = obtener_spreadsheet()
+    n = info["filas"]
+    ultima = leer_filas(nombre, desde=n)[-1:] if n else []
+    barrido = nombre in TRANSACCIONES and n > 0
+    desde = min(info["barrido"], n) if barrido else 0
+    hasta = min(desde + BLOQUE_BARRIDO - 1, n)
+    nuevas, remotas = [], None
+    while True:
+        inicio = n + len(nuevas) + 2
+        rangos = [_rango(nombre, 1), _rango(nombre, inicio - 1), _rango(nombre, inicio, inicio + BLOQUE_COLA - 1)]
+        if remotas is None and barrido:
+            rangos.append(_rango(nombre, desde + 1, hasta + 1))
+        respuesta = sh.values_batch_get(rangos, params=_parametros(nombre))["valueRanges"]
+        encabezado = _limpiar((respuesta[0].get("values") or [[]])[0])
+        anterior = _limpiar((respuesta[1].get("values") or [[]])[0])
+        bloque = [_limpiar(f) for f in respuesta[2].get("values", [])]
+        if len(respuesta) > 3:
+            remotas = [_limpiar(f) for f in respuesta[3].get("values", [])]
+
+        esperado = nuevas[-1] if nuevas else (ultima[0] if ultima else encabezado)
+        if encabezado != info["encabezado"] or anterior != esperado:
+            return _descarga_completa(nombre, info)
+
+        nuevas.extend(bloque)
+        if len(bloque) < BLOQUE_COLA:
+            break
+
+    version = info["version"]
+    if barrido:
+        # La API omite las filas vacías al final del rango
+        remotas += [[]] * (hasta - desde + 1 - len(remotas))
+        if _huella(remotas) != _huella(leer_filas(nombre, desde, hasta)):
+            contar(f"barrido_corregido:{nombre}")
+            log.info("Filas %d a %d de %s cambiaron en la hoja, se corrigen", desde, hasta, nombre)
+            version = _corregir(nombre, desde, remotas, info)
+        _avanzar_barrido(nombre, hasta + 1, n)
+
+    if not nuevas:
+        _marcar_sondeo(nombre)
+        return version
+    _agregar(nombre, nuevas, estado(nombre))
+    return version + 1
+
+
+def sincronizar(nombre, completo=False):
+    previo = estado(nombre)
+    with _exclusiva(nombre), medir(f"sincronizar:{nombre}"):
+        info = estado(nombre)
+        if not completo and previo is not None and info["sondeado"] != previo["sondeado"]:
+            # Otro hilo u otra réplica sincronizó mientras se esperaba el turno
+            return info["version"]
+        if info is None or completo:
+            return _descarga_completa(nombre, info)
+        if nombre not in TRANSACCIONES and time.time() - info["revisado"] > INTERVALO_REVISION:
+            # Las hojas de transacciones no se descargan de nuevo: las revisa el barrido
+            return _descarga_completa(nombre, info)
+        return _sondeo_cola(nombre, info)
+
+
+def registrar_escritura(nombre, filas, respuesta):
+    # Filas que la cola acaba de escribir: si continúan justo después de la última
+    # fila conocida se añaden al espejo sin volver a leer la hoja
+    rango = respuesta.get("updates", {}).get("updatedRange", "")
+    inicio = re.search(r"![A-Z]+(\d+)", rango)
+    if inicio is None:
+        return
+    with _exclusiva(nombre):
+        info = estado(nombre)
+        if info is None or int(inicio.group(1)) != info["filas"] + 2:
+            # Hay filas de otros procesos en medio: el próximo version_vigente las
+            # trae sin esperar INTERVALO_SONDEO
+            with _lock:
+                _db().execute("UPDATE hojas SET sondeado = 0 WHERE nombre = ?", (nombre,))
+            return
+        _agregar(nombre, [_limpiar(["" if v is None else v for v in f]) for f in filas], info)
+
+
+def version_vigente(nombre):
+    info = estado(nombre)
+    if info is not None and nombre in REFRESCO:
+        # Catálogo: la actualización es trabajo del hilo de fondo
+        return info["version"]
+    if info is None or time.time() - info["sondeado"] > INTERVALO_SONDEO:
+        try:
+            return sincronizar(nombre)
+        except (APIError, RequestException, TransportError) as e:
+            if info is None:
+                raise
+            # Sin cuota, sin servicio o sin conexión (también al renovar el token):
+            # se sigue trabajando con la copia local
+            log.warning("No se pudo sincronizar %s, se usa la copia local: %s", nombre, e)
+            _marcar_sondeo(nombre)
+    return info["version"]
+
+
+# === LECTURA COMO DATAFRAME ===
+# Cada hoja vive una sola vez en el servidor: el primer proceso que necesita una
+# versión la guarda como instantánea Arrow y todos (también él) la abren con
+# memory-map. Las sesiones comparten el mismo DataFrame, sin copiarlo en cada
+# ejecución. Es de solo lectura: para derivar columnas se usa .assign() o una
+# copia, nunca asignación en el lugar.
+_tablas = {}
+_locks_tabla = {}
+
+
+def _columna(serie):
+    # Columna por columna, en un solo paso vectorizado: si todo lo que no está
+    # vacío es un número la columna es numérica (entera si no tiene vacíos ni
+    # decimales), si no queda como texto
+    llenas = serie != ""
+    if not llenas.any() or pd.to_numeric(serie[llenas].head(100), errors="coerce").isna().any():
+        # Con una muestra basta para descartar las columnas de texto (ITEM, nombres)
+        return serie
+    numeros = pd.to_numeric(serie.where(llenas), errors="coerce")
+    if numeros.notna().sum() != llenas.sum():
+        return serie
+    if llenas.all() and (numeros % 1 == 0).all():
+        return numeros.astype("int64")
+    return numeros
+
+
+def _a_dataframe(encabezado, filas):
+    # Encabezados sin espacios sobrantes, como los usan las páginas (SKU, ITEM,
+    # NOMBRE VIGILANTE...). Las filas que la API recortó se completan con "".
+    columnas = [" ".join(str(c).split()) for c in encabezado]
+    df = pd.DataFrame(filas, dtype=object).reindex(columns=range(len(columnas)))
+    df = df.fillna("").astype(str)
+    df = pd.DataFrame({
+        i: df[i].str.strip() if columnas[i] in COLUMNAS_CODIGO else _columna(df[i])
+        for i in df.columns
+    })
+    df.columns = columnas
+    return df
+
+
+def _compactar(df):
+    # El texto que se repite (FAMILIA, tiendas...) pasa a categorías, el texto único
+    # (ITEM, nombres) queda en el tipo de texto compacto de pandas y los enteros
+    # (precios, cantidades) usan el tipo más pequeño que los contiene
+    for columna in df.columns:
+        serie = df[columna]
+        if serie.dtype.kind in "iu":
+            df[columna] = pd.to_numeric(serie, downcast="integer")
+        elif serie.dtype == object or pd.api.types.is_string_dtype(serie.dtype):
+            if serie.nunique(dropna=False) <= len(serie) // 2:
+                df[columna] = serie.astype("category")
+    return df
+
+
+def _lock_tabla(nombre):
+    with _lock:
+        return _locks_tabla.setdefault(nombre, threading.Lock())
+
+
+def _tabla(nombre, version):
+    actual = _tablas.get(nombre)
+    if actual is not None and actual[0] >= version:
+        return actual[1]
+    with _lock_tabla(nombre):
+        actual = _tablas.get(nombre)
+        if actual is not None and actual[0] >= version:
+            return actual[1]
+        contar("cache_fallo")
+        with medir(f"leer_espejo:{nombre}"):
+            version = estado(nombre)["version"]
+            df = compartido.abrir_instantanea(nombre, version)
+            if df is None:
+                version, encabezado, filas = _leer_version(nombre)
+                df = _compactar(_a_dataframe(encabezado, filas))
+                try:
+                    df = compartido.guardar_instantanea(nombre, version, df)
+                except Exception as e:
+                    # Sin instantánea (disco lleno, encabezados repetidos...) el
+                    # proceso sigue con su propia copia
+                    log.warning("No se pudo guardar la instantánea de %s: %s", nombre, e)
+        _tablas[nombre] = (version, df)
+        return df
+
+
+def _leer_version(nombre):
+    # Encabezado y filas de una misma versión aunque otra réplica escriba a la vez
+    with _lock:
+        db = _db()
+        db.execute("BEGIN")
+        try:
+            info = estado(nombre)
+            filas = leer_filas(nombre, hasta=info["filas"])
+        finally:
+            db.execute("COMMIT")
+    return info["version"], info["encabezado"], filas
+
+
+def cargar_hoja(nombre):
+    contar("cache_consulta")
+    with medir(f"cargar_hoja:{nombre}"):
+        return _tabla(nombre, version_vigente(nombre))
+
+
+# === ACTUALIZACIÓN DE CATÁLOGOS EN SEGUNDO PLANO ===
+def al_actualizar(nombre, funcion):
+    # funcion(version) se llama tras cada actualización de fondo para dejar listas
+    # las estructuras derivadas (catálogo de SKU, etc.) antes de que una sesión las pida
+    _al_actualizar.setdefault(nombre, []).append(funcion)
+
+
+def _preparar(nombre, version):
+    _tabla(nombre, version)
+    for funcion in _al_actualizar.get(nombre, []):
+        funcion(version)
+    _preparadas[nombre] = version
+
+
+def refrescar(nombre):
+    # Descarga completa inmediata de una sola hoja (botón de ⚙️ Configuración)
+    version = sincronizar(nombre, completo=True)
+    _preparar(nombre, version)
+    return version
+
+
+def _pendientes_de_refresco():
+    ahora = time.time()
+    vencidos, proxima = [], None
+    for nombre, intervalo in REFRESCO.items():
+        info = estado(nombre)
+        vence = info["sondeado"] + intervalo if info else ahora
+        if vence <= ahora:
+            vencidos.append(nombre)
+        else:
+            proxima = vence - ahora if proxima is None else min(proxima, vence - ahora)
+    return vencidos, proxima
+
+
+def _refrescar_catalogos():
+    # Una sola réplica del servidor (la que tiene el bloqueo "refresco") descarga;
+    # las demás solo preparan las versiones que esa deja en el espejo compartido
+    while True:
+        vencidos, proxima = _pendientes_de_refresco()
+        if not compartido.lider("refresco"):
+            vencidos, proxima = [], INTERVALO_SEGUIDOR
+        for nombre in vencidos:
+            try:
+                with cuota.prioridad(cuota.BAJA):
+                    version = sincronizar(nombre)
+                _preparar(nombre, version)
+            except Exception as e:
+                log.warning("No se pudo actualizar %s en segundo plano: %s", nombre, e)
+                _marcar_sondeo(nombre)
+        for nombre in CATALOGOS:
+            info = estado(nombre)
+            if info is not None and _preparadas.get(nombre) != info["version"]:
+                try:
+                    _preparar(nombre, info["version"])
+                except Exception as e:
+                    log.warning("No se pudo preparar %s: %s", nombre, e)
+        if not vencidos:
+            time.sleep(min(proxima if proxima is not None else 60, 60))
+
+
+def iniciar_refresco():
+    global _hilo
+    with _lock:
+        if _hilo is None or not _hilo.is_alive():
+            _hilo = threading.Thread(target=_refrescar_catalogos, name="refresco-catalogos", daemon=True)
+            _hilo.start()
@@ -0,0 +1,72 @@
+import pandas as pd
+
+# === COLUMNAS DE LAS HOJAS DE TRANSACCIONES ===
+# Mismo orden en que las páginas de registro arman `nueva_fila`
+COLUMNAS = {
+    "RECUPERACIONES": [
+        "fecha_registro", "tienda", "fecha", "hora",
+        "vigilante", "piso", "ubicacion", "area",
+        "nombre_cw", "pos", "sku", "familia",
+        "producto", "cantidad", "pvp", "total", "descripcion",
+        "mes", "dia", "rango_horas",
+    ],
+    "AUDITORIA BODEGA": [
+        "fecha_registro", "tienda", "fecha", "hora",
+        "vigilante", "novedad", "evidencia",
+        "mes", "dia", "rango_horas",
+    ],
+    "WAREHOUSE": [
+        "fecha_registro", "fecha", "proceso_auditoria", "novedad",
+        "tipo_documento", "numero_documento", "sku",
+        "auditor", "picker", "documento_usuario",
+        "observaciones", "tipo_novedad", "area",
+        "cantidad", "costo", "total", "numero_semana",
+    ],
+}
+
+TRANSACCIONES = list(COLUMNAS)
+
+NUMERICAS = {"cantidad", "pvp", "costo", "total", "numero_semana"}
+FECHAS = {"fecha"}
+MARCAS_TIEMPO = {"fecha_registro"}
+CATEGORICAS = {
+    "tienda", "vigilante", "piso", "ubicacion", "area", "familia",
+    "mes", "dia", "rango_horas", "proceso_auditoria", "novedad",
+    "tipo_documento", "auditor", "picker", "tipo_novedad",
+}
+
+
+# === CONVERSIÓN A DATAFRAME TIPADO ===
+def a_dataframe(nombre, filas):
+    columnas = COLUMNAS[nombre]
+    ancho = len(columnas)
+    df = pd.DataFrame([(f + [""]*ancho)[:ancho] for f in filas], columns=columnas, dtype=object)
+
+    for columna in columnas:
+        if columna in NUMERICAS:
+            df[columna] = pd.to_numeric(df[columna], errors="coerce")
+        elif columna in FECHAS:
+            df[columna] = pd.to_datetime(df[columna], errors="coerce", format="%Y-%m-%d")
+        elif columna in MARCAS_TIEMPO:
+            df[columna] = pd.to_datetime(df[columna], errors="coerce", format="%Y-%m-%d %H:%M:%S")
+        elif columna in CATEGORICAS:
+            df[columna] = df[columna].astype(str).astype("category")
+        else:
+            df[columna] = df[columna].astype(str)
+
+    if "sku" in df:
+        df["sku"] = df["sku"].str.strip().str.zfill(8).where(df["sku"].str.strip() != "", "")
+    return df
+
+
+# === CÓDIGOS ===
+def codigos(serie):
+    # Códigos (SKU, usuario, tienda) como texto sin espacios: los vacíos quedan en ""
+    # y 123456.0 en "123456", aunque la columna haya llegado como número
+    if serie.dtype.kind in "iu":
+        return serie.astype(str)
+    if serie.dtype.kind == "f":
+        enteros = serie.notna() & (serie % 1 == 0)
+        texto = serie.astype(str).where(serie.notna(), "")
+        return texto.where(~enteros, serie.where(enteros, 0).astype("int64").astype(str))
+    return serie.astype(object).where(serie.notna(), "").astype(str).str.strip()
@@ -0,0 +1,160 @@
+import hashlib
+import io
+import json
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from utils.cola_escritura import completar, encolar, retenidas
+from utils.espejo import DIR_DATOS
+
+# === CONFIGURACIÓN ===
+# Las fotos de evidencia se guardan comprimidas en un almacén local direccionado por
+# contenido (SHA-256 de la captura original). En la hoja solo queda la referencia.
+DIR_EVIDENCIAS = os.path.join(DIR_DATOS, "evidencias")
+
+LADO_MAXIMO = 1600
+LADO_MINIATURA = 320
+CALIDAD = 75
+
+# Antes de confirmar el registro se guardan la captura original y la fila (retenida
+# en la cola con la referencia PENDIENTE); el hilo de trabajo comprime la foto y
+# completa la referencia. Si el proceso se reinicia en medio, reanudar() termina
+# el trabajo al arrancar, y si nadie lo hace la fila sale igual pasada la RETENCION.
+PENDIENTE = ";pendiente"
+RETENCION = 10*60
+
+log = logging.getLogger(__name__)
+
+_ejecutor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="evidencias")
+
+
+def _rutas(huella):
+    carpeta = os.path.join(DIR_EVIDENCIAS, huella[:2])
+    return carpeta, os.path.join(carpeta, huella)
+
+
+def _formato():
+    from PIL import features
+
+    return ("WEBP", "webp") if features.check("webp") else ("JPEG", "jpg")
+
+
+def _comprimir(imagen, lado, formato):
+    copia = imagen.copy()
+    copia.thumbnail((lado, lado))
+    buffer = io.BytesIO()
+    copia.save(buffer, format=formato, quality=CALIDAD)
+    return buffer.getvalue(), copia.size
+
+
+# === PROCESAMIENTO (hilo de trabajo) ===
+def guardar_evidencia(contenido):
+    huella = hashlib.sha256(contenido).hexdigest()
+    carpeta, base = _rutas(huella)
+
+    # Captura repetida: ya está en el almacén y no se vuelve a procesar
+    if os.path.exists(base + ".json"):
+        with open(base + ".json", encoding="utf-8") as f:
+            return json.load(f)
+
+    from PIL import Image, ImageOps
+
+    formato, extension = _formato()
+    imagen = ImageOps.exif_transpose(Image.open(io.BytesIO(contenido))).convert("RGB")
+    foto, (ancho, alto) = _comprimir(imagen, LADO_MAXIMO, formato)
+    miniatura, (ancho_min, alto_min) = _comprimir(imagen, LADO_MINIATURA, formato)
+
+    os.makedirs(carpeta, exist_ok=True)
+    with open(f"{base}.{extension}", "wb") as f:
+        f.write(foto)
+    with open(f"{base}_min.{extension}", "wb") as f:
+        f.write(miniatura)
+
+    metadatos = {
+        "ref": f"sha256:{huella}",
+        "archivo": f"{huella[:2]}/{huella}.{extension}",
+        "ancho": ancho,
+        "alto": alto,
+        "kb": round(len(foto) / 1024),
+        "miniatura": f"{ancho_min}x{alto_min}",
+    }
+    # El .json se escribe al final: marca que la evidencia quedó completa
+    with open(base + ".json", "w", encoding="utf-8") as f:
+        json.dump(metadatos, f)
+    return metadatos
+
+
+def _guardar_original(contenido):
+    huella = hashlib.sha256(contenido).hexdigest()
+    carpeta, base = _rutas(huella)
+    if not os.path.exists(base + ".json"):
+        os.makedirs(carpeta, exist_ok=True)
+        temporal = f"{base}.{os.getpid()}.tmp"
+        with open(temporal, "wb") as f:
+            f.write(contenido)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporal, base + ".original")
+    return huella
+
+
+def _procesar_original(huella):
+    base = _rutas(huella)[1]
+    # Captura repetida: ya procesada y sin original guardado
+    if os.path.exists(base + ".json"):
+        with open(base + ".json", encoding="utf-8") as f:
+            return json.load(f)
+    with open(base + ".original", "rb") as f:
+        return guardar_evidencia(f.read())
+
+
+def _borrar_original(huella):
+    try:
+        os.remove(_rutas(huella)[1] + ".original")
+    except OSError:
+        pass
+
+
+def referencia(metadatos):
+    return (
+        f"{metadatos['ref']};{metadatos['ancho']}x{metadatos['alto']};"
+        f"{metadatos['kb']}KB;min {metadatos['miniatura']}"
+    )
+
+
+def _procesar_y_completar(id_, fila, posicion, huella):
+    try:
+        fila[posicion] = referencia(_procesar_original(huella))
+        _borrar_original(huella)
+    except Exception as e:
+        # El registro no se pierde aunque la imagen no se pueda procesar (la
+        # captura original queda en el almacén)
+        log.exception("No se pudo procesar la evidencia")
+        fila[posicion] = f"Error en evidencia: {e}"
+    if not completar(id_, fila):
+        log.warning("La fila %s salió con la evidencia %s sin procesar", id_, huella)
+
+
+# === REGISTRO CON EVIDENCIA ===
+def encolar_con_evidencia(hoja, fila, posicion, archivo):
+    fila = list(fila)
+    if archivo is None:
+        fila[posicion] = ""
+        encolar(hoja, fila)
+        return
+    # La captura y la fila quedan en disco antes de que la página confirme
+    huella = _guardar_original(archivo.getvalue())
+    fila[posicion] = f"sha256:{huella}{PENDIENTE}"
+    id_ = encolar(hoja, fila, retener=RETENCION)
+    _ejecutor.submit(_procesar_y_completar, id_, fila, posicion, huella)
+
+
+def reanudar():
+    # Filas retenidas de un proceso anterior que no alcanzó a procesar su foto.
+    # Procesar dos veces la misma captura da la misma referencia.
+    for id_, hoja, fila in retenidas():
+        for posicion, valor in enumerate(fila):
+            if isinstance(valor, str) and valor.startswith("sha256:") and valor.endswith(PENDIENTE):
+                huella = valor[len("sha256:"):-len(PENDIENTE)]
+                _ejecutor.submit(_procesar_y_completar, id_, fila, posicion, huella)
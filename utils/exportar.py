@@ -0,0 +1,108 @@
+import io
+
+import pandas as pd
+
+from utils import espejo
+from utils.consulta import DIMENSIONES
+from utils.esquemas import COLUMNAS, FECHAS, MARCAS_TIEMPO, NUMERICAS, a_dataframe
+from utils.metricas import medir
+
+# === CONFIGURACIÓN ===
+# La exportación lee el espejo local por bloques de filas, filtra cada bloque y lo
+# escribe al archivo antes de leer el siguiente: la memoria no depende del tamaño
+# de la hoja, solo del archivo ya codificado que se entrega al navegador.
+BLOQUE = 20_000
+
+# Enteros que admiten vacíos; el resto de NUMERICAS son montos
+ENTERAS = {"cantidad", "numero_semana"}
+
+
+def _tipar(df):
+    # Tipos fijos para que todos los bloques (y el archivo) tengan el mismo esquema
+    for columna in df.columns:
+        if columna in ENTERAS:
+            df[columna] = df[columna].round().astype("Int64")
+        elif columna in NUMERICAS:
+            df[columna] = df[columna].astype("float64")
+        elif columna in FECHAS:
+            df[columna] = df[columna].dt.date
+        elif columna not in MARCAS_TIEMPO:
+            df[columna] = df[columna].astype(str)
+    return df
+
+
+def _filtrar(nombre, df, filtros, desde, hasta):
+    mascara = pd.Series(True, index=df.index)
+    for dimension, valor in filtros.items():
+        if valor in (None, ""):
+            continue
+        coincide = pd.Series(False, index=df.index)
+        for columna in DIMENSIONES[nombre][dimension]:
+            coincide |= df[columna] == valor
+        mascara &= coincide
+    if desde is not None:
+        mascara &= df["fecha"] >= pd.Timestamp(desde)
+    if hasta is not None:
+        mascara &= df["fecha"] <= pd.Timestamp(hasta)
+    return df[mascara]
+
+
+def bloques(nombre, filtros=None, desde=None, hasta=None):
+    # Mismos filtros que 🔍 Consulta. Se exporta la versión vigente al empezar:
+    # las filas que lleguen durante la exportación quedan para la siguiente.
+    espejo.version_vigente(nombre)
+    total = espejo.estado(nombre)["filas"]
+    for inicio in range(1, total + 1, BLOQUE):
+        filas = espejo.leer_filas(nombre, desde=inicio, hasta=min(inicio + BLOQUE - 1, total))
+        df = _filtrar(nombre, a_dataframe(nombre, filas), filtros or {}, desde, hasta)
+        if len(df):
+            yield _tipar(df.reset_index(drop=True))
+
+
+# === FORMATOS ===
+def a_csv(nombre, filtros=None, desde=None, hasta=None):
+    archivo = io.BytesIO()
+    with medir(f"exportar_csv:{nombre}"):
+        encabezado = True
+        for df in bloques(nombre, filtros, desde, hasta):
+            # utf-8-sig para que Excel reconozca las tildes
+            df.to_csv(archivo, index=False, header=encabezado, encoding="utf-8-sig" if encabezado else "utf-8",
+                      float_format="%.15g", date_format="%Y-%m-%d %H:%M:%S")
+            encabezado = False
+        if encabezado:
+            pd.DataFrame(columns=COLUMNAS[nombre]).to_csv(archivo, index=False, encoding="utf-8-sig")
+    return archivo.getvalue()
+
+
+def a_parquet(nombre, filtros=None, desde=None, hasta=None):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    campos = []
+    for columna in COLUMNAS[nombre]:
+        if columna in ENTERAS:
+            tipo = pa.int64()
+        elif columna in NUMERICAS:
+            tipo = pa.float64()
+        elif columna in FECHAS:
+            tipo = pa.date32()
+        elif columna in MARCAS_TIEMPO:
+            tipo = pa.timestamp("s")
+        else:
+            tipo = pa.string()
+        campos.append(pa.field(columna, tipo))
+    esquema = pa.schema(campos)
+
+    archivo = io.BytesIO()
+    with medir(f"exportar_parquet:{nombre}"):
+        # Un grupo de filas por bloque
+        with pq.ParquetWriter(archivo, esquema, compression="zstd") as escritor:
+            for df in bloques(nombre, filtros, desde, hasta):
+                escritor.write_table(pa.Table.from_pandas(df, schema=esquema, preserve_index=False))
+    return archivo.getvalue()
+
+
+FORMATOS = {
+    "CSV": (a_csv, "text/csv", "csv"),
+    "Parquet": (a_parquet, "application/vnd.apache.parquet", "parquet"),
+}
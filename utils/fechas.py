@@ -0,0 +1,15 @@
+# === NOMBRES DE MESES Y DÍAS ===
+# Mismos textos que las páginas de registro escriben en las columnas `mes` y `dia`
+MESES = [
+    "Enero", "Febrero", "Marzo", "Abril", "Mayo", "Junio",
+    "Julio", "Agosto", "Septiembre", "Octubre", "Noviembre", "Diciembre",
+]
+
+DIAS = ["Lunes", "Martes", "Miercoles", "Jueves", "Viernes", "Sabado", "Domingo"]
+
+
+def rango_horas(hora):
+    return f"{hora} - {hora+1}"
+
+
+ORDEN_RANGOS = [rango_horas(h) for h in range(24)]
@@ -0,0 +1,167 @@
+import json
+import logging
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from functools import wraps
+
+# === CONFIGURACIÓN ===
+# Tiempos por fase de cada ejecución de página. Cada ejecución deja una línea de
+# log en JSON y alimenta ventanas móviles con las que se calculan p50/p95/p99.
+MUESTRAS = 1000         # muestras que se guardan por página y fase
+FONDO = "fondo"         # hilos de fondo (cola de escritura, sincronización)
+
+# Una línea JSON por ejecución en la salida estándar, aparte del log de Streamlit
+log = logging.getLogger(__name__)
+if not log.handlers:
+    _salida = logging.StreamHandler()
+    _salida.setFormatter(logging.Formatter("%(message)s"))
+    log.addHandler(_salida)
+    log.setLevel(logging.INFO)
+    log.propagate = False
+
+_lock = threading.Lock()
+_local = threading.local()
+_ventanas = defaultdict(lambda: deque(maxlen=MUESTRAS))
+_llamadas = defaultdict(lambda: deque(maxlen=MUESTRAS))
+_totales = defaultdict(int)
+
+
+class _Ejecucion:
+    def __init__(self, pagina):
+        self.pagina = pagina
+        self.inicio = time.perf_counter()
+        self.fases = defaultdict(float)
+        self.contadores = defaultdict(int)
+
+
+def _actual():
+    return getattr(_local, "ejecucion", None)
+
+
+def _registrar(pagina, fase, duracion):
+    with _lock:
+        _ventanas[(pagina, fase)].append(duracion)
+
+
+# === EJECUCIONES Y FASES ===
+@contextmanager
+def ejecucion(pagina):
+    # Si ya hay una ejecución abierta en este hilo (p. ej. un fragmento dentro de
+    # la página) las fases se suman a ella
+    if _actual() is not None:
+        yield _actual()
+        return
+    _local.ejecucion = actual = _Ejecucion(pagina)
+    try:
+        yield actual
+    finally:
+        _local.ejecucion = None
+        total = time.perf_counter() - actual.inicio
+        _registrar(pagina, "total", total)
+        with _lock:
+            _llamadas[pagina].append(actual.contadores.get("api", 0))
+        log.info(json.dumps({
+            "evento": "ejecucion",
+            "pagina": pagina,
+            "ms": round(total * 1000, 2),
+            "fases": {f: round(d * 1000, 2) for f, d in actual.fases.items()},
+            "contadores": dict(actual.contadores),
+        }, ensure_ascii=False))
+
+
+@contextmanager
+def medir(fase):
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        duracion = time.perf_counter() - inicio
+        actual = _actual()
+        if actual is not None:
+            actual.fases[fase] += duracion
+        _registrar(actual.pagina if actual is not None else FONDO, fase, duracion)
+
+
+def medido(fase, pagina=None):
+    # Decorador para fragmentos: al volver a ejecutarse solos también se miden
+    def decorador(funcion):
+        @wraps(funcion)
+        def envoltura(*args, **kwargs):
+            with ejecucion(pagina or _pagina_sesion()), medir(fase):
+                return funcion(*args, **kwargs)
+        return envoltura
+    return decorador
+
+
+def _pagina_sesion():
+    try:
+        import streamlit as st
+
+        return st.session_state.get("pagina_medida", "app")
+    except Exception:
+        return "app"
+
+
+def contar(nombre, cantidad=1):
+    actual = _actual()
+    if actual is not None:
+        actual.contadores[nombre] += cantidad
+    with _lock:
+        _totales[(actual.pagina if actual is not None else FONDO, nombre)] += cantidad
+
+
+# === ESTADÍSTICAS ===
+def _percentil(ordenados, p):
+    if not ordenados:
+        return 0.0
+    posicion = min(len(ordenados) - 1, max(0, round(p / 100 * (len(ordenados) - 1))))
+    return ordenados[posicion]
+
+
+def resumen():
+    with _lock:
+        ventanas = {clave: sorted(valores) for clave, valores in _ventanas.items()}
+    filas = []
+    for (pagina, fase), valores in sorted(ventanas.items()):
+        filas.append({
+            "pagina": pagina,
+            "fase": fase,
+            "muestras": len(valores),
+            "p50 ms": _percentil(valores, 50) * 1000,
+            "p95 ms": _percentil(valores, 95) * 1000,
+            "p99 ms": _percentil(valores, 99) * 1000,
+        })
+    return filas
+
+
+def llamadas_api():
+    # Llamadas a la API de Sheets por ejecución de cada página
+    with _lock:
+        llamadas = {pagina: sorted(valores) for pagina, valores in _llamadas.items()}
+    return [
+        {
+            "pagina": pagina,
+            "ejecuciones": len(valores),
+            "p50": _percentil(valores, 50),
+            "p95": _percentil(valores, 95),
+            "p99": _percentil(valores, 99),
+        }
+        for pagina, valores in sorted(llamadas.items())
+    ]
+
+
+def totales():
+    with _lock:
+        return [
+            {"pagina": pagina, "contador": nombre, "total": total}
+            for (pagina, nombre), total in sorted(_totales.items())
+        ]
+
+
+def reiniciar():
+    with _lock:
+        _ventanas.clear()
+        _llamadas.clear()
+        _totales.clear()
@@ -0,0 +1,64 @@
+# === OPCIONES DE LOS FORMULARIOS ===
+# Listas compartidas por las páginas de registro y la carga masiva
+TIENDAS = {
+    "IKEA NQS": 1,
+    "IKEA MALLPLAZA CALI": 2,
+    "IKEA ENVIGADO": 3,
+}
+
+PISOS = ["Piso 1", "Piso 2", "Piso 3", "Pecera/Sótano"]
+
+UBICACIONES = ["Antenas", "Autopago", "Auditoria", "Cajas Asistidas", "Check Out", "Solicitud"]
+
+AREAS_SOLICITUD = ["CX", "Recovery", "Olvido Cliente", "Fulfillment", "BNO", "S&S", "Sales", "Duty Manager"]
+
+PROCESOS_AUDITORIA = [
+    "Auditoria DO ECOM",
+    "Auditoria DESTR",
+    "Auditoria Tienda",
+    "Auditoria INV",
+    "Auditoria AS-IS",
+    "Plan Enfermero",
+]
+
+NOVEDADES = [
+    "SOBRANTE",
+    "AVERIA",
+    "FALTANTE",
+    "IMPRESO",
+    "TROQUE",
+    "SIN SKU",
+    "OLPN EN  MAL ESTADO",
+    "RECUPERACION",
+    "OLPN SIN AUDITAR",
+    "OLPN  EN ESTADO ENVIADO",
+    "ETIQUETA",
+    "OLPN RE IMPRESO Y TROCADO",
+]
+
+TIPOS_DOCUMENTO = ["OLPN", "ILPN"]
+
+AUDITORES = [
+    "Felipe Gutierrez",
+    "Yulieth Parada",
+    "Jessica Camacho",
+    "Linda Sandoval",
+    "Jhon Ballesteros",
+    "Angel Mendez",
+    "Laura Alvarez",
+]
+
+TIPOS_NOVEDAD = [
+    "Print",
+    "Faltante",
+    "Sobrantes",
+    "Etiqueta Mal ubicada",
+    "Averia Productos",
+    "Reimpreso",
+    "Troque",
+    "Sin auditar",
+    "Recuperación",
+    "Producto de Asis",
+]
+
+AREAS_WAREHOUSE = ["CP", "INVENTARIOS", "MEZANINE", "NQS", "CALI", "MEDELLIN", "RECOVERY"]
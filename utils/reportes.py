@@ -0,0 +1,201 @@
+import logging
+import os
+import sqlite3
+import threading
+
+import pandas as pd
+
+from utils import espejo
+from utils.esquemas import a_dataframe
+
+# === CONFIGURACIÓN ===
+# Agregados precalculados que se actualizan solo con las filas nuevas del espejo.
+# Cada hoja guarda hasta qué fila se ha sumado y la versión base del espejo: si la
+# hoja se descargó completa de nuevo (filas editadas o borradas) se recalcula.
+RUTA_RESUMENES = os.path.join(espejo.DIR_DATOS, "resumenes.sqlite")
+
+RESUMENES = {
+    "RECUPERACIONES": {
+        "tabla": "resumen_recuperaciones",
+        "dimensiones": ["tienda", "anio", "mes", "dia", "rango_horas", "familia", "ubicacion"],
+    },
+    "WAREHOUSE": {
+        "tabla": "resumen_warehouse",
+        "dimensiones": ["area", "tipo_novedad", "anio", "numero_semana"],
+    },
+}
+
+BLOQUE = 100_000            # filas del espejo que se agregan a la vez al recalcular
+
+log = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_conexion = None
+_por_actualizar = set()
+_hay_trabajo = threading.Event()
+_hilo = None
+
+
+# === BASE DE DATOS DE RESÚMENES ===
+def _db():
+    global _conexion
+    if _conexion is None:
+        os.makedirs(espejo.DIR_DATOS, exist_ok=True)
+        conexion = sqlite3.connect(RUTA_RESUMENES, check_same_thread=False, isolation_level=None, timeout=30)
+        conexion.execute("PRAGMA journal_mode=WAL")
+        for config in RESUMENES.values():
+            dimensiones = config["dimensiones"]
+            conexion.execute(f"""
+                CREATE TABLE IF NOT EXISTS {config["tabla"]} (
+                    {", ".join(f"{d} NOT NULL" for d in dimensiones)},
+                    valor REAL NOT NULL,
+                    unidades REAL NOT NULL,
+                    casos INTEGER NOT NULL,
+                    PRIMARY KEY ({", ".join(dimensiones)})
+                )
+            """)
+            # La llave empieza por la primera dimensión (tienda en recuperaciones):
+            # filtrar por ella lee solo esa partición. El año tiene su propio índice.
+            conexion.execute(f"CREATE INDEX IF NOT EXISTS {config['tabla']}_anio ON {config['tabla']} (anio)")
+        conexion.execute("""
+            CREATE TABLE IF NOT EXISTS avance (
+                hoja TEXT PRIMARY KEY,
+                base INTEGER NOT NULL,
+                filas INTEGER NOT NULL,
+                correccion INTEGER NOT NULL
+            )
+        """)
+        _conexion = conexion
+    return _conexion
+
+
+def _agregar(nombre, filas):
+    df = a_dataframe(nombre, filas)
+    if nombre == "WAREHOUSE":
+        df["anio"] = df["fecha"].dt.isocalendar().year
+    else:
+        df["anio"] = df["fecha"].dt.year
+    dimensiones = RESUMENES[nombre]["dimensiones"]
+    for d in dimensiones:
+        if d in ("anio", "numero_semana"):
+            df[d] = df[d].fillna(0).astype(int)
+        else:
+            df[d] = df[d].astype(str)
+    return (
+        df.groupby(dimensiones, observed=True, sort=False)
+        .agg(valor=("total", "sum"), unidades=("cantidad", "sum"), casos=("total", "size"))
+        .reset_index()
+    )
+
+
+# === ACTUALIZACIÓN INCREMENTAL ===
+def actualizar(nombre):
+    if espejo.estado(nombre) is None:
+        return
+    config = RESUMENES[nombre]
+    tabla = config["tabla"]
+    dimensiones = config["dimensiones"]
+    sumas = ["valor", "unidades", "casos"]
+
+    with _lock:
+        db = _db()
+        # IMMEDIATE: si otra réplica del servidor actualiza a la vez, espera aquí y
+        # después lee el avance nuevo, así ninguna fila se suma dos veces
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            avance = db.execute("SELECT base, filas, correccion FROM avance WHERE hoja = ?", (nombre,)).fetchone()
+            with espejo.vista() as vista:
+                info, reiniciar, desde, corregidas = espejo.cambios(vista, nombre, avance)
+                if not reiniciar and desde > info["filas"] and avance[2] == info["correccion"]:
+                    db.execute("COMMIT")
+                    return
+                # De a BLOQUE filas: al recalcular desde la fila 1 no se carga la historia completa
+                partes = [
+                    _agregar(nombre, vista.leer_filas(nombre, desde=inicio, hasta=min(inicio + BLOQUE - 1, info["filas"])))
+                    for inicio in range(desde, info["filas"] + 1, BLOQUE)
+                ]
+            # Filas ya sumadas que se corrigieron en la hoja: se resta lo de antes
+            if corregidas:
+                anteriores = _agregar(nombre, [antes for _, antes, _ in corregidas])
+                anteriores[sumas] = -anteriores[sumas]
+                partes += [anteriores, _agregar(nombre, [despues for _, _, despues in corregidas])]
+
+            if reiniciar:
+                db.execute(f"DELETE FROM {tabla}")
+            if partes:
+                grupos = pd.concat(partes).groupby(dimensiones, observed=True, sort=False)[sumas].sum().reset_index()
+                columnas = dimensiones + sumas
+                db.executemany(
+                    f"""
+                    INSERT INTO {tabla} ({", ".join(columnas)}) VALUES ({", ".join("?" for _ in columnas)})
+                    ON CONFLICT ({", ".join(dimensiones)}) DO UPDATE SET
+                        valor = valor + excluded.valor,
+                        unidades = unidades + excluded.unidades,
+                        casos = casos + excluded.casos
+                    """,
+                    grupos[columnas].astype(object).itertuples(index=False, name=None)
+                )
+                if corregidas:
+                    db.execute(f"DELETE FROM {tabla} WHERE casos = 0")
+            db.execute(
+                "INSERT OR REPLACE INTO avance (hoja, base, filas, correccion) VALUES (?, ?, ?, ?)",
+                (nombre, info["base"], info["filas"], info["correccion"])
+            )
+            db.execute("COMMIT")
+        except Exception:
+            db.execute("ROLLBACK")
+            raise
+
+
+def actualizar_todo():
+    for nombre in RESUMENES:
+        espejo.version_vigente(nombre)
+        actualizar(nombre)
+
+
+# === ACTUALIZACIÓN EN SEGUNDO PLANO ===
+# Igual que en utils.anomalias: la cola de escritura solo avisa, así un recálculo
+# completo (cambio de base) no demora el envío de los registros
+def _trabajar():
+    while True:
+        _hay_trabajo.wait()
+        _hay_trabajo.clear()
+        with _lock:
+            nombres = sorted(_por_actualizar)
+            _por_actualizar.clear()
+        for nombre in nombres:
+            try:
+                actualizar(nombre)
+            except Exception:
+                log.exception("No se pudieron actualizar los resúmenes de %s", nombre)
+
+
+def pedir_actualizacion(nombre):
+    global _hilo
+    if nombre not in RESUMENES:
+        return
+    with _lock:
+        _por_actualizar.add(nombre)
+        if _hilo is None or not _hilo.is_alive():
+            _hilo = threading.Thread(target=_trabajar, name="resumenes", daemon=True)
+            _hilo.start()
+    _hay_trabajo.set()
+
+
+# === LECTURA ===
+def valores(nombre, dimension):
+    config = RESUMENES[nombre]
+    with _lock:
+        filas = _db().execute(f"SELECT DISTINCT {dimension} FROM {config['tabla']} ORDER BY {dimension}").fetchall()
+    return [fila[0] for fila in filas]
+
+
+def resumen(nombre, **filtros):
+    config = RESUMENES[nombre]
+    condiciones = [f"{k} = ?" for k, v in filtros.items() if v is not None]
+    valores = [v for v in filtros.values() if v is not None]
+    consulta = f"SELECT * FROM {config['tabla']}"
+    if condiciones:
+        consulta += " WHERE " + " AND ".join(condiciones)
+    with _lock:
+        return pd.read_sql_query(consulta, _db(), params=valores)
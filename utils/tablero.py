@@ -0,0 +1,178 @@
+import threading
+import time
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
+import pandas as pd
+
+from utils import cola_escritura, espejo
+from utils.esquemas import COLUMNAS, a_dataframe
+from utils.metricas import medir
+
+# === CONFIGURACIÓN ===
+# Tablero del día en memoria. Cada registro que entra a la cola de escritura
+# (📋 Registro y carga masiva) suma en los contadores del proceso al instante, sin
+# leer Google Sheets. Los contadores se rearman desde la cola del espejo local y
+# los registros pendientes de envío al arrancar, al cambiar de día y cada
+# RECONSTRUIR_CADA segundos (así también suman los registros de otras réplicas).
+# Cuenta los casos con `fecha` de hoy: solo pueden estar registrados hoy.
+TABLEROS = {
+    "RECUPERACIONES": {"valor": "total", "dimensiones": ["tienda", "ubicacion", "rango_horas"]},
+    "AUDITORIA BODEGA": {"valor": None, "dimensiones": ["tienda"]},
+    "WAREHOUSE": {"valor": "total", "dimensiones": ["area"]},
+}
+
+ZONA = ZoneInfo("America/Bogota")   # misma hora con la que las páginas escriben fecha_registro
+REFRESCO = 10                       # segundos entre actualizaciones de la pantalla de cada sesión
+RECONSTRUIR_CADA = 5*60
+BLOQUE = 2000                       # filas del espejo que se leen hacia atrás buscando el inicio del día
+
+_lock = threading.Lock()
+_lock_reconstruir = threading.Lock()
+_dia = None
+_conteos = {}
+_totales = {}
+_visto = 0              # último id de la cola incluido en la última reconstrucción
+_reconstruido = 0.0
+_actualizado = None
+
+
+def _hoy():
+    return datetime.now(ZONA).strftime("%Y-%m-%d")
+
+
+def _vacios():
+    conteos = {hoja: {d: {} for d in config["dimensiones"]} for hoja, config in TABLEROS.items()}
+    totales = {hoja: [0, 0.0] for hoja in TABLEROS}
+    return conteos, totales
+
+
+def _numero(valor):
+    try:
+        return float(valor)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+# === HISTORIA DEL DÍA ===
+def _filas_de_hoy(nombre, hoy):
+    # Las filas se agregan en orden de registro: se lee la cola del espejo hacia
+    # atrás hasta encontrar una fila registrada antes de hoy
+    info = espejo.estado(nombre)
+    filas = []
+    hasta = info["filas"] if info is not None else 0
+    while hasta >= 1:
+        desde = max(1, hasta - BLOQUE + 1)
+        bloque = espejo.leer_filas(nombre, desde=desde, hasta=hasta)
+        filas = bloque + filas
+        if bloque and str((bloque[0] or [""])[0])[:10] < hoy:
+            break
+        hasta = desde - 1
+    return filas
+
+
+def _sumar_historia(conteos, totales, nombre, filas, hoy):
+    if not filas:
+        return
+    config = TABLEROS[nombre]
+    df = a_dataframe(nombre, [["" if v is None else v for v in f] for f in filas])
+    df = df[df["fecha"] == pd.Timestamp(hoy)]
+    if df.empty:
+        return
+    valores = df[config["valor"]].fillna(0) if config["valor"] else pd.Series(0.0, index=df.index)
+    totales[nombre][0] += len(df)
+    totales[nombre][1] += float(valores.sum())
+    for dimension in config["dimensiones"]:
+        grupos = valores.groupby(df[dimension].astype(str), observed=True).agg(["size", "sum"])
+        destino = conteos[nombre][dimension]
+        for clave, casos, valor in grupos.itertuples(name=None):
+            anterior = destino.get(clave, (0, 0.0))
+            destino[clave] = (anterior[0] + int(casos), anterior[1] + float(valor))
+
+
+def reconstruir():
+    global _dia, _conteos, _totales, _visto, _reconstruido, _actualizado
+    with medir("tablero:reconstruir"):
+        hoy = _hoy()
+        conteos, totales = _vacios()
+        # Solo el espejo local y los pendientes, sin leer Google Sheets: las filas de
+        # otras réplicas llegan cuando el espejo se sincroniza por su cuenta
+        with _lock, cola_escritura.sin_entregas():
+            # Sin entregas en curso cada fila está en el diario o en el espejo, no en
+            # los dos ni en ninguno. Con el lock tomado ningún aviso nuevo se pierde
+            # antes del reemplazo de los contadores.
+            visto, pendientes = cola_escritura.filas_pendientes(list(TABLEROS))
+            for nombre, filas in pendientes.items():
+                _sumar_historia(conteos, totales, nombre, filas, hoy)
+            for nombre in TABLEROS:
+                _sumar_historia(conteos, totales, nombre, _filas_de_hoy(nombre, hoy), hoy)
+            _dia, _conteos, _totales, _visto = hoy, conteos, totales, visto
+            _reconstruido = time.time()
+            _actualizado = _reconstruido
+
+
+def _vigente():
+    return _dia == _hoy() and time.time() - _reconstruido < RECONSTRUIR_CADA
+
+
+def _revisar():
+    # La sesión que encuentra el tablero vencido lo reconstruye; las demás siguen
+    # mostrando los contadores actuales sin esperar (salvo la primera vez)
+    if _vigente():
+        return
+    if _lock_reconstruir.acquire(blocking=_dia is None):
+        try:
+            if not _vigente():
+                reconstruir()
+        finally:
+            _lock_reconstruir.release()
+
+
+# === REGISTROS NUEVOS ===
+def _al_encolar(hoja, filas, ultimo):
+    global _actualizado
+    config = TABLEROS.get(hoja)
+    if config is None:
+        return
+    columnas = COLUMNAS[hoja]
+    with _lock:
+        if ultimo <= _visto:
+            # Ya estaba en la cola cuando se reconstruyó
+            return
+        for fila in filas:
+            registro = dict(zip(columnas, fila))
+            if str(registro.get("fecha", ""))[:10] != _dia:
+                continue
+            _actualizado = time.time()
+            valor = _numero(registro.get(config["valor"])) if config["valor"] else 0.0
+            _totales[hoja][0] += 1
+            _totales[hoja][1] += valor
+            for dimension in config["dimensiones"]:
+                clave = "" if registro.get(dimension) is None else str(registro[dimension])
+                casos, acumulado = _conteos[hoja][dimension].get(clave, (0, 0.0))
+                _conteos[hoja][dimension][clave] = (casos + 1, acumulado + valor)
+
+
+cola_escritura.al_encolar(_al_encolar)
+
+
+# === LECTURA ===
+def tablero():
+    _revisar()
+    with _lock:
+        por = {
+            hoja: {
+                dimension: pd.DataFrame(
+                    [(clave or "Sin dato", casos, valor) for clave, (casos, valor) in claves.items()],
+                    columns=["clave", "casos", "valor"]
+                ).set_index("clave")
+                for dimension, claves in dimensiones.items()
+            }
+            for hoja, dimensiones in _conteos.items()
+        }
+        return {
+            "dia": _dia,
+            "actualizado": _actualizado,
+            "totales": {hoja: {"casos": casos, "valor": valor} for hoja, (casos, valor) in _totales.items()},
+            "por": por,
+        }
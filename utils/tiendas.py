@@ -0,0 +1,47 @@
+import pandas as pd
+import streamlit as st
+
+from utils import espejo
+from utils.busqueda import IndiceNombres
+from utils.opciones import TIENDAS
+
+# === TABLA DE TIENDAS ===
+# TIENDAS (utils.opciones) es la tabla nombre -> ID_TIENDA. Agregar una tienda es
+# agregar una línea allí: los datos se parten por tienda y cada partición es
+# independiente de las demás.
+TIENDAS_POR_ID = {id_tienda: nombre for nombre, id_tienda in TIENDAS.items()}
+
+
+def id_tienda(nombre):
+    return TIENDAS.get(nombre)
+
+
+# === VIGILANTES POR TIENDA ===
+# Se parte VIGILANTES una vez por versión; elegir una tienda es leer un diccionario.
+# Cada tienda tiene su índice de búsqueda; el id de un vigilante es su nombre,
+# que es lo que se guarda en las hojas.
+_SIN_VIGILANTES = IndiceNombres([], [])
+
+
+@st.cache_resource(show_spinner=False, max_entries=2)
+def _vigilantes_por_tienda(version):
+    df = espejo.cargar_hoja("VIGILANTES")
+    ids = pd.to_numeric(df["ID_TIENDA"], errors="coerce")
+    particiones = {}
+    for clave, nombres in df["NOMBRE VIGILANTE"].groupby(ids, sort=False):
+        nombres = nombres.dropna().astype(str).tolist()
+        particiones[int(clave)] = IndiceNombres(nombres, nombres)
+    return particiones
+
+
+def indice_vigilantes(tienda):
+    particiones = _vigilantes_por_tienda(espejo.version_vigente("VIGILANTES"))
+    return particiones.get(id_tienda(tienda), _SIN_VIGILANTES)
+
+
+def vigilantes_de(tienda):
+    return tuple(indice_vigilantes(tienda).ids.tolist())
+
+
+# El hilo de fondo parte la versión nueva apenas cambia VIGILANTES
+espejo.al_actualizar("VIGILANTES", _vigilantes_por_tienda)
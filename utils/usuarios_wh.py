@@ -0,0 +1,29 @@
+import streamlit as st
+
+from utils import espejo
+from utils.busqueda import IndiceNombres
+from utils.esquemas import codigos
+
+
+# === USUARIOS WH ===
+# Índice de búsqueda por nombre o usuario y el nombre de cada usuario, armados una
+# vez por versión de la hoja. El id de un usuario es su código (USUARIO).
+@st.cache_resource(show_spinner=False, max_entries=2)
+def _usuarios_wh(version):
+    df = espejo.cargar_hoja("USUARIOS WH")
+    usuarios = codigos(df["USUARIO"])
+    nombres = df["NOMBRE"].astype(str).str.strip()
+    # Si un usuario aparece repetido se conserva la primera fila
+    primeros = ~usuarios.duplicated() & (usuarios != "")
+    usuarios, nombres = usuarios[primeros], nombres[primeros]
+    indice = IndiceNombres((nombres + " " + usuarios).tolist(), usuarios.tolist())
+    return indice, dict(zip(usuarios, nombres))
+
+
+def usuarios_wh():
+    # (índice, {usuario: nombre}) de la versión vigente
+    return _usuarios_wh(espejo.version_vigente("USUARIOS WH"))
+
+
+# El hilo de fondo arma el índice nuevo apenas cambia USUARIOS WH
+espejo.al_actualizar("USUARIOS WH", _usuarios_wh)
@@ -0,0 +1,122 @@
+import streamlit as st
+
+from utils.metricas import medido, medir
+from utils.opciones import TIENDAS
+from utils.tiendas import indice_vigilantes
+
+# === CONFIGURACIÓN ===
+LIMITE_SUGERENCIAS = 25
+
+
+# === SELECTOR DE SKU CON BÚSQUEDA EN EL SERVIDOR ===
+# En lugar de enviar todo HFB al navegador, el usuario escribe parte del SKU o del
+# nombre y el selectbox solo recibe las mejores coincidencias del catálogo.
+def _nueva_busqueda(key):
+    # Una búsqueda nueva descarta lo elegido antes: el selectbox (siempre con la
+    # misma clave) vuelve a su valor inicial con las nuevas opciones
+    st.session_state.pop(f"{key}_opcion", None)
+
+
+def selector_sku(catalogo, key, aceptar_nuevos=True, limite=LIMITE_SUGERENCIAS):
+    consulta = st.text_input(
+        "🔎 Buscar SKU o producto",
+        key=f"{key}_busqueda",
+        placeholder="Escribe el SKU o parte del nombre del producto",
+        on_change=_nueva_busqueda,
+        args=(key,)
+    )
+
+    with medir("busqueda_sku"):
+        opciones = catalogo.sugerencias(consulta, limite) if consulta else []
+    codigo = consulta.replace(".", "").replace(" ", "")
+    # Un código completo, con o sin los ceros a la izquierda, queda elegido
+    exacto = codigo.zfill(8) if codigo.isdigit() and len(codigo) <= 8 and codigo.zfill(8) in catalogo else None
+    if exacto and exacto not in opciones:
+        opciones.insert(0, exacto)
+    if aceptar_nuevos and codigo.isdigit() and codigo not in opciones and codigo.zfill(8) not in catalogo:
+        # Código nuevo que aún no está en HFB: se ofrece tal como se escribió
+        opciones.append(codigo)
+
+    def etiqueta(sku):
+        producto = catalogo.buscar(sku)
+        return f"{sku} · {producto['ITEM']}" if producto else sku
+
+    # El valor elegido también queda en st.session_state[key] para leerlo desde otros fragmentos
+    st.session_state[key] = st.selectbox(
+        "📦 SKU",
+        opciones,
+        format_func=etiqueta,
+        placeholder="Ingresa el SKU del producto",
+        accept_new_options=aceptar_nuevos,
+        index=opciones.index(exacto) if exacto in opciones else None,
+        key=f"{key}_opcion"
+    )
+    return st.session_state[key]
+
+
+# === SELECTOR DE PERSONAS CON BÚSQUEDA ===
+# Mismo esquema para vigilantes y usuarios WH: lo escrito se busca en el índice
+# (sin tildes, tolerante a errores) y el selectbox recibe ids, no etiquetas.
+# Sin búsqueda se ofrecen todos.
+def selector_nombre(indice, etiqueta, key, placeholder, formato=str, limite=LIMITE_SUGERENCIAS):
+    consulta = st.text_input(
+        "🔎 Buscar por nombre",
+        key=f"{key}_busqueda",
+        placeholder="Escribe parte del nombre",
+        on_change=_nueva_busqueda,
+        args=(key,)
+    )
+
+    with medir("busqueda_nombre"):
+        opciones = indice.buscar(consulta, limite) if consulta.strip() else indice.ids.tolist()
+
+    st.session_state[key] = st.selectbox(
+        etiqueta,
+        opciones,
+        format_func=formato,
+        placeholder=placeholder,
+        index=0 if consulta.strip() and len(opciones) == 1 else None,
+        key=f"{key}_opcion"
+    )
+    return st.session_state[key]
+
+
+# === TIENDA Y VIGILANTE (fragmento compartido) ===
+# Cambiar de tienda solo vuelve a ejecutar este fragmento. Al elegir o quitar la
+# tienda se vuelve a ejecutar la página para mostrar u ocultar el resto del formulario.
+@st.fragment
+@medido("tienda_y_vigilante")
+def tienda_y_vigilante(prefijo):
+    lista_tiendas = st.selectbox(
+        "Elige una de las tiendas",
+        list(TIENDAS),
+        placeholder="Selecciona una tienda",
+        index=None,
+        key=f"{prefijo}_tienda"
+    )
+    if (lista_tiendas is not None) != st.session_state.get(f"{prefijo}_formulario_visible", False):
+        st.rerun()
+    if not lista_tiendas:
+        return
+
+    selector_nombre(
+        indice_vigilantes(lista_tiendas),
+        "👮 Nombre del vigilante",
+        key=f"{prefijo}_vigilante",
+        placeholder="Indica el nombre del vigilante"
+    )
+
+
+def formulario_visible(prefijo):
+    # Se llama antes de tienda_y_vigilante() en cada ejecución completa de la página
+    visible = st.session_state.get(f"{prefijo}_tienda") is not None
+    st.session_state[f"{prefijo}_formulario_visible"] = visible
+    return visible
+
+
+# === FECHA Y HORA (fragmento compartido) ===
+@st.fragment
+@medido("fecha_y_hora")
+def fecha_y_hora(prefijo):
+    st.date_input("📅 Fecha de la recuperación", value=None, key=f"{prefijo}_fecha")
+    st.time_input("🕒 Hora de la recuperación", value=None, key=f"{prefijo}_hora")